@@ -1,4 +1,4 @@
 from lorekeeper.lorekeeper.auth import AuthPrint
 from lorekeeper.lorekeeper.cyanotype import Rule, Cyanotype
 from lorekeeper.lorekeeper.flasket import Flasket
-from lorekeeper.lorekeeper.models import Row, Model, Table, User
\ No newline at end of file
+from lorekeeper.lorekeeper.models import Record, Row, Model, Table, User
\ No newline at end of file
@@ -0,0 +1,50 @@
+"""
+Password hashing benchmark: logins (hash verifications) per second
+for a burst of concurrent requests at different process pool sizes.
+
+    python -m lorekeeper.benchmarks.hashing [--logins 200] [--pools 0,1,2,4] [--method scrypt]
+"""
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import os
+import time
+from werkzeug.security import generate_password_hash
+
+from lorekeeper.lorekeeper.hashing import PasswordHasher
+
+
+def bench(method:str, workers:int, logins:int, threads:int) -> dict:
+    hasher = PasswordHasher(method=method, workers=workers, max_pending=logins)
+    pwhash = generate_password_hash("correct horse", method=method)
+    hasher.verify(pwhash, "warm up the pool")
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as requests:
+        results = list(requests.map(lambda _: hasher.verify(pwhash, "correct horse"), range(logins)))
+    elapsed = time.perf_counter() - start
+    hasher.shutdown()
+
+    assert all(results)
+    return {
+        "workers": workers,
+        "logins": logins,
+        "seconds": round(elapsed, 3),
+        "logins_per_s": round(logins / elapsed, 1),
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--pools", default=",".join(str(n) for n in sorted({0, 1, 2, 4, os.cpu_count()})))
+    parser.add_argument("--method", default="scrypt")
+    parser.add_argument("--threads", type=int, default=32, help="concurrent request threads")
+    args = parser.parse_args(argv)
+
+    for workers in (int(n) for n in args.pools.split(",")):
+        print(bench(args.method, workers, args.logins, args.threads))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Row factory benchmark: time and memory to fetch, and read back, N rows
+with `models.Row`, `models.Record` and plain tuples.
+
+    python -m lorekeeper.benchmarks.rows [--rows 1000000]
+"""
+
+import argparse
+import sqlite3
+import time
+import tracemalloc
+
+from lorekeeper.lorekeeper.models import Record, Row
+
+FACTORIES = {
+    "tuple": None,
+    "Record": Record.factory,
+    "Row": Row,
+}
+
+
+def make_db(rows:int) -> sqlite3.Connection:
+    db = sqlite3.connect(":memory:")
+    db.execute("CREATE TABLE user (user_id INTEGER PRIMARY KEY, user_val TEXT NOT NULL, password TEXT NOT NULL)")
+    db.executemany("INSERT INTO user (user_val, password) VALUES (?, ?)",
+        ((f"user{idx}", "pbkdf2:sha256:260000$salt$hash") for idx in range(rows)))
+    db.commit()
+
+    return db
+
+
+def bench(db:sqlite3.Connection, row_factory, rows:int) -> dict:
+    db.row_factory = row_factory
+    scale = 1_000_000 / rows
+
+    tracemalloc.start()
+    results = db.execute("SELECT * FROM user").fetchall()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del results
+
+    start = time.perf_counter()
+    results = db.execute("SELECT * FROM user").fetchall()
+    fetch = time.perf_counter() - start
+
+    key = 1 if row_factory is None else 'user_val'
+    start = time.perf_counter()
+    for row in results:
+        row[key]
+    access = time.perf_counter() - start
+
+    del results
+    return {
+        "fetch_s_per_1M": round(fetch * scale, 3),
+        "access_s_per_1M": round(access * scale, 3),
+        "peak_MB_per_1M": round(peak * scale / 2**20, 1),
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args(argv)
+
+    db = make_db(args.rows)
+    for name, row_factory in FACTORIES.items():
+        print(f"{name:>8}: {bench(db, row_factory, args.rows)}")
+
+
+if __name__ == "__main__":
+    main()
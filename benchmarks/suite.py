@@ -0,0 +1,379 @@
+"""
+Data layer and auth endpoint benchmark suite, with a comparison mode to catch regressions.
+
+Builds (and keeps) one SQLite database per size on the `testing/schema.sql` layout, plus an
+`entry` table referencing `user` for the Join paths, then times LoreKeeper operations, model
+hydration and the testing app's `/`, `/auth/login/` and `/auth/register/` under concurrent clients,
+how long an online backup takes and what it does to `/` latency while it runs,
+and serializing a million `User`s to JSON with `JSONSerializer` against per-object `to_json`.
+
+    python -m lorekeeper.benchmarks.suite run [--sizes 10000,100000,1000000,10000000] [--out results.json]
+    python -m lorekeeper.benchmarks.suite compare base.json new.json [--threshold 0.1]
+"""
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from itertools import count
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from werkzeug.security import generate_password_hash
+
+from lorekeeper.lorekeeper.consts import *
+from lorekeeper.lorekeeper.lorekeeper import Join
+from lorekeeper.lorekeeper.models import User
+from lorekeeper.lorekeeper.serializer import JSONSerializer
+from lorekeeper.testing import create_app, PATH as TESTING_PATH
+
+SECRET = "correct horse"
+ENTRY_SCHEMA = """
+    CREATE TABLE entry (
+        entry_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL REFERENCES user (user_id),
+        entry_val TEXT NOT NULL
+    );
+    CREATE INDEX entry_user ON entry (user_id);
+"""
+
+
+# ==========================================================================================
+# data
+
+def make_db(path:str, rows:int, method:str, chunk_size:int=100_000) -> None:
+    """`rows` users (besides admin) and `rows` entries spread over them, deterministically."""
+
+    pwhash = generate_password_hash(SECRET, method=method)
+    tmp = f"{path}.tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+
+    db = sqlite3.connect(tmp)
+    db.execute("PRAGMA journal_mode = OFF")
+    db.execute("PRAGMA synchronous = OFF")
+    with open(os.path.join(TESTING_PATH, "schema.sql")) as f:
+        db.executescript(f.read())
+    db.executescript(ENTRY_SCHEMA)
+    db.execute("UPDATE user SET password = ? WHERE user_id = 1", (pwhash,))
+
+    for start in range(0, rows, chunk_size):
+        stop = min(start + chunk_size, rows)
+        db.executemany("INSERT INTO user (user_val, password) VALUES (?, ?)",
+            ((f"user{idx}", pwhash) for idx in range(start, stop)))
+        db.executemany("INSERT INTO entry (user_id, entry_val) VALUES (?, ?)",
+            (((idx * 7919) % rows + 2, f"entry{idx}") for idx in range(start, stop)))
+        db.commit()
+    db.execute("ANALYZE")
+    db.commit()
+    db.close()
+
+    os.replace(tmp, path)
+
+
+def get_db(data_dir:str, rows:int, method:str) -> str:
+    """Path of the generated database for `rows`, building it on first use."""
+
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"bench-{rows}-{method.replace(':', '_')}.sqlite")
+    if not os.path.exists(path):
+        start = time.perf_counter()
+        make_db(path, rows, method)
+        print(f"  generated {path} in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    return path
+
+
+# ==========================================================================================
+# measurement
+
+def summarize(times:list, elapsed:float=None) -> dict:
+    times = sorted(times)
+    mean = sum(times) / len(times)
+    return {
+        "runs": len(times),
+        "mean_us": round(mean * 1e6, 2),
+        "p50_us": round(times[len(times) // 2] * 1e6, 2),
+        "p99_us": round(times[min(len(times) - 1, int(len(times) * 0.99))] * 1e6, 2),
+        "ops_per_s": round(len(times) / elapsed if elapsed else 1 / mean, 1),
+    }
+
+
+def measure(func, budget:float, min_runs:int=5, max_runs:int=100_000) -> dict:
+    """Calls `func(run)` until `budget` seconds have passed (at least `min_runs` times)."""
+
+    times = []
+    deadline = time.perf_counter() + budget
+    while len(times) < max_runs and (len(times) < min_runs or time.perf_counter() < deadline):
+        start = time.perf_counter()
+        func(len(times))
+        times.append(time.perf_counter() - start)
+
+    return summarize(times)
+
+
+def data_layer(lk, rows:int, budget:float) -> dict:
+    ids = random.Random(rows)
+    user_id = lambda: ids.randrange(2, rows + 2)
+    inserted = []
+    pwhash = lk.select_one(Tables.USER, 1)[PASSWORD]  # rewritten as is, so logins keep working
+
+    def insert(run):
+        lk.insert(Tables.USER, {USER_VAL: f"bench{run}", PASSWORD: "x"})
+        inserted.append(lk.db.execute("SELECT last_insert_rowid() AS id").fetchone()["id"])
+
+    def page(lo, size=100, column="user.user_id"):
+        return {(column, lo): ">=", (column, lo + size): "<"}
+
+    results = {
+        "select_one_id": measure(lambda run: lk.select_one(Tables.USER, user_id()), budget),
+        "select_one_val": measure(lambda run: lk.select_one(Tables.USER, f"user{user_id() - 2}"), budget, max_runs=200),
+        "select_range_100": measure(lambda run: lk.select(Tables.USER, where=page(user_id())), budget),
+        "select_range_100_hydrated": measure(lambda run: lk.select(Tables.USER, where=page(user_id()), datatype=User), budget),
+        "select_range_1000_hydrated": measure(lambda run: lk.select(Tables.USER, where=page(user_id(), 1000), datatype=User), budget),
+        "join_object_100": measure(lambda run: lk.select(Tables.USER, join=Join("entry", on_col="user_id", from_col="user_id"),
+            where=page(user_id())), budget),
+        "join_string_100": measure(lambda run: lk.select("entry", join=Tables.USER,
+            where=page(user_id(), column="entry.entry_id")), budget),
+        # one query per parent vs one IN (...) query for all of them
+        "related_loop_100": measure(lambda run: [lk.select("entry", where={"entry.user_id": user.user_id})
+            for user in lk.select(Tables.USER, where=page(user_id()), datatype=User)], budget),
+        "related_prefetch_100": measure(lambda run: lk.select(Tables.USER, where=page(user_id()), datatype=User,
+            prefetch=Join("entry", alias="entries", on_col="user_id")), budget),
+        "related_load_100": measure(lambda run: lk.select("entry", where=page(user_id(), column="entry.entry_id"),
+            load=Join(Tables.USER, alias="author", on_col="user_id")), budget),
+        "insert": measure(insert, budget),
+        "update_id": measure(lambda run: lk.update(Tables.USER, {PASSWORD: pwhash}, {USER_ID: user_id()}), budget),
+    }
+    results["delete_id"] = measure(lambda run: lk.delete(Tables.USER, {USER_ID: inserted.pop()}), budget,
+        max_runs=len(inserted), min_runs=min(5, len(inserted)))
+
+    # hydration alone, on rows already fetched
+    fetched = lk.select(Tables.USER, where=page(2, 10_000))
+    results["hydrate_10000"] = measure(lambda run: lk._hydrate_columns(fetched[0].keys(), fetched, User), budget)
+    results["construct_10000"] = measure(lambda run: [User(**row.to_dict()) for row in fetched], budget)
+
+    return results
+
+
+def endpoints(app, rows:int, requests:int, concurrency:int) -> dict:
+    run_id = f"{os.getpid()}_{int(time.time())}"
+    counter = count()
+
+    def login(client):
+        idx = random.randrange(rows)
+        return client.post("/auth/login/", data={"username": f"user{idx}", "password": SECRET})
+
+    def register(client):
+        return client.post("/auth/register/", data={"username": f"new{run_id}_{next(counter)}", "password": SECRET})
+
+    def index(client):
+        return client.get("/")
+
+    def drive(request, logged_in:bool=False) -> dict:
+        clients = [app.test_client() for _ in range(concurrency)]
+        if logged_in:
+            for client in clients:
+                login(client)
+
+        def one(idx):
+            start = time.perf_counter()
+            response = request(clients[idx % concurrency])
+            assert response.status_code < 400, response.status_code
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            times = list(pool.map(one, range(requests)))
+        return summarize(times, time.perf_counter() - start)
+
+    return {
+        "GET /": drive(index, logged_in=True),
+        "POST /auth/login/": drive(login),
+        "POST /auth/register/": drive(register),
+    }
+
+
+def during_backup(app, rows:int, concurrency:int, pages:int, sleep:float) -> dict:
+    """Duration of `LoreKeeper.backup`, and GET / latency from `concurrency` logged in clients while it runs."""
+
+    clients = [app.test_client() for _ in range(concurrency)]
+    for client in clients:
+        client.post("/auth/login/", data={"username": f"user{random.randrange(rows)}", "password": SECRET})
+
+    done = threading.Event()
+    result = {}
+
+    def backup():
+        try:
+            with app.app_context(), tempfile.TemporaryDirectory() as work:
+                result.update(app.lk.backup(os.path.join(work, "backup.sqlite"), pages, sleep))
+        finally:
+            done.set()
+
+    def index(client):
+        times = []
+        while not done.is_set():
+            start = time.perf_counter()
+            response = client.get("/")
+            assert response.status_code < 400, response.status_code
+            times.append(time.perf_counter() - start)
+        return times
+
+    with ThreadPoolExecutor(max_workers=concurrency + 1) as pool:
+        loops = [pool.submit(index, client) for client in clients]
+        pool.submit(backup).result()
+        times = [elapsed for loop in loops for elapsed in loop.result()]
+
+    return {
+        "backup": summarize([result["seconds"]]),
+        "GET / (during backup)": summarize(times or [0.0]),
+    }
+
+
+def serialization(rows:int) -> dict:
+    """A JSON array of `rows` Users: joined per-object `to_json` strings vs `JSONSerializer`."""
+
+    users = [User(idx, f"user{idx}", f"pbkdf2:sha256:1000${idx:016x}${'0' * 64}") for idx in range(rows)]
+    serializer = JSONSerializer()
+
+    def drain(run):
+        for _ in serializer.iter_encode(users):
+            pass
+
+    return {
+        f"to_json_{rows}": measure(lambda run: "[" + ", ".join(user.to_json() for user in users) + "]", 0, min_runs=3),
+        f"serializer_dumps_{rows}": measure(lambda run: serializer.dumps(users), 0, min_runs=3),
+        f"serializer_stream_{rows}": measure(drain, 0, min_runs=3),
+    }
+
+
+def run(args) -> dict:
+    results = {
+        "meta": {
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "args": {key: val for key, val in vars(args).items() if key != "func"},
+        },
+        "results": {},
+    }
+
+    for rows in (int(n) for n in args.sizes.split(",")):
+        print(f"{rows} rows", file=sys.stderr)
+        source = get_db(args.data_dir, rows, args.password_method)
+
+        # each run writes to a fresh copy, so runs stay comparable
+        with tempfile.TemporaryDirectory() as work:
+            path = os.path.join(work, "db.sqlite")
+            shutil.copyfile(source, path)
+
+            app = create_app()
+            app.config.update({
+                "DATABASE": path,
+                Config.PASSWORD_METHOD: args.password_method,
+                Config.HASH_WORKERS: args.hash_workers,
+                Config.HASH_MAX_PENDING: args.requests,
+            })
+
+            with app.app_context():
+                result = data_layer(app.lk, rows, args.budget)
+            result.update(endpoints(app, rows, args.requests, args.concurrency))
+            result.update(during_backup(app, rows, args.concurrency, args.backup_pages, args.backup_sleep))
+            with app.app_context():
+                app.lk.pool.close()
+
+        results["results"][str(rows)] = result
+        for name, stats in result.items():
+            print(f"  {name:>28}: {stats['mean_us']:>12.1f} us mean {stats['p99_us']:>12.1f} us p99 "
+                f"{stats['ops_per_s']:>10.1f} ops/s", file=sys.stderr)
+
+    if args.serialize_rows:
+        print(f"serializing {args.serialize_rows} users", file=sys.stderr)
+        result = serialization(args.serialize_rows)
+        results["results"].setdefault(str(args.serialize_rows), {}).update(result)
+        for name, stats in result.items():
+            print(f"  {name:>28}: {stats['mean_us']:>12.1f} us mean", file=sys.stderr)
+
+    return results
+
+
+# ==========================================================================================
+# comparison
+
+def compare(base:dict, new:dict, threshold:float, metric:str="mean_us") -> list:
+    """(size, benchmark, base, new, change) for every benchmark in both runs; change > `threshold` is a regression."""
+
+    rows = []
+    for size, benches in new["results"].items():
+        for name, stats in benches.items():
+            before = base["results"].get(size, {}).get(name)
+            if not before or not before[metric]:
+                continue
+            change = stats[metric] / before[metric] - 1
+            rows.append((size, name, before[metric], stats[metric], change))
+
+    return rows
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the suite and write JSON results")
+    run_parser.add_argument("--sizes", default="10000,100000", help="comma-separated user/entry row counts, e.g. 10000,...,10000000")
+    run_parser.add_argument("--out", default="-", help="results file (- for stdout)")
+    run_parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "lorekeeper-bench"),
+        help="where generated databases are kept between runs")
+    run_parser.add_argument("--budget", type=float, default=1.0, help="seconds per data layer benchmark")
+    run_parser.add_argument("--requests", type=int, default=200, help="requests per endpoint")
+    run_parser.add_argument("--concurrency", type=int, default=8, help="concurrent clients")
+    run_parser.add_argument("--password-method", default="pbkdf2:sha256:1000")
+    run_parser.add_argument("--hash-workers", type=int, default=0)
+    run_parser.add_argument("--backup-pages", type=int, default=1024, help="pages per online backup step")
+    run_parser.add_argument("--backup-sleep", type=float, default=0.01, help="seconds between online backup steps")
+    run_parser.add_argument("--serialize-rows", type=int, default=1_000_000, help="Users serialized to JSON (0 to skip)")
+
+    compare_parser = commands.add_parser("compare", help="compare two results files; exits 1 on regressions")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=0.10, help="relative slowdown flagged as a regression")
+    compare_parser.add_argument("--metric", default="mean_us", choices=["mean_us", "p50_us", "p99_us"])
+
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        results = json.dumps(run(args), indent=2)
+        if args.out == "-":
+            print(results)
+        else:
+            with open(args.out, "w") as f:
+                f.write(results)
+        return
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+
+    regressions = 0
+    for size, name, before, after, change in compare(base, new, args.threshold, args.metric):
+        flag = ""
+        if change > args.threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{size:>10} {name:>28}: {before:>12.1f} -> {after:>12.1f} {args.metric} ({change:+.1%}){flag}")
+
+    print(f"{regressions} regression(s) over {args.threshold:.0%}.")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+import os
+import re
+import sqlite3
+import threading
+
+from lorekeeper.lorekeeper.catalog import SchemaCatalog
+from lorekeeper.lorekeeper.consts import *
+from lorekeeper.lorekeeper.stats import ProcessStats
+
+
+class IndexAdvisor(ProcessStats):
+    """
+    Records which columns the query builder filters and joins on, and how often,
+    together with the full table scans EXPLAIN QUERY PLAN reports for those statements,
+    and turns them into CREATE INDEX suggestions.
+
+    Each WHERE shape yields one candidate per table: its equality columns, then at most one range column,
+    i.e. the column order a composite index needs to serve the whole filter.
+
+    :param path: Where the `suggest-indexes` command finds this process's stats (see `ProcessStats`).
+    """
+
+    _equality = ("=", "IS", "IN")
+
+    def __init__(self, path:str=None, flush_interval:float=10.0) -> None:
+        self._uses = {}     # (table, columns) -> count
+        self._scans = {}    # table -> count
+        self._seen = {}     # SQL -> (candidates, scanned tables)
+        self._lock = threading.Lock()
+        self._init_flush(path, flush_interval)
+
+    def __repr__(self): return f"{self.__class__.__name__}: {len(self._uses)} candidates"
+
+    @classmethod
+    def from_config(cls, config:dict, instance_path:str) -> 'IndexAdvisor':
+        return cls(path=config.get(Config.INDEX_STATS, os.path.join(instance_path, "index-stats")))
+
+    # ==========================================================================================
+    # recording
+
+    def observe(self, db:sqlite3.Connection, table:str, id_column:str, where_shape, join, query:str, params) -> None:
+        """
+        Records one execution of `query`, built from `where_shape` and `join` on `table`.
+        Candidates and the plan are worked out once per distinct `query`.
+        """
+
+        seen = self._seen.get(query)
+        if seen is None:
+            if len(self._seen) >= 4096:
+                self._seen.clear()
+            seen = self._seen[query] = (
+                self._candidates(table, id_column, where_shape, join), self._scanned(db, query, params))
+        candidates, scanned = seen
+
+        with self._lock:
+            for candidate in candidates:
+                self._uses[candidate] = self._uses.get(candidate, 0) + 1
+            for name in scanned:
+                self._scans[name] = self._scans.get(name, 0) + 1
+
+        self._maybe_flush()
+
+    @classmethod
+    def _candidates(cls, table:str, id_column:str, where_shape, join) -> tuple:
+        aliases = {cls._unquote(table): cls._unquote(table)}
+        joined = []  # (table, column) pairs on both sides of each join
+        for item in cls._joins(join):
+            if isinstance(item, str):
+                aliases[item] = item
+                joined.append((cls._unquote(table), f"{item}_id"))
+            else:
+                item = dict(item)
+                select = item.get("select", "")
+                alias = item.get("alias") or select
+                on_col = item.get("on_col") or item.get("col") or f"{alias}_id"
+                if re.fullmatch(r"[\w.]+", select):  # a table, not a subquery
+                    aliases[alias] = select
+                    joined.append((select, on_col))
+                source = item.get("from_table")
+                source = aliases.get(source, source) if source else cls._unquote(table)
+                joined.append((source, item.get("from_col") or item.get("col") or on_col))
+
+        columns = {}  # table -> [equality columns], [range columns]
+        for column, comparator in cls._columns(table, id_column, where_shape):
+            owner, _, name = cls._unquote(column).rpartition(".")
+            owner = aliases.get(owner, owner) if owner else cls._unquote(table)
+            equality, ranged = columns.setdefault(owner, ([], []))
+            target = equality if comparator.strip().upper() in cls._equality else ranged
+            if name not in target:
+                target.append(name)
+
+        candidates = {(owner, tuple(equality + ranged[:1])) for owner, (equality, ranged) in columns.items()}
+        candidates.update((owner, (name,)) for owner, name in joined)
+        return tuple(candidates)
+
+    @staticmethod
+    def _joins(join) -> list:
+        if not join:
+            return []
+        if isinstance(join, (str, dict)) or hasattr(join, "to_dict"):
+            return [join]
+        return list(join)
+
+    @classmethod
+    def _columns(cls, table:str, id_column:str, shape):
+        """(column, comparator) for every column `shape` filters on."""
+
+        if not shape:
+            return
+        kind = shape[0]
+        if kind == ID:
+            yield id_column or f"{table}_id", "="
+        elif kind == VAL:
+            yield f"{table.rpartition('.')[2]}_val", "="
+        elif kind == "null":
+            yield shape[1], "IS"
+        elif kind == "cmp":
+            yield shape[1], shape[2]
+        elif kind == "group":
+            for child in shape[2]:
+                yield from cls._columns(table, id_column, child)
+
+    @staticmethod
+    def _unquote(name:str) -> str:
+        return re.sub(r"[`\"\[\]]", "", name)
+
+    @staticmethod
+    def _scanned(db:sqlite3.Connection, query:str, params) -> tuple:
+        """Tables EXPLAIN QUERY PLAN reports a full scan (or an automatic index) for."""
+
+        try:
+            cursor = db.cursor()
+            cursor.row_factory = None
+            plan = [detail for *_, detail in cursor.execute(f"EXPLAIN QUERY PLAN {query}", params)]
+        except sqlite3.Error:
+            return ()
+
+        scanned = set()
+        for detail in plan:
+            match = re.match(r"(SCAN|SEARCH) (?:TABLE )?(\S+)(?: AS \S+)?(.*)", detail)
+            if match and ((match.group(1) == "SCAN" and "INDEX" not in match.group(3)) or "AUTOMATIC" in match.group(3)):
+                scanned.add(match.group(2))
+        return tuple(scanned)
+
+    # ==========================================================================================
+    # reporting
+
+    @property
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "uses": [[table, list(columns), count] for (table, columns), count in self._uses.items()],
+                "scans": dict(self._scans),
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._uses = {}
+            self._scans = {}
+
+    @staticmethod
+    def _merge(flushed) -> dict:
+        merged = {"uses": {}, "scans": {}}
+        for stats in flushed:
+            for table, columns, count in stats["uses"]:
+                key = (table, tuple(columns))
+                merged["uses"][key] = merged["uses"].get(key, 0) + count
+            for table, count in stats["scans"].items():
+                merged["scans"][table] = merged["scans"].get(table, 0) + count
+
+        return merged
+
+    @staticmethod
+    def create_sql(table:str, columns) -> str:
+        schema, _, bare = table.rpartition(".")
+        name = f"{bare}_{'_'.join(columns)}_idx"
+        return f"CREATE INDEX IF NOT EXISTS {f'`{schema}`.' if schema else ''}`{name}` ON `{bare}` ({', '.join(columns)})"
+
+    @staticmethod
+    def suggest(db:sqlite3.Connection, catalog:SchemaCatalog, stats:dict, min_uses:int=1) -> list:
+        """
+        Candidates not already served by an index (or the rowid), most used first.
+
+        :param stats: As returned by `load`, or {"uses": {(table, columns): count}, "scans": {table: count}}.
+        :return: [{"table", "columns", "uses", "scans", "sql"}]
+        """
+
+        suggestions = []
+        for (table, columns), uses in stats["uses"].items():
+            if uses < min_uses:
+                continue
+            try:
+                info = catalog.table(db, table)
+            except KeyError:
+                continue
+
+            columns = tuple(column for column in columns if column in info)
+            if not columns or columns[0] == info.rowid_alias:
+                continue
+            covered = [tuple(info.primary_key), *(tuple(cols) for cols in info.indexes.values())]
+            if any(index[:len(columns)] == columns for index in covered):
+                continue
+
+            suggestions.append({
+                "table": table,
+                "columns": list(columns),
+                "uses": uses,
+                "scans": stats["scans"].get(table.rpartition(".")[2], 0),
+                "sql": IndexAdvisor.create_sql(table, columns),
+            })
+
+        # drop candidates that a longer suggestion on the same table would also serve
+        suggestions = [s for s in suggestions if not any(
+            other is not s and other["table"] == s["table"] and len(other["columns"]) > len(s["columns"])
+                and other["columns"][:len(s["columns"])] == s["columns"]
+            for other in suggestions)]
+
+        return sorted(suggestions, key=lambda s: (s["scans"], s["uses"]), reverse=True)
@@ -0,0 +1,178 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, g
+import functools
+from itertools import islice
+import threading
+
+from lorekeeper.lorekeeper.consts import *
+
+
+class _Worker(object):
+    """
+    A single thread owning one SQLite connection, inside a long-lived app context.
+    A `reader` also holds the replica connection its selects are routed to (the primary one without replicas).
+    """
+
+    def __init__(self, lorekeeper:'LoreKeeper', app:Flask, name:str, reader:bool=False) -> None:
+        self.lk = lorekeeper
+        self.app = app
+        self.name = name
+        self.reader = reader
+        self.db = None
+        self.replica = None
+        self.pending = 0
+
+        self._current = None
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=name, initializer=self._open)
+
+    def __repr__(self): return f"{self.__class__.__name__}: {self.name} ({self.pending} pending)"
+
+    def _open(self) -> None:
+        self._context = self.app.app_context()
+        self._context.push()
+        self.db = g.db = self.lk.pool.connect()
+        if self.reader:
+            self.replica = self.lk.replica_db
+
+    def _close(self) -> None:
+        g.pop('db', None)
+        self.db.close()
+        # checked in here rather than left to teardown, which only runs if `init_app` registered it
+        replica, pool = g.pop('db_replica', None), g.pop('db_replica_pool', None)
+        if replica is not None and pool is not None:
+            pool.checkin(replica)
+        self._context.pop()
+
+    def _call(self, token, func, args, kwargs):
+        with self._lock:
+            self._current = token
+        try:
+            self.lk.catalog.validate(self.db)
+            return func(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._current = None
+
+    async def run(self, func, *args, interruptible:bool=False, **kwargs):
+        """
+        Runs `func(*args, **kwargs)` on this worker's thread.
+
+        If the awaiting task is cancelled, the call is dropped if it hasn't started;
+        if it has, it runs to completion (writes stay all-or-nothing),
+            unless `interruptible`, in which case the running statement is interrupted.
+        """
+
+        token = object()
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, functools.partial(self._call, token, func, args, kwargs))
+        except asyncio.CancelledError:
+            if interruptible:
+                with self._lock:
+                    if self._current is token:
+                        # one call runs at a time, so whichever of them isn't running it is idle
+                        for db in {self.db, self.replica} - {None}:
+                            db.interrupt()
+            raise
+        finally:
+            self.pending -= 1
+
+    def submit(self, func, *args):
+        return self._executor.submit(func, *args)
+
+    def shutdown(self) -> None:
+        self._executor.submit(self._close)
+        self._executor.shutdown(wait=True)
+
+
+class AsyncLoreKeeper(object):
+    """
+    asyncio facade over a `LoreKeeper`.
+
+    Reads run on `readers` threads, each with its own connection, and go to the least busy one.
+    Writes run on a single writer thread with its own connection, so they are serialized
+    and never contend with each other for the SQLite write lock.
+    """
+
+    def __init__(self, lorekeeper:'LoreKeeper', app:Flask, readers:int=4) -> None:
+        self.lk = lorekeeper
+        self.app = app
+        self._readers = [_Worker(lorekeeper, app, f"lorekeeper-reader-{idx}", reader=True) for idx in range(readers)]
+        self._writer = _Worker(lorekeeper, app, "lorekeeper-writer")
+
+    def __repr__(self): return f"{self.__class__.__name__}: {self.lk.db_name} ({len(self._readers)} readers)"
+
+    def _reader(self) -> _Worker:
+        return min(self._readers, key=lambda worker: worker.pending)
+
+    def close(self) -> None:
+        for worker in (*self._readers, self._writer):
+            worker.shutdown()
+
+    # ==========================================================================================
+    # reads
+
+    async def aselect(self, table:str, columns='*', join=None, where=None, datatype=None, **kwargs) -> list:
+        return await self._reader().run(self.lk.select, table, columns, join, where, datatype, interruptible=True, **kwargs)
+
+    async def aselect_one(self, table:str, where, columns:list='*', join=None, datatype=None, **kwargs):
+        return await self._reader().run(self.lk.select_one, table, where, columns, join, datatype, interruptible=True, **kwargs)
+
+    async def aselect_page(self, table:str, order_by=None, after:str=None, size:int=50, **kwargs) -> tuple:
+        return await self._reader().run(self.lk.select_page, table, order_by, after, size, interruptible=True, **kwargs)
+
+    async def aiter_select(self, table:str, columns='*', join=None, where=None, datatype=None, chunk_size:int=500):
+        """Async generator over `iter_select`; every chunk is fetched on the same reader."""
+
+        worker = self._reader()
+        rows = await worker.run(self.lk.iter_select, table, columns, join, where, datatype, chunk_size, interruptible=True)
+        try:
+            while chunk := await worker.run(lambda: list(islice(rows, chunk_size)), interruptible=True):
+                for row in chunk:
+                    yield row
+        finally:
+            worker.submit(rows.close)
+
+    # ==========================================================================================
+    # writes
+
+    async def ainsert(self, table:str, values:dict, datatype=None) -> None:
+        return await self._writer.run(self.lk.insert, table, values, datatype)
+
+    async def ainsert_many(self, table:str, rows, datatype=None, chunk_size:int=1000) -> tuple:
+        return await self._writer.run(self.lk.insert_many, table, rows, datatype, chunk_size)
+
+    async def aupdate(self, table:str, values:dict, where:dict) -> None:
+        return await self._writer.run(self.lk.update, table, values, where)
+
+    async def adelete(self, table:str, where:dict) -> None:
+        return await self._writer.run(self.lk.delete, table, where)
+
+    async def aupdate_many(self, table:str, rows, key=None, chunk_size:int=1000) -> int:
+        return await self._writer.run(self.lk.update_many, table, rows, key, chunk_size)
+
+    async def aupsert_many(self, table:str, rows, key=None, chunk_size:int=1000) -> int:
+        return await self._writer.run(self.lk.upsert_many, table, rows, key, chunk_size)
+
+    async def adelete_many(self, table:str, ids, column:str=None, chunk_size:int=None) -> int:
+        return await self._writer.run(self.lk.delete_many, table, ids, column, chunk_size)
+
+    async def arun_query(self, query:str, datatype=None) -> list:
+        if query.split()[0].upper() == SELECT:
+            return await self._reader().run(self.lk.run_query, query, datatype, interruptible=True)
+        return await self._writer.run(self.lk.run_query, query, datatype)
+
+    async def atransaction(self, func, mode:str="DEFERRED"):
+        """
+        Runs `func(lorekeeper)` on the writer inside `lorekeeper.transaction(mode)`,
+        so all of its writes commit (or roll back) together.
+        """
+
+        def unit_of_work():
+            with self.lk.transaction(mode):
+                return func(self.lk)
+
+        return await self._writer.run(unit_of_work)
@@ -1,10 +1,13 @@
+from concurrent.futures import Future
 import jinja2
 import os
-from flask import flash, g, session, redirect, render_template, request, url_for
-from werkzeug.security import check_password_hash, generate_password_hash
+import threading
+from flask import abort, current_app, flash, g, session, redirect, render_template, request, url_for
 
+from lorekeeper.lorekeeper.cache import TTLCache
 from lorekeeper.lorekeeper.cyanotype import Cyanotype
 from lorekeeper.lorekeeper.consts import *
+from lorekeeper.lorekeeper.hashing import HashingOverloaded, PasswordHasher
 from lorekeeper.lorekeeper.models import User
 
 
@@ -13,7 +16,14 @@ class AuthPrint(Cyanotype):
     template_path = os.path.join(root_path, "templates") # same as template_folder?
     # auth_path = os.path.join(template_path, "auth")
 
-    def __init__(self, lorekeeper:'LoreKeeper', template_folder:str, name:str='auth', import_name:str=__name__, url_prefix:str='/auth', **kwargs):
+    def __init__(self, lorekeeper:'LoreKeeper', template_folder:str, name:str='auth', import_name:str=__name__, url_prefix:str='/auth',
+            user_cache_size:int=1024, user_cache_ttl:float=60.0, skip_endpoints:tuple=('static',), hasher:PasswordHasher=None, **kwargs):
+        self.user_cache = TTLCache(user_cache_size, user_cache_ttl)
+        self._user_generation = 0  # user table invalidations, so a load that raced one isn't cached
+        self._user_lock = threading.Lock()
+        self._hasher = hasher
+        self.skip_endpoints = set(skip_endpoints)
+        self._index = None
         self.url_rules = [
             {RULE:'/register/', ENDPOINT:'register', VIEW_FUNC:self.signup},
             {RULE:'/login/', ENDPOINT:'login', VIEW_FUNC:self.login},
@@ -22,14 +32,46 @@ class AuthPrint(Cyanotype):
         super().__init__(lorekeeper=lorekeeper, template_folder=self.template_path, name=name, import_name=import_name, url_prefix=url_prefix, **kwargs)
         self.jinja_loader = jinja2.FileSystemLoader([self.template_folder, template_folder])
         self.before_app_request(self.load_logged_in_user)
+        self.record_once(lambda state: self._find_index(state.app.url_map))
+        self.lk.on_write(self._table_written)
+
+    @property
+    def hasher(self) -> PasswordHasher:
+        """The password hasher, configured from the app config on first use unless one was given."""
+
+        if self._hasher is None:
+            config = current_app.config
+            self._hasher = PasswordHasher(
+                method=config.get(Config.PASSWORD_METHOD, "scrypt"),
+                workers=config.get(Config.HASH_WORKERS),
+                max_pending=config.get(Config.HASH_MAX_PENDING, 64)
+            )
+        return self._hasher
+
+    def _hash(self, func, *args):
+        try:
+            return func(*args)
+        except HashingOverloaded:
+            abort(503, description="Too many sign-ins at once; please try again.")
 
     def get_index(self):
-        endpoint = ""
-        for rule in self.lk.url_map.iter_rules():
+        if not self._index:
+            self._find_index(self.lk.url_map)
+        return self._index
+
+    def _find_index(self, url_map) -> None:
+        """Looks up the index endpoint once (at registration, or on first use if registered later)."""
+
+        for rule in url_map.iter_rules():
             if "index" in rule.endpoint:
-                endpoint = rule.endpoint
+                self._index = rule.endpoint
                 break
-        return endpoint
+
+    def skip_user(self, view):
+        """Decorator: `view` doesn't need `g.user`, so the user lookup is skipped (`g.user` is None)."""
+
+        view.skip_user = True
+        return view
 
     # ====================================================================================================
     # views
@@ -47,7 +89,7 @@ class AuthPrint(Cyanotype):
                 errors.append("Must include password.")
 
             if not errors:
-                hashed_password = generate_password_hash(password)
+                hashed_password = self._hash(self.hasher.hash, password)
                 self._register_user(username, hashed_password)
 
                 return self._login(username, password)
@@ -70,8 +112,11 @@ class AuthPrint(Cyanotype):
         user = self._get_user_by_val(username)
         if not user:
             errors.append(f"User '{username}' doesn't exist.")
-        elif not check_password_hash(user.password, password):
+        elif not self._hash(self.hasher.verify, user.password, password):
             errors.append("Password is incorrect.")
+        elif self.hasher.needs_rehash(user.password):
+            # stored with an outdated method or cost; upgrade it while we have the password
+            self.lk.update(Tables.USER, {PASSWORD: self._hash(self.hasher.hash, password)}, where={USER_ID: user.id})
         
         if not errors:
             session.clear()
@@ -90,13 +135,27 @@ class AuthPrint(Cyanotype):
     # ====================================================================================================
 
     def _get_user_by_id(self, user_id:int) -> User:
-        return self.lk.select(Tables.USER, where={USER_ID: user_id}, datatype=User)[0]
+        user = self.user_cache.get(user_id)
+        if user is None:
+            generation = self._user_generation
+            user = self.lk.select(Tables.USER, where={USER_ID: user_id}, datatype=User, route=PRIMARY)[0]
+            with self._user_lock:
+                if generation == self._user_generation:
+                    self.user_cache.set(user_id, user)
+
+        return user
+
+    def _table_written(self, table:str) -> None:
+        if table in (Tables.USER, None):
+            with self._user_lock:
+                self._user_generation += 1
+                self.user_cache.clear()
 
     def _get_user_by_val(self, user_val:str) -> User:
-        return self.lk.select(Tables.USER, where={USER_VAL: user_val}, datatype=User)[0]
+        return self.lk.select(Tables.USER, where={USER_VAL: user_val}, datatype=User, route=PRIMARY)[0]
 
     def username_exists(self, user_val:str) -> bool:
-        return bool(self.lk.select(Tables.USER, columns=[USER_VAL], where={USER_VAL: user_val}))
+        return bool(self.lk.select(Tables.USER, columns=[USER_VAL], where={USER_VAL: user_val}, route=PRIMARY))
         
     #? Is this needed?
     @classmethod
@@ -104,12 +163,14 @@ class AuthPrint(Cyanotype):
 
     def _register_user(self, user_val:str, password:str) -> None:
         new_user = User(user_val=user_val, password=password)
-        self.lk.insert(Tables.USER, values=new_user.to_dict())
+        written = self.lk.insert(Tables.USER, values=new_user.to_dict())
+        if isinstance(written, Future):  # write-behind: signup logs the new user in right away
+            written.result()
 
     def load_logged_in_user(self) -> None:
         user_id = session.get('user_id')
 
-        if not user_id:
+        if not user_id or self._skips_user():
             g.user = None
         else:
             try:
@@ -119,6 +180,13 @@ class AuthPrint(Cyanotype):
                 session.clear()
                 redirect(url_for('auth.login'))
 
+    def _skips_user(self) -> bool:
+        if request.endpoint in self.skip_endpoints:
+            return True
+
+        view = current_app.view_functions.get(request.endpoint)
+        return getattr(view, 'skip_user', False)
+
 
 # ===========================
 
@@ -0,0 +1,324 @@
+from collections import OrderedDict
+import hashlib
+import pickle
+import re
+import sqlite3
+import threading
+import time
+
+
+class TTLCache(object):
+    """
+    Thread-safe LRU mapping whose entries also expire `ttl` seconds after being set.
+    """
+
+    _missing = object()
+
+    def __init__(self, maxsize:int=1024, ttl:float=60.0) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires, value)
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self): return len(self._entries)
+    def __repr__(self): return f"{self.__class__.__name__}: {len(self)}/{self.maxsize} (hits={self.hits}, misses={self.misses})"
+
+    def get(self, key, default=None):
+        with self._lock:
+            expires, value = self._entries.get(key, (None, self._missing))
+            if value is self._missing or expires < time.monotonic():
+                if value is not self._missing:
+                    del self._entries[key]
+                    self.evictions += 1
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl:float=None) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self._entries.pop(key, (None, default))[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self.evictions += len(self._entries)
+            self._entries.clear()
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class MemoryBackend(object):
+    """In-process result cache backend: a `TTLCache` plus a table -> keys index."""
+
+    def __init__(self, maxsize:int=1024, ttl:float=60.0) -> None:
+        self._entries = TTLCache(maxsize, ttl)
+        self._tags = {}
+        self._generations = {}  # table ("" for `clear`) -> invalidation count
+        self._lock = threading.Lock()
+        self.invalidations = 0
+
+    def get(self, key, default=None):
+        return self._entries.get(key, default)
+
+    def generation(self, tables:tuple) -> tuple:
+        with self._lock:
+            return self._generation(tables)
+
+    def _generation(self, tables:tuple) -> tuple:
+        return tuple(self._generations.get(table, 0) for table in ("", *tables))
+
+    def set(self, key, value, tables:tuple, ttl:float=None, generation:tuple=None) -> None:
+        with self._lock:
+            if generation is not None and generation != self._generation(tables):
+                return  # invalidated since the value was read
+
+            self._entries.set(key, value, ttl)
+            for table in tables:
+                self._tags.setdefault(table, set()).add(key)
+
+            # drop index entries for keys the LRU/TTL already evicted
+            if sum(len(keys) for keys in self._tags.values()) > 2 * self._entries.maxsize:
+                with self._entries._lock:
+                    live = set(self._entries._entries)
+                self._tags = {table: keys & live for table, keys in self._tags.items() if keys & live}
+
+    def invalidate(self, table:str) -> None:
+        with self._lock:
+            self._generations[table] = self._generations.get(table, 0) + 1
+            keys = self._tags.pop(table, ())
+        for key in keys:
+            if self._entries.pop(key, self._entries._missing) is not self._entries._missing:
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generations[""] = self._generations.get("", 0) + 1
+            self._tags = {}
+        self._entries.clear()
+
+    @property
+    def stats(self) -> dict:
+        return {**self._entries.stats, "invalidations": self.invalidations}
+
+
+class SQLiteBackend(object):
+    """
+    Result cache backend in a shared SQLite file, so every worker process
+    sees (and invalidates) the same entries. Values are pickled.
+
+    :param touch: Seconds a hit leaves an entry's LRU timestamp alone before writing a new one,
+        so hits stay reads; defaults to a tenth of `ttl`.
+    """
+
+    def __init__(self, path:str, maxsize:int=10000, ttl:float=60.0, touch:float=None) -> None:
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.touch = ttl / 10 if touch is None else touch
+        self._local = threading.local()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS result (
+                key BLOB PRIMARY KEY, value BLOB NOT NULL, expires REAL NOT NULL, used REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS result_table (
+                key BLOB NOT NULL, tbl TEXT NOT NULL, PRIMARY KEY (tbl, key)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS result_used ON result (used);
+            CREATE TABLE IF NOT EXISTS result_generation (
+                tbl TEXT PRIMARY KEY, n INTEGER NOT NULL
+            ) WITHOUT ROWID;
+        """)
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        # one connection per thread, autocommit
+        if getattr(self._local, 'db', None) is None:
+            self._local.db = sqlite3.connect(self.path, isolation_level=None, timeout=5.0)
+            self._local.db.execute("PRAGMA journal_mode = WAL")
+            self._local.db.execute("PRAGMA synchronous = OFF")
+        return self._local.db
+
+    @staticmethod
+    def _key(key) -> bytes:
+        return hashlib.sha1(repr(key).encode()).digest()
+
+    def get(self, key, default=None):
+        key = self._key(key)
+        now = time.time()
+        row = self.db.execute("SELECT value, used FROM result WHERE key = ? AND expires > ?", (key, now)).fetchone()
+        if row is None:
+            self.misses += 1
+            return default
+
+        if now - row[1] >= self.touch:
+            self.db.execute("UPDATE result SET used = ? WHERE key = ?", (now, key))
+        self.hits += 1
+        return pickle.loads(row[0])
+
+    def generation(self, tables:tuple) -> tuple:
+        return self._generation(self.db, tables)
+
+    @staticmethod
+    def _generation(db:sqlite3.Connection, tables:tuple) -> tuple:
+        tables = ("", *tables)
+        counts = dict(db.execute(
+            f"SELECT tbl, n FROM result_generation WHERE tbl IN ({', '.join('?' * len(tables))})", tables).fetchall())
+        return tuple(counts.get(table, 0) for table in tables)
+
+    def set(self, key, value, tables:tuple, ttl:float=None, generation:tuple=None) -> None:
+        try:
+            value = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return  # unpicklable results are simply not cached
+
+        key = self._key(key)
+        now = time.time()
+        db = self.db
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            if generation is not None and generation != self._generation(db, tables):
+                db.execute("ROLLBACK")
+                return  # invalidated since the value was read
+
+            db.execute("INSERT OR REPLACE INTO result (key, value, expires, used) VALUES (?, ?, ?, ?)",
+                (key, value, now + (self.ttl if ttl is None else ttl), now))
+            db.executemany("INSERT OR IGNORE INTO result_table (key, tbl) VALUES (?, ?)", ((key, table) for table in tables))
+            evicted = self._evict(db, now)
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        self.evictions += evicted
+
+    def _evict(self, db:sqlite3.Connection, now:float) -> int:
+        evicted = db.execute("DELETE FROM result WHERE expires <= ?", (now,)).rowcount
+        overflow = db.execute("SELECT COUNT(*) FROM result").fetchone()[0] - self.maxsize
+        if overflow > 0:
+            evicted += db.execute(
+                "DELETE FROM result WHERE key IN (SELECT key FROM result ORDER BY used LIMIT ?)", (overflow,)).rowcount
+        if evicted:
+            db.execute("DELETE FROM result_table WHERE key NOT IN (SELECT key FROM result)")
+        return evicted
+
+    def invalidate(self, table:str) -> None:
+        db = self.db
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.execute("INSERT INTO result_generation (tbl, n) VALUES (?, 1) ON CONFLICT (tbl) DO UPDATE SET n = n + 1", (table,))
+            count = db.execute(
+                "DELETE FROM result WHERE key IN (SELECT key FROM result_table WHERE tbl = ?)", (table,)).rowcount
+            db.execute("DELETE FROM result_table WHERE tbl = ?", (table,))
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        self.invalidations += count
+
+    def clear(self) -> None:
+        self.db.executescript("""
+            BEGIN IMMEDIATE;
+            INSERT INTO result_generation (tbl, n) VALUES ('', 1) ON CONFLICT (tbl) DO UPDATE SET n = n + 1;
+            DELETE FROM result; DELETE FROM result_table;
+            COMMIT;
+        """)
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "size": self.db.execute("SELECT COUNT(*) FROM result").fetchone()[0],
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+class ResultCache(object):
+    """
+    Opt-in cache of select results, keyed by compiled SQL plus bind values
+    and tagged with every table the statement reads.
+    Writes through LoreKeeper evict the entries tagged with the written table.
+
+    :param backend: `MemoryBackend` (default) or `SQLiteBackend` to share entries between processes.
+    """
+
+    _missing = object()
+    _read_pattern = re.compile(r"\b(?:FROM|JOIN)\s+\(?\s*(?!SELECT\b|WITH\b|VALUES\b)((?:[`\"\[]?\w+[`\"\]]?\.)?[`\"\[]?\w+)", re.IGNORECASE)
+
+    def __init__(self, backend=None) -> None:
+        self.backend = backend or MemoryBackend()
+
+    def __repr__(self): return f"{self.__class__.__name__}: {self.backend.__class__.__name__}"
+
+    @classmethod
+    def tables(cls, query:str) -> tuple:
+        """Every table named after FROM/JOIN in `query`, subqueries included."""
+
+        return tuple({cls._normalize(match) for match in cls._read_pattern.findall(query)})
+
+    @staticmethod
+    def _normalize(table:str) -> str:
+        table = re.sub(r"[`\"\[\]]", "", table).lower()
+        return table[5:] if table.startswith("main.") else table
+
+    def get(self, query:str, params):
+        return self.backend.get((query, tuple(params)), self._missing)
+
+    def generation(self, query:str) -> tuple:
+        """
+        Invalidation counters of the tables `query` reads; taken before running it on a miss
+        and passed to `set`, so a result read before a concurrent write isn't cached after it.
+        """
+
+        return self.backend.generation(self.tables(query))
+
+    def set(self, query:str, params, value, ttl:float=None, generation:tuple=None) -> None:
+        """Caches `value`, unless `generation` (from `generation`) is given and a table it read was invalidated since."""
+
+        self.backend.set((query, tuple(params)), value, self.tables(query), ttl, generation)
+
+    def invalidate(self, table:str=None) -> None:
+        """Evicts every entry that read `table`; everything if `table` is None."""
+
+        if table is None:
+            self.backend.clear()
+        else:
+            self.backend.invalidate(self._normalize(table))
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    @property
+    def stats(self) -> dict:
+        return self.backend.stats
@@ -0,0 +1,145 @@
+import sqlite3
+
+
+class TableInfo(object):
+    """Schema metadata for a single table, as reported by `PRAGMA table_info` / `index_list`."""
+
+    __slots__ = ['name', 'columns', 'types', 'notnull', 'defaults', 'primary_key', 'indexes', 'unique']
+
+    def __init__(self, name:str, columns:list=None, types:dict=None, notnull:dict=None, defaults:dict=None,
+            primary_key:list=None, indexes:dict=None, unique:list=None) -> None:
+        self.name = name
+        self.columns = columns or []
+        self.types = types or {}
+        self.notnull = notnull or {}
+        self.defaults = defaults or {}
+        self.primary_key = primary_key or []
+        self.indexes = indexes or {}
+        self.unique = unique or []
+
+    def __repr__(self): return f"{self.__class__.__name__}: {self.name} ({', '.join(self.columns)})"
+    def __contains__(self, column:str): return column in self.types
+
+    @property
+    def rowid_alias(self) -> str:
+        """The INTEGER PRIMARY KEY column, if any (SQLite assigns it on insert)."""
+
+        if len(self.primary_key) == 1:
+            column = self.primary_key[0]
+            if self.types.get(column, "").upper() == "INTEGER":
+                return column
+        return None
+
+    @property
+    def insert_columns(self) -> list:
+        """Columns to supply on INSERT, i.e. all but the rowid alias."""
+
+        rowid = self.rowid_alias
+        return [column for column in self.columns if column != rowid]
+
+    def to_dict(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+
+class SchemaCatalog(object):
+    """
+    Caches `TableInfo` for every table of a database.
+
+    The cache is shared across connections and requests and is dropped whenever
+    `PRAGMA schema_version` changes, i.e. after any CREATE/ALTER/DROP.
+    Call `validate` once per connection checkout (not per query) to pick up such changes.
+    """
+
+    def __init__(self, on_invalidate=None) -> None:
+        self.on_invalidate = on_invalidate
+        self._version = None
+        self._tables = {}
+        self._names = None
+
+    def __repr__(self): return f"{self.__class__.__name__}: v{self._version} ({len(self._tables)} cached)"
+
+    @staticmethod
+    def _fetch(db:sqlite3.Connection, query:str, params=()) -> list:
+        # plain tuples, independent of the connection's row factory
+        cursor = db.cursor()
+        cursor.row_factory = None
+        return cursor.execute(query, params).fetchall()
+
+    def validate(self, db:sqlite3.Connection) -> bool:
+        """
+        Compares the cached schema version against `db`.
+        Invalidates the catalog and returns True if it was stale.
+        """
+
+        version = self._fetch(db, "PRAGMA schema_version")[0][0]
+        if version == self._version:
+            return False
+
+        self.invalidate()
+        self._version = version
+        return True
+
+    def invalidate(self) -> None:
+        self._version = None
+        self._tables = {}
+        self._names = None
+        if self.on_invalidate:
+            self.on_invalidate()
+
+    def tables(self, db:sqlite3.Connection) -> list:
+        """Names of all user tables (not SQLite's or LoreKeeper's own `lorekeeper_*` tables)."""
+
+        if self._version is None:
+            self.validate(db)
+        if self._names is None:
+            self._names = [name for (name,) in self._fetch(db,
+                "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' "
+                "AND name NOT LIKE 'lorekeeper\\_%' ESCAPE '\\' ORDER BY rowid")]
+
+        return self._names
+
+    def table(self, db:sqlite3.Connection, name:str) -> TableInfo:
+        """
+        Returns the `TableInfo` for `name`.
+
+        :raises KeyError: if `name` is not a table.
+        """
+
+        if self._version is None:
+            self.validate(db)
+        try:
+            return self._tables[name]
+        except KeyError:
+            info = self._tables[name] = self._load(db, name)
+            return info
+
+    def columns(self, db:sqlite3.Connection, name:str) -> list:
+        return self.table(db, name).columns
+
+    def _load(self, db:sqlite3.Connection, name:str) -> TableInfo:
+        schema, _, table = name.rpartition(".")
+        pragma = f"PRAGMA `{schema}`." if schema else "PRAGMA "
+
+        # table_info: (cid, name, type, notnull, dflt_value, pk)
+        rows = self._fetch(db, f"{pragma}table_info(`{table}`)")
+        if not rows:
+            raise KeyError(name)
+
+        info = TableInfo(name)
+        for _, column, decltype, notnull, default, pk in rows:
+            info.columns.append(column)
+            info.types[column] = decltype
+            info.notnull[column] = bool(notnull)
+            info.defaults[column] = default
+        info.primary_key = [row[1] for row in sorted(rows, key=lambda row: row[5]) if row[5]]
+
+        # index_list: (seq, name, unique, origin, partial)
+        for _, index, unique, *_ in self._fetch(db, f"{pragma}index_list(`{table}`)"):
+            cols = [column for _, _, column in self._fetch(db, f"{pragma}index_info(`{index}`)")]
+            info.indexes[index] = cols
+            if unique:
+                info.unique.append(tuple(cols))
+        if info.primary_key and tuple(info.primary_key) not in info.unique:
+            info.unique.insert(0, tuple(info.primary_key))
+
+        return info
@@ -13,6 +13,10 @@ USER_VAL = 'user_val'
 
 SELECT = 'SELECT'
 
+# database routes
+PRIMARY = 'primary'
+REPLICA = 'replica'
+
 # url_rule attributes
 RULE = "rule"
 ENDPOINT = "endpoint"
@@ -21,4 +25,24 @@ METHODS = "methods"
 
 class Tables:
     USER = 'user'
+    ROW_COUNTS = 'lorekeeper_count'  # maintained by `LoreKeeper.track_counts`
+
 
+class Config:
+    """Flask config keys read by LoreKeeper."""
+    POOL_SIZE = 'LOREKEEPER_POOL_SIZE'
+    POOL_TIMEOUT = 'LOREKEEPER_POOL_TIMEOUT'
+    PRAGMA_PROFILE = 'LOREKEEPER_PRAGMA_PROFILE'
+    PRAGMAS = 'LOREKEEPER_PRAGMAS'
+    PASSWORD_METHOD = 'LOREKEEPER_PASSWORD_METHOD'
+    HASH_WORKERS = 'LOREKEEPER_HASH_WORKERS'
+    HASH_MAX_PENDING = 'LOREKEEPER_HASH_MAX_PENDING'
+    PROFILE = 'LOREKEEPER_PROFILE'
+    SLOW_QUERY = 'LOREKEEPER_SLOW_QUERY'
+    QUERY_STATS = 'LOREKEEPER_QUERY_STATS'
+    ADVISE_INDEXES = 'LOREKEEPER_ADVISE_INDEXES'
+    INDEX_STATS = 'LOREKEEPER_INDEX_STATS'
+    WRITE_BEHIND = 'LOREKEEPER_WRITE_BEHIND'
+    WRITE_BATCH = 'LOREKEEPER_WRITE_BATCH'
+    WRITE_DELAY = 'LOREKEEPER_WRITE_DELAY'
+    WRITE_QUEUE = 'LOREKEEPER_WRITE_QUEUE'
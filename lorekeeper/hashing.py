@@ -0,0 +1,87 @@
+from concurrent.futures import ProcessPoolExecutor
+import os
+import threading
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HashingOverloaded(RuntimeError):
+    """Raised instead of queueing when too many hashes are already pending."""
+
+
+class PasswordHasher(object):
+    """
+    Runs password key derivation in a bounded process pool, off the request thread,
+    so a burst of logins is spread across cores instead of stalling every worker.
+
+    :param method: werkzeug hash method including its cost,
+        e.g. "scrypt:32768:8:1" or "pbkdf2:sha256:600000".
+    :param workers: Pool size; defaults to the CPU count. 0 hashes inline.
+    :param max_pending: Hashes queued or running at once before new ones are rejected.
+    """
+
+    def __init__(self, method:str="scrypt", salt_length:int=16, workers:int=None, max_pending:int=64) -> None:
+        self.method = method
+        self.salt_length = salt_length
+        self.workers = os.cpu_count() if workers is None else workers
+        self.max_pending = max_pending
+
+        self._signature = None
+        self._pool = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def __repr__(self): return f"{self.__class__.__name__}: {self.method} ({self.workers} workers, {self._pending} pending)"
+
+    @property
+    def signature(self) -> str:
+        """The method string werkzeug writes into hashes, with default parameters filled in."""
+
+        if self._signature is None:
+            self._signature = generate_password_hash("", method=self.method, salt_length=1).split("$", 1)[0]
+        return self._signature
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def _run(self, func, *args):
+        if not self.workers:
+            return func(*args)
+
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise HashingOverloaded(f"{self._pending} password hashes already pending.")
+            self._pending += 1
+        try:
+            return self.pool.submit(func, *args).result()
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def hash(self, password:str) -> str:
+        return self._run(generate_password_hash, password, self.method, self.salt_length)
+
+    def verify(self, pwhash:str, password:str) -> bool:
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash:str) -> bool:
+        """Whether `pwhash` was made with a different method or cost than the configured one."""
+        return pwhash.split("$", 1)[0] != self.signature
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "method": self.signature,
+            "workers": self.workers,
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+        }
@@ -1,27 +1,63 @@
 from abc import ABCMeta
+from array import array
+import base64
 import click
+from contextlib import contextmanager
+import csv
+import datetime
+import functools
+import gzip
+from itertools import chain, count, groupby, islice
+import json
+from math import nan
 import os
+import re
+import shutil
 import sqlite3
+import threading
+import time
+from urllib.parse import quote
 from flask import current_app, Flask, g
 from flask.cli import with_appcontext
 from werkzeug.security import generate_password_hash
 
+from lorekeeper.lorekeeper.advisor import IndexAdvisor
+from lorekeeper.lorekeeper.cache import ResultCache
+from lorekeeper.lorekeeper.catalog import SchemaCatalog, TableInfo
 from lorekeeper.lorekeeper.consts import *
-from lorekeeper.lorekeeper.models import Row, Table, User, Model
+from lorekeeper.lorekeeper.models import Record, Table, User, Model, model_for
+from lorekeeper.lorekeeper.pool import ConnectionPool
+from lorekeeper.lorekeeper.profiler import QueryProfiler
+from lorekeeper.lorekeeper.query import StatementCache
+from lorekeeper.lorekeeper.writer import WriteBehind
+
+try:
+    import numpy
+except ImportError:  # optional; columnar selects fall back to array.array
+    numpy = None
 
 
 class Join(object):
+    """
+    A LEFT JOIN of `select` (a table, or a subquery) AS `alias`
+        ON `alias`.`on_col` = `from_table`.`from_col`,
+    where `from_table` defaults to the selected table and `from_col` to `on_col`.
+    """
+
     def __init__(self, select, *args, **kwargs):
         if isinstance(select, dict):
             self._init(**select)
         else:
             self._init(select, *args, **kwargs)
     
-    def _init(self, select, col=None, alias=None, on_col=None, from_col=None):
+    def _init(self, select, col=None, alias=None, on_col=None, from_col=None, from_table=None):
         self.select = select
         self.alias = alias or select
         self.on_col = on_col or col or f"{alias or select}_id"
-        self.from_col = from_col or col
+        self.from_col = from_col or col or self.on_col
+        self.from_table = from_table
+
+    def __repr__(self): return f"{self.__class__.__name__}: {self.alias}"
 
     def __iter__(self): return iter(self.to_dict().items())
 
@@ -31,19 +67,57 @@ class Join(object):
             "alias": self.alias,
             "on_col": self.on_col,
             "from_col": self.from_col,
+            "from_table": self.from_table,
         }
 
+    @property
+    def is_table(self) -> bool:
+        """Whether `select` names a table (joined directly) rather than a subquery."""
+        return re.fullmatch(r"[\w.]+", self.select) is not None
+
 
 class LoreKeeper(metaclass=ABCMeta):
     
-    #? maybe a dict of databases?
-    def __init__(self, db_name:str=None):
-        self.db_name = db_name
+    def __init__(self, db_name=None, statement_cache_size:int=256, result_cache:ResultCache=None,
+            profiler:QueryProfiler=None, advisor:IndexAdvisor=None, indexes:dict=None, row_counts:list=None):
+        """
+        :param db_name: Config key of the database file, or a dict of databases:
+            "primary": config key of the database that takes writes,
+            "replicas": {name: config key} (or a list of config keys) of read-only copies serving selects,
+            "attach": {schema: config key} of databases ATTACHed read-only, queried as `schema.table`,
+            "immutable": whether replicas are opened with `immutable=1` (default False).
+        :param result_cache: Where `cache=` selects are kept; in memory by default.
+        :param profiler: Records every statement if given (or if `Config.PROFILE` is set at `init_app`).
+        :param advisor: Records filtered and joined columns if given (or if `Config.ADVISE_INDEXES` is set).
+        :param indexes: {table: [columns, ...]} of indexes `init-db` creates; by default `user.user_val`.
+        :param row_counts: Tables `init-db` keeps row counters for (see `track_counts`); none by default,
+            since every insert and delete on a counted table also writes its counter row.
+        """
+
+        databases = db_name if isinstance(db_name, dict) else {PRIMARY: db_name}
+        replicas = databases.get("replicas") or {}
+
+        self.db_name = databases.get(PRIMARY)
+        self.replicas = replicas if isinstance(replicas, dict) else {key: key for key in replicas}
+        self.attached = dict(databases.get("attach") or {})
+        self.immutable_replicas = databases.get("immutable", False)
+        self._replica_counter = count()
         self._db = None
+        self._statements = StatementCache(statement_cache_size)
+        self._catalog = SchemaCatalog(on_invalidate=self._schema_changed)
+        self._pools = {}
+        self._pools_lock = threading.Lock()
+        self._write_hooks = [self._evict_results]
+        self.result_cache = result_cache or ResultCache()
+        self.profiler = profiler
+        self.advisor = advisor
+        self.write_behind = None
+        self.indexes = {Tables.USER: [(USER_VAL,)]} if indexes is None else indexes
+        self.row_counts = list(row_counts or [])
         self._table_map = {
             Tables.USER: User
         }
-        self._tables = None
+        self._generated = set()
         self._paths = None
         self._url_map = None
 
@@ -64,119 +138,572 @@ class LoreKeeper(metaclass=ABCMeta):
 
     @property
     def tables(self) -> list:
-        if not self._tables:
-            self._tables = self.select("sqlite_master", columns=["name"], where={"type": "table"}, datatype=Table)
-            # def get_tables(self) -> list:
-        self.select(table='sqlite_master')
+        return [self.get_table(name) for name in self.catalog.tables(self.db)]
 
-        tables = self.db.execute("SELECT name FROM sqlite_master WHERE type='table';").fetchall()
-        tables = [Table(table['name'], db) for table in tables[1:]]
+    @property
+    def catalog(self) -> SchemaCatalog:
+        """Schema metadata shared across requests; refreshed when the schema version changes."""
+        return self._catalog
 
-        return tables
+    def table_info(self, table:str) -> TableInfo:
+        """Columns, types, primary key and indexes of `table`, from the schema catalog."""
+        return self.catalog.table(self.db, table)
 
     @property  # TODO: does this need to be a property?
     def table_map(self) -> dict:
         return self._table_map
 
+    def _datatype(self, table:str, datatype):
+        """
+        Resolves the Model class to hydrate `table` rows into: `datatype`, unless it is `Model` itself,
+        in which case the `table_map` entry if any, else a model generated from the schema.
+        """
+
+        if datatype is not Model:
+            return datatype or None
+
+        try:
+            return self._table_map[table]
+        except KeyError:
+            pass
+
+        if table in self.catalog.tables(self.db):
+            return self.register_model(table)
+
+        return datatype
+
+    def register_model(self, table:str) -> type:
+        """Generates a Model subclass from `table`'s schema and maps `table` to it."""
+
+        model = self._table_map[table] = model_for(self.table_info(table))
+        self._generated.add(table)
+
+        return model
+
+    def generate_models(self) -> dict:
+        """Registers a generated Model for every table without one. Returns `table_map`."""
+
+        for table in self.catalog.tables(self.db):
+            if table not in self._table_map:
+                self.register_model(table)
+
+        return self._table_map
+
+    def _schema_changed(self) -> None:
+        self._statements.clear()
+        self.result_cache.clear()
+        for table in self._generated:
+            self._table_map.pop(table, None)
+        self._generated.clear()
+
+    @classmethod
+    def _hydrate(cls, cursor:sqlite3.Cursor, rows:list, datatype) -> list:
+        """Converts `rows` to `datatype` with the compiled hydrator for `cursor`'s column layout."""
+        return cls._hydrate_columns(cls._description(cursor), rows, datatype)
+
+    @staticmethod
+    def _hydrate_columns(columns:tuple, rows:list, datatype) -> list:
+        hydrate = datatype.hydrator(columns)
+        return [hydrate(row) for row in rows]
+
+    @staticmethod
+    def _description(cursor:sqlite3.Cursor) -> tuple:
+        return tuple(col[0] for col in cursor.description) if cursor.description else ()
+
+    @property
+    def pool(self) -> ConnectionPool:
+        """The connection pool for the current app's primary database, created on first use."""
+        return self._get_pool(current_app.config[self.db_name])
+
+    def replica_pool(self, name:str) -> ConnectionPool:
+        return self._get_pool(self._replica_uri(current_app.config[self.replicas[name]]), readonly=True)
+
+    def _replica_uri(self, path:str) -> str:
+        return f"file:{quote(path)}?mode=ro" + ("&immutable=1" if self.immutable_replicas else "")
+
+    def _get_pool(self, database:str, readonly:bool=False) -> ConnectionPool:
+        try:
+            return self._pools[database]
+        except KeyError:
+            with self._pools_lock:
+                if database not in self._pools:
+                    self._pools[database] = self._make_pool(database, readonly)
+            return self._pools[database]
+
+    def _make_pool(self, database:str, readonly:bool=False) -> ConnectionPool:
+        config = current_app.config
+        attach = {schema: f"file:{quote(config[key])}?mode=ro" for schema, key in self.attached.items()}
+
+        return ConnectionPool(
+            database,
+            size=config.get(Config.POOL_SIZE, 5),
+            profile="readonly" if readonly else config.get(Config.PRAGMA_PROFILE, "wal"),
+            pragmas=None if readonly else config.get(Config.PRAGMAS),
+            timeout=config.get(Config.POOL_TIMEOUT, 5.0),
+            row_factory=Record.factory,
+            on_connect=functools.partial(self._attach, attach) if attach else None,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            cached_statements=self.statements.maxsize,
+            uri=True
+        )
+
+    @staticmethod
+    def _attach(databases:dict, db:sqlite3.Connection) -> None:
+        for schema, uri in databases.items():
+            db.execute(f"ATTACH DATABASE ? AS `{schema}`", (uri,))
+
+    @property
+    def pool_stats(self) -> dict:
+        return {database: pool.stats for database, pool in self._pools.items()}
+
     @property
     def db(self) -> sqlite3.Connection:
+        """The connection checked out of the pool for this app context."""
+
         if 'db' not in g:
-            g.db = sqlite3.connect(
-                current_app.config[self.db_name],
-                detect_types=sqlite3.PARSE_DECLTYPES
-            )
-            g.db.row_factory = Row
+            g.db_pool = self.pool
+            g.db = g.db_pool.checkout()
+            self.catalog.validate(g.db)
 
         return g.db
 
-    def fetch_all(self, query) -> list:  # TODO huh?
+    @property
+    def replica_db(self) -> sqlite3.Connection:
+        """
+        The replica connection for this app context, taken from the replicas in turn;
+            the primary connection if no replicas are configured.
+        """
+
+        if not self.replicas:
+            return self.db
+
+        if 'db_replica' not in g:
+            names = list(self.replicas)
+            g.db_replica_pool = self.replica_pool(names[next(self._replica_counter) % len(names)])
+            g.db_replica = g.db_replica_pool.checkout()
+
+        return g.db_replica
+
+    def route(self, operation:str, table:str=None) -> str:
+        """
+        Routing policy: which database (PRIMARY or REPLICA) serves `operation` on `table`.
+
+        Selects go to a replica, unless this app context is inside a transaction or has
+        already written (so it reads its own writes). Everything else goes to the primary.
+        Override to change the policy; pass `route=` to a select to override it per call.
+        """
+
+        if operation == SELECT and self.replicas and not g.get('db_transaction') and not g.get('db_wrote'):
+            return REPLICA
+        return PRIMARY
+
+    def _reader(self, table:str=None, route:str=None) -> sqlite3.Connection:
+        """The connection a select on `table` is routed to."""
+        return self.replica_db if (route or self.route(SELECT, table)) == REPLICA else self.db
+
+    def refresh_replica(self, name:str=None, pages:int=1024, sleep:float=0.0) -> None:
+        """
+        Copies the primary into replica `name` (every replica if None) with the online backup API,
+        `pages` pages per step with `sleep` seconds in between so writers aren't held up
+        (from one read snapshot in WAL mode, as `backup` does).
+
+        The copy is written next to the replica and swapped in atomically: connections already
+        reading the old copy keep serving from it, and the replica's pool is replaced so new
+        checkouts see the new copy. Also creates replicas that don't exist yet.
+        """
+
+        for name in ([name] if name else list(self.replicas)):
+            path = current_app.config[self.replicas[name]]
+            tmp = f"{path}.refresh"
+
+            target = sqlite3.connect(tmp)
+            try:
+                self._backup_into(target, pages, sleep)
+                target.execute("PRAGMA journal_mode = DELETE")  # read-only copies need no WAL
+            finally:
+                target.close()
+            os.replace(tmp, path)
+
+            with self._pools_lock:
+                pool = self._pools.pop(self._replica_uri(path), None)
+            if pool:
+                pool.close()
+
+    def backup(self, path:str, pages:int=1024, sleep:float=0.01, compress:bool=False, vacuum:bool=False,
+            verify:bool=True, progress=None) -> dict:
+        """
+        Copies the primary database to `path` while it stays online.
+
+        Uses the online backup API, `pages` pages per step with `sleep` seconds between steps
+        so writers keep getting the lock. In WAL mode the copy reads one snapshot throughout,
+        instead of restarting every time another connection commits; checkpoints can't get
+        past that snapshot until the copy is done.
+        With `vacuum`, the copy is a compacted VACUUM INTO instead, made in a single step.
+
+        The copy is written next to `path` and only moved there once complete (and verified).
+
+        :param compress: gzip the copy.
+        :param verify: Run PRAGMA integrity_check on the copy; raises sqlite3.DatabaseError if it fails.
+        :param progress: Called as progress(remaining pages, total pages) after each step.
+        :return: {"path", "pages", "bytes", "seconds"}
+        """
+
+        start = time.perf_counter()
+        tmp = f"{path}.tmp"
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+        if vacuum:
+            source = sqlite3.connect(current_app.config[self.db_name], uri=True, isolation_level=None)
+            try:
+                source.execute("VACUUM INTO ?", (tmp,))
+            finally:
+                source.close()
+        else:
+            target = sqlite3.connect(tmp)
+            try:
+                self._backup_into(target, pages, sleep, progress)
+                target.execute("PRAGMA journal_mode = DELETE")  # a standalone file, without a -wal
+            finally:
+                target.close()
+
+        copy = sqlite3.connect(tmp)
+        try:
+            page_count = copy.execute("PRAGMA page_count").fetchone()[0]
+            check = copy.execute("PRAGMA integrity_check").fetchall() if verify else [("ok",)]
+        finally:
+            copy.close()
+        if check != [("ok",)]:
+            os.remove(tmp)
+            raise sqlite3.DatabaseError(f"Backup failed its integrity check: {'; '.join(row[0] for row in check[:5])}")
+        if vacuum and progress:
+            progress(0, page_count)
+
+        if compress:
+            with open(tmp, "rb") as f, gzip.open(f"{tmp}.gz", "wb") as out:
+                shutil.copyfileobj(f, out, 1 << 20)
+            os.remove(tmp)
+            tmp = f"{tmp}.gz"
+        os.replace(tmp, path)
+
+        return {"path": path, "pages": page_count, "bytes": os.path.getsize(path), "seconds": time.perf_counter() - start}
+
+    def _backup_into(self, target:sqlite3.Connection, pages:int, sleep:float, progress=None) -> None:
+        """
+        Copies the primary into `target` with the online backup API, over a dedicated connection.
+        `Connection.backup`'s own `sleep` only applies when the source is busy, so steps are paced here instead.
+        """
+
+        source = sqlite3.connect(current_app.config[self.db_name], uri=True, isolation_level=None)
+        try:
+            def step(status, remaining, total):
+                if progress:
+                    progress(remaining, total)
+                if remaining and sleep:
+                    time.sleep(sleep)
+
+            snapshot = source.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+            if snapshot:
+                source.execute("BEGIN")
+                source.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()  # opens the read transaction
+            try:
+                source.backup(target, pages=pages, progress=step)
+            finally:
+                if snapshot:
+                    source.execute("COMMIT")
+        finally:
+            source.close()
+
+    def restore(self, path:str, pages:int=-1, progress=None) -> dict:
+        """
+        Replaces the primary database's contents with the backup at `path` (gzipped or not),
+        once the backup passes PRAGMA integrity_check (else raises sqlite3.DatabaseError).
+
+        Writes the backup through the online backup API, all at once by default (`pages` per step otherwise),
+        so open connections stay valid and see the restored data.
+
+        :param progress: Called as progress(remaining pages, total pages) after each step.
+        :return: {"path", "pages", "seconds"}
+        """
+
+        start = time.perf_counter()
+        database = current_app.config[self.db_name]
+
+        with open(path, "rb") as f:
+            compressed = f.read(2) == b"\x1f\x8b"
+        source_path = path
+        if compressed:
+            source_path = f"{database}.restore"
+            with gzip.open(path, "rb") as f, open(source_path, "wb") as out:
+                shutil.copyfileobj(f, out, 1 << 20)
+
+        try:
+            source = sqlite3.connect(f"file:{quote(source_path)}?mode=ro", uri=True)
+            try:
+                check = source.execute("PRAGMA integrity_check").fetchall()
+                if check != [("ok",)]:
+                    raise sqlite3.DatabaseError(f"{path} failed its integrity check: {'; '.join(row[0] for row in check[:5])}")
+                page_count = source.execute("PRAGMA page_count").fetchone()[0]
+
+                target = sqlite3.connect(database, uri=True)
+                try:
+                    source.backup(target, pages=pages,
+                        progress=(lambda status, remaining, total: progress(remaining, total)) if progress else None)
+                finally:
+                    target.close()
+            finally:
+                source.close()
+        finally:
+            if compressed:
+                os.remove(source_path)
+
+        self.catalog.invalidate()
+        self._written(None)
+
+        return {"path": path, "pages": page_count, "seconds": time.perf_counter() - start}
+
+    @contextmanager
+    def transaction(self, mode:str="DEFERRED"):
+        """
+        Groups every write inside the block into one transaction:
+        commits on exit, rolls back if the block raises.
+
+        Nested blocks become SAVEPOINTs, so an inner failure only undoes the inner block.
+        Outside of a block, writes keep committing immediately.
+
+        :param mode: DEFERRED, IMMEDIATE or EXCLUSIVE (outermost block only).
+        """
+
+        mode = mode.upper()
+        if mode not in ("DEFERRED", "IMMEDIATE", "EXCLUSIVE"):
+            raise ValueError(f"Unknown transaction mode '{mode}'.")
+
+        db = self.db
+        depth = g.get('db_transaction', 0)
+        savepoint = f"lorekeeper_{depth}"
+
+        if depth:
+            db.execute(f"SAVEPOINT {savepoint}")
+        elif not db.in_transaction:
+            db.execute(f"BEGIN {mode}")
+        g.db_transaction = depth + 1
+
+        try:
+            yield db
+        except BaseException:
+            if depth:
+                db.execute(f"ROLLBACK TO {savepoint}")
+                db.execute(f"RELEASE {savepoint}")
+            else:
+                db.rollback()
+            raise
+        else:
+            if depth:
+                db.execute(f"RELEASE {savepoint}")
+            else:
+                db.commit()
+                # entries cached (results, users, ...) by other connections mid-transaction still hold the old rows
+                for table in g.pop('db_tx_written', ()):
+                    for hook in self._write_hooks:
+                        hook(table)
+        finally:
+            g.db_transaction = depth
+            if not depth:
+                g.pop('db_tx_written', None)
+
+    @property
+    def in_transaction(self) -> bool:
+        """Whether a `transaction` block is open in this app context."""
+        return bool(g.get('db_transaction'))
+
+    def _commit(self) -> None:
+        """Commits, unless inside a `transaction` block (which commits on exit)."""
+
+        if not g.get('db_transaction'):
+            self.db.commit()
+
+    def _execute(self, db:sqlite3.Connection, query:str, params=(), fetch:bool=False, many:bool=False):
+        """
+        Runs `query` on `db`, through `profiler` if one is set.
+
+        :param fetch: Return (cursor, all rows) instead of the cursor.
+        :param many: `executemany` over `params`.
+        """
+
+        if self.profiler is None:
+            cursor = db.executemany(query, params) if many else db.execute(query, params)
+            return (cursor, cursor.fetchall()) if fetch else cursor
+
+        return self.profiler.execute(db, query, params, fetch, many)
+
+    def fetch_all(self, query, route:str=None) -> list:  # TODO huh?
         """
         """
 
-        results = self.db.execute(query).fetchall()
+        _, results = self._execute(self._reader(route=route), query, fetch=True)
 
         return results
 
-    def run_query(self, query:str, datatype=None) -> list:
+    def run_query(self, query:str, datatype=None, route:str=None, cache=False) -> list:
         """
         If a SELECT statement, runs the query and
             if `datatype` converts the results to the datatype provided
             else returns a list of Row objects
         else, runs the query and commits to database.
+
+        :param cache: See `select`.
         """
 
         results = None
         directive = query.split()[0]
 
         if directive.upper() == SELECT:
-            results = self.db.execute(query).fetchall()
+            columns, results = self._fetch(query, (), route=route, cache=cache)
 
             if datatype:
-                results = [datatype.from_row(result) for result in results]
+                results = self._hydrate_columns(columns, results, datatype)
         
         else:
-            self.db.execute(query)
-            self.db.commit()
+            self._execute(self.db, query)
+            self._commit()
+            self.catalog.validate(self.db)
+            self._written(self._write_target(query))
 
         return results
 
-    #TODO: somehow connect joining on the same table multiples times to the select columns
+    # ==========================================================================================
+    # write hooks
+
+    _write_pattern = re.compile(
+        r"^\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM)\s+[`\"\[]?([\w.]+)",
+        re.IGNORECASE
+    )
+
     @classmethod
-    def _join(cls, from_table:str, joins:list=[]) -> str:
+    def _write_target(cls, query:str) -> str:
+        """The table written by an INSERT/UPDATE/DELETE `query`, or None if it can't be told."""
+
+        match = cls._write_pattern.match(query)
+        return match.group(1) if match else None
+
+    def on_write(self, hook) -> None:
         """
-        Creates a left join clause for each table-column pair in `joins`.
+        Registers `hook(table)` to be called after every write through this LoreKeeper,
+        and again once the enclosing `transaction` (or write-behind group) commits.
+        `table` is None when the written table is unknown (e.g. DDL via `run_query`).
         """
 
-        # JOIN = ""
-        # result = []
-        # for idx, join in enumerate(joins):
-        #     if isinstance(join, str):
-        #         result.append(f"LEFT JOIN {join} AS {join}{idx} ON {join}{idx}.{join}_id = {from_table}.{join}_id")
-        #     elif isinstance(join, dict):
-        #         result.append(
-        #             f"LEFT JOIN {select} AS {alias} ON {alias}.{on_col} = {from_table}.{from_col}".format(**join))
-        # JOIN = "\t\n".join(result)
+        self._write_hooks.append(hook)
 
-        # return JOIN
+    def _written(self, table:str) -> None:
+        g.db_wrote = True
+        if g.get('db_transaction'):
+            g.setdefault('db_tx_written', set()).add(table)
+        for hook in self._write_hooks:
+            hook(table)
 
-        ###
-        JOIN = ""
-        if isinstance(joins, str):
-            JOIN = f"LEFT JOIN {joins} AS {joins} ON {joins}.{joins}_id = {from_table}.{joins}_id"
-        elif isinstance(joins, (dict, Join)):
-            JOIN = "LEFT JOIN ({select}) AS {alias} ON {alias}.{on_col} = {from_table}.{from_col}".format(**dict(joins), from_table=from_table)
-        elif cls._is_iter(joins):
-            JOIN = "\t\n".join([cls._join(from_table, joins) for join in joins])
+    def _behind(self) -> bool:
+        """
+        Whether a write should be queued on `write_behind` (set it, or `Config.WRITE_BEHIND` at `init_app`),
+        in which case the write methods return its Future instead of their result.
+        Writes on the writer thread itself, or inside a `transaction` block, run synchronously.
+        """
+
+        return self.write_behind is not None and not self.write_behind.is_writer and not g.get('db_transaction')
 
-        ####
+    def _evict_results(self, table:str) -> None:
+        self.result_cache.invalidate(table)
 
-        # JOIN = ""
-        # if join:
-        #     joins = []
-        #     if isinstance(join, dict):
-        #         for idx, (table, on) in enumerate(join.items()):
-        #             joins.append(f"LEFT JOIN {table} AS {table}{idx} ON {table}{idx}.{on} = {from_table}.{on}")
-        #     elif cls._is_iter(join):
-        #         for idx, table in enumerate(join):
-        #             joins.append(f"LEFT JOIN {table} AS {table}{idx} ON {table}{idx}.{table}_id = {from_table}.{table}_id")
-        #         raise NotImplementedError("Table names are plural; default id columns are singular.") #TODO
+    # ==========================================================================================
+    # reads
 
-        #     JOIN = "\t\n".join(joins)
+    def _fetch(self, SELECT:str, params, table:str=None, route:str=None, cache=False) -> tuple:
+        """
+        Runs `SELECT`, or serves it from the result cache if `cache` (True, or a TTL in seconds).
+        Reads inside a transaction bypass the cache, since they may see uncommitted rows.
 
-        return JOIN
+        :return: (column names, rows)
+        """
+
+        if cache is False or cache is None or g.get('db_transaction'):
+            cursor, rows = self._execute(self._reader(table, route), SELECT, params, fetch=True)
+            return self._description(cursor), rows
+
+        result = self.result_cache.get(SELECT, params)
+        if result is ResultCache._missing:
+            generation = self.result_cache.generation(SELECT)
+            cursor, rows = self._execute(self._reader(table, route), SELECT, params, fetch=True)
+            result = self._description(cursor), rows
+            self.result_cache.set(SELECT, params, result, ttl=None if cache is True else cache, generation=generation)
+            return result
+
+        # a fresh list, so callers can't mutate the cached one
+        return result[0], list(result[1])
+
+    @classmethod
+    def _joins(cls, from_table:str, joins) -> list:
+        """
+        Normalizes `joins` (a table name, a `Join` or its dict, or a list of those) into
+        [(Join, alias)]. A table joined more than once, or onto itself, without an explicit
+        alias is numbered: `user`, then `user_2`, ...
+        """
+
+        result = []
+        taken = {cls._bare(from_table)}
+        for join in cls._as_joins(joins):
+            alias, idx = join.alias, 1
+            while alias in taken:
+                idx += 1
+                alias = f"{join.alias}_{idx}"
+            taken.add(alias)
+            result.append((join, alias))
+
+        return result
+
+    @staticmethod
+    def _as_joins(joins) -> list:
+        """[Join] from a table name, a `Join` or its dict, or a list of those."""
+
+        if not joins:
+            return []
+        if isinstance(joins, (str, dict, Join)):
+            joins = [joins]
+
+        return [join if isinstance(join, Join) else Join(join) for join in joins]
+
+    @classmethod
+    def _join(cls, from_table:str, joins=None) -> str:
+        """
+        Creates a LEFT JOIN clause for each join in `joins` (see `_joins`).
+        Tables are joined directly, so their indexes can serve the ON clause; subqueries are parenthesized.
+        """
+
+        JOIN = []
+        for join, alias in cls._joins(from_table, joins):
+            source = cls._quote(join.select) if join.is_table else f"({join.select})"
+            JOIN.append(f"LEFT JOIN {source} AS {alias} ON {alias}.{join.on_col} = {join.from_table or from_table}.{join.from_col}")
+
+        return "\t\n".join(JOIN)
 
     def _get_columns(self, table:str) -> list:
         """
-        Retrieves a list of `table` columns.
+        Retrieves a list of `table` columns from the schema catalog.
 
         :param table: Name of database table.
         :return: List of columns.
         """
 
-        cursor = self.db.execute(f"SELECT * FROM {table} LIMIT 0")
-        columns = [col[0] for col in cursor.description]
+        return self.table_info(table).columns
+
+    def _id_column(self, table:str) -> str:
+        """The single-column primary key of `table`, defaulting to `{table}_id`."""
 
-        return columns
+        try:
+            primary_key = self.table_info(table).primary_key
+        except KeyError:  # views, subqueries, unknown tables
+            primary_key = None
+
+        return primary_key[0] if primary_key and len(primary_key) == 1 else f"{self._bare(table)}_id"
 
     @classmethod
     def _columns(cls, columns) -> str:
@@ -197,11 +724,11 @@ class LoreKeeper(metaclass=ABCMeta):
                     for col in cols:
                         if isinstance(col, dict):
                             key, val = col.copy().popitem()
-                            col_list.append(f"`{table}`.{key} AS {val}")
+                            col_list.append(f"{cls._quote(table)}.{key} AS {val}")
                         else:
-                            col_list.append(f"`{table}`.{col}")
+                            col_list.append(f"{cls._quote(table)}.{col}")
                 else:
-                    col_list.append(f"`{table}`.{cols}")
+                    col_list.append(f"{cls._quote(table)}.{cols}")
             COLUMNS = ", ".join(col_list)
             #COLUMNS += ", ".join(f"`{table}`.{column}" for table, column in columns.items())
         elif cls._is_iter(columns):
@@ -210,84 +737,582 @@ class LoreKeeper(metaclass=ABCMeta):
         return COLUMNS
 
     @classmethod
-    def _where(cls, table:str, conditions, conjunction='AND'):
+    def _where(cls, table:str, conditions, conjunction='AND') -> tuple:
         """
-        
+        Compiles `conditions` into a WHERE clause with `?` placeholders.
+
+        :return: (clause, bind values)
         """
 
+        shape, params = cls._where_shape(table, conditions, conjunction)
+        WHERE = cls._render_where(table, shape)
+
+        return WHERE, params
+
+    @classmethod
+    def _where_shape(cls, table:str, conditions, conjunction='AND') -> tuple:
+        """
+        Splits `conditions` into a hashable shape and the values to bind against it.
+        Two calls differing only in their values have the same shape.
+
+        :return: (shape, bind values)
+        """
+
+        params = []
+        shape = cls._shape_where(table, conditions, conjunction, params)
+
+        return shape, params
+
+    @classmethod
+    def _shape_where(cls, table:str, conditions, conjunction:str, params:list):
         comparators = ('=', '!=', '>', '>=', '<', '<=', ' IS ', ' IS NOT ', ' IN ')
         conjunctions = (' AND ', ' OR ', ' NOT ')
 
-        WHERE = ""
-        if isinstance(conditions, (int, str)):
+        shape = None
+        if isinstance(conditions, int):
+            # assumes `conditions` must be an id: 42 -> "`{table}`.{table}_id = ?"
+            params.append(conditions)
+            shape = (ID,)
+
+        elif isinstance(conditions, str):
             try:
-                # assumes `conditions` must be an id: "42" -> "`{table}`.{table}_id = 42"
-                WHERE = f"`{table}`.{table}_id = {int(conditions)}"  
+                params.append(int(conditions))
+                shape = (ID,)
             except ValueError:
                 if cls._contains(conditions, comparators):
-                    WHERE = conditions
+                    shape = ("raw", conditions)
                 else:
-                    # or maybe a val: "Picard" -> "table_val = 'Picard'"
-                    WHERE = f"`{table}`.{table}_val = '{conditions}'"  
-            except TypeError:
-                print("Somethin's up!")
-                raise TypeError
+                    # or maybe a val: "Picard" -> "`{table}`.{table}_val = ?"
+                    params.append(conditions)
+                    shape = (VAL,)
 
         elif isinstance(conditions, dict):
             temp = []
             for key, val in conditions.items():
                 if key in conjunctions:
-                    temp.append(cls._where(table, val, conjunction=key))
+                    temp.append(cls._shape_where(table, val, key.strip(), params))
                 elif isinstance(key, tuple):
-                    temp.append(f"{key[0]} {val} {cls._coerce_type(key[1])}")
+                    # {(column, value): comparator}
+                    temp.append(("cmp", key[0], val, cls._bind(key[1], params)))
+                elif val is None:
+                    temp.append(("null", key))
                 else:
-                    temp.append(f"{key} = {cls._coerce_type(val)}")
+                    temp.append(("cmp", key, "=", cls._bind(val, params)))
 
-            WHERE = f" {conjunction} ".join(temp)
+            shape = ("group", conjunction, tuple(temp))
 
         elif isinstance(conditions, Model):
-            WHERE = cls._where(table=table, conditions=conditions.id or conditions.val)
+            shape = cls._shape_where(table, conditions.id or conditions.val, conjunction, params)
 
         elif cls._is_iter(conditions):
-            WHERE = f" {conjunction} ".join([cls._where(table, condition) for condition in conditions])
+            shape = ("group", conjunction, tuple(cls._shape_where(table, condition, 'AND', params) for condition in conditions))
+
+        return shape
+
+    @classmethod
+    def _bind(cls, val, params:list):
+        """
+        Appends `val` to `params`.
+        Collections are bound element-wise and their length becomes part of the shape.
+        """
+
+        if cls._is_iter(val) and not isinstance(val, (bytes, dict)):
+            val = list(val)
+            params.extend(val)
+            return len(val)
+
+        params.append(val)
+        return None
+
+    @classmethod
+    def _render_where(cls, table:str, shape, id_column:str=None) -> str:
+        kind = shape[0]
+        if kind == ID:
+            WHERE = f"{cls._quote(table)}.{id_column or f'{cls._bare(table)}_id'} = ?"
+        elif kind == VAL:
+            WHERE = f"{cls._quote(table)}.{cls._bare(table)}_val = ?"
+        elif kind == "raw":
+            WHERE = shape[1]
+        elif kind == "null":
+            WHERE = f"{shape[1]} IS NULL"
+        elif kind == "cmp":
+            _, column, comparator, size = shape
+            placeholder = "?" if size is None else f"({', '.join('?' * size)})"
+            WHERE = f"{column} {comparator.strip()} {placeholder}"
+        else:  # group
+            _, conjunction, children = shape
+            clauses = []
+            for child in children:
+                clause = cls._render_where(table, child, id_column)
+                if child[0] == "group" and len(child[2]) > 1:
+                    clause = f"({clause})"
+                clauses.append(clause)
+            WHERE = f" {conjunction} ".join(clauses)
 
         return WHERE
 
-    def _select(self, table:str, columns='*', join=None, where=None, datatype=None) ->list:
-        SELECT = "SELECT {COLUMNS} FROM `{TABLE}` {JOIN} {WHERE}" \
-            .format(
-                COLUMNS=self._columns(columns),
-                TABLE=table,
-                JOIN=self._join(table, join),
-                WHERE=f"WHERE {self._where(table, where)}" if where else ""
-            )
+    @classmethod
+    def _freeze(cls, obj):
+        """Converts `columns`/`join` arguments into a hashable cache key."""
 
-        return SELECT.strip()
+        if isinstance(obj, (str, int, float, type(None))):
+            return obj
+        elif isinstance(obj, Join):
+            return (Join, cls._freeze(obj.to_dict()))
+        elif isinstance(obj, dict):
+            return (dict, tuple((key, cls._freeze(val)) for key, val in obj.items()))
+        elif cls._is_iter(obj):
+            return tuple(cls._freeze(elem) for elem in obj)
 
-    def select(self, table:str, columns='*', join=None, where=None, datatype=None) -> list:
-        """SELECT `columns` FROM `table` [LEFT JOIN `join`] [WHERE `where`]"""
+        return obj
 
-        SELECT = self._select(table, columns, join, where, datatype)
+    @property
+    def statements(self) -> StatementCache:
+        return self._statements
 
-        results = self.db.execute(SELECT).fetchall()
-        if datatype:
-            datatype = self.table_map.get(table, datatype)
-            results = [datatype.from_row(result) for result in results]
+    def _select(self, table:str, columns='*', join=None, where=None, datatype=None, limit:int=None,
+            order_by=None, offset:int=None, after:list=None, route:str=None) -> tuple:
+        """
+        Compiles a SELECT statement, reusing the cached template for its shape.
+
+        :param after: Values of the `order_by` columns to seek past (keyset pagination).
+        :param route: Where the statement will run; the advisor explains it on that connection.
+        :return: (SELECT, bind values)
+        """
+
+        where_shape, params = self._where_shape(table, where) if where else (None, [])
+        order = self._order_by(order_by)
+        key = ("SELECT", table, self._freeze(columns), self._freeze(join), where_shape,
+            limit is not None, order, offset is not None, after is not None)
+
+        def compile_select():
+            clauses = []
+            if where_shape:
+                clause = self._render_where(table, where_shape, self._id_column(table))
+                clauses.append(f"({clause})" if after is not None and where_shape[0] == "group" else clause)
+            if after is not None:
+                clauses.append(self._render_seek(order))
+
+            return "SELECT {COLUMNS} FROM {TABLE} {JOIN} {WHERE} {ORDER} {LIMIT}" \
+                .format(
+                    COLUMNS=self._columns(columns),
+                    TABLE=self._quote(table),
+                    JOIN=self._join(table, join),
+                    WHERE=f"WHERE {' AND '.join(clauses)}" if clauses else "",
+                    ORDER=f"ORDER BY {', '.join(f'{column} DESC' if desc else column for column, desc in order)}" if order else "",
+                    LIMIT=("LIMIT ?" if limit is not None else "LIMIT -1") + " OFFSET ?" if offset is not None
+                        else "LIMIT ?" if limit is not None else ""
+                ).strip()
+
+        SELECT = self.statements.get(key, compile_select)
+        if after is not None:
+            params.extend(self._seek_params(order, after))
+        if limit is not None:
+            params.append(limit)
+        if offset is not None:
+            params.append(offset)
+        if self.advisor is not None:
+            self.advisor.observe(self._reader(table, route), table, self._id_column(table), where_shape, join, SELECT, params)
+
+        return SELECT, params
+
+    def select(self, table:str, columns='*', join=None, where=None, datatype=None, layout:str="rows", route:str=None,
+            cache=False, order_by=None, limit:int=None, offset:int=None, load=None, prefetch=None):
+        """
+        SELECT `columns` FROM `table` [LEFT JOIN `join`] [WHERE `where`] [ORDER BY `order_by`] [LIMIT `limit` OFFSET `offset`]
+
+        :param order_by: A column or list of columns; "-column" or "column DESC" sorts descending.
+            Prefer `select_page` to a large `offset`, which still reads every skipped row.
+        :param layout: "rows" returns a list of rows (or `datatype` objects);
+            "columns" returns {column: values} with one contiguous typed array per numeric
+            column (a NumPy array if NumPy is installed, else `array.array`) and lists otherwise.
+        :param route: PRIMARY or REPLICA, overriding `self.route`.
+        :param cache: True, or a TTL in seconds, to serve repeated identical selects from `result_cache`
+            until a write through this LoreKeeper touches any table they read ("rows" layout only).
+        :param load: Joins (see `Join`) to load in the same statement, for to-one relations:
+            each result gets the joined row as a model (None if nothing matched) under the join's alias.
+        :param prefetch: Joins to load with one `IN (...)` query per relation, for to-many relations
+            (see `prefetch`): each result gets a list of models under the join's alias.
+            With `load` or `prefetch`, results are always models (`datatype` defaults to `Model`).
+        """
+
+        if load or prefetch:
+            datatype = datatype or Model
+        if load:
+            columns, join, loaded = self._eager(table, columns, join, load)
+
+        SELECT, params = self._select(table, columns, join, where, datatype, limit, order_by, offset, route=route)
+
+        if layout == "columns":
+            return self._select_columns(self._reader(table, route), table, SELECT, params)
+
+        description, results = self._fetch(SELECT, params, table, route, cache)
+        if load:
+            results = self._stitch(description, results, self._datatype(table, datatype), loaded)
+        elif datatype:
+            results = self._hydrate_columns(description, results, self._datatype(table, datatype))
+        if prefetch:
+            self.prefetch(results, prefetch, route=route)
 
         return results
 
+    def _eager(self, table:str, columns, join, load) -> tuple:
+        """
+        Appends the `load` joins to `join`, and their columns, as "`alias`.column", to `columns`.
+
+        :return: (columns, join, [(alias, model, column names)])
+        """
+
+        if isinstance(columns, str):
+            columns = [f"{self._quote(table)}.*" if columns == '*' else columns]
+        elif isinstance(columns, dict):
+            columns = [self._columns(columns)]
+
+        join = self._as_joins(join)
+        joins = self._joins(table, [*join, *self._as_joins(load)])
+
+        loaded = []
+        for item, alias in joins[len(join):]:
+            if not item.is_table:
+                raise ValueError(f"Only tables can be loaded, not {item.select!r}.")
+            names = tuple(self._get_columns(item.select))
+            columns = [*columns, *(f'{alias}.{column} AS "{alias}.{column}"' for column in names)]
+            loaded.append((alias, self._datatype(item.select, Model), names))
+
+        # explicit aliases, so the numbering `_join` repeats matches the columns above
+        return columns, [Join(**{**item.to_dict(), "alias": alias}) for item, alias in joins], loaded
+
+    @staticmethod
+    def _stitch(description:tuple, rows:list, datatype, loaded:list) -> list:
+        """Hydrates the leading columns of each row into `datatype` and each loaded join's columns into its model."""
+
+        split = start = len(description) - sum(len(names) for _, _, names in loaded)
+        hydrate = datatype.hydrator(description[:split])
+        slices = []
+        for alias, model, names in loaded:
+            slices.append((alias, model.hydrator(names), start, start + len(names)))
+            start += len(names)
+
+        results = []
+        for row in rows:
+            row = tuple(row)
+            obj = hydrate(row[:split])
+            related = obj.related
+            for alias, hydrate_child, begin, end in slices:
+                values = row[begin:end]
+                related[alias] = hydrate_child(values) if any(val is not None for val in values) else None
+            results.append(obj)
+
+        return results
+
+    def prefetch(self, parents:list, joins, route:str=None, chunk_size:int=500) -> list:
+        """
+        Loads the children of every model in `parents`, for each join in `joins`, with
+        one `SELECT ... WHERE on_col IN (...)` per `chunk_size` distinct `from_col` values
+        (instead of one query per parent), and stitches them on as lists: `parent.related[alias]`.
+
+        :param joins: Tables, `Join`s or their dicts, e.g. Join("note", alias="notes", on_col="user_id").
+        :return: `parents`
+        """
+
+        if not parents:
+            return parents
+
+        for join in self._as_joins(joins):
+            if not join.is_table:
+                raise ValueError(f"Only tables can be prefetched, not {join.select!r}.")
+
+            children = {}
+            keys = {parent[join.from_col] for parent in parents} - {None}
+            column = f"{self._quote(join.select)}.{join.on_col}"
+            datatype = self._datatype(join.select, Model)
+            for chunk in self._chunks(keys, chunk_size):
+                SELECT, params = self._select(join.select, where={(column, tuple(chunk)): "IN"}, route=route)
+                description, rows = self._fetch(SELECT, params, join.select, route)
+                key = description.index(join.on_col)
+                for row, obj in zip(rows, self._hydrate_columns(description, rows, datatype)):
+                    children.setdefault(row[key], []).append(obj)
+
+            for parent in parents:
+                parent.related[join.alias] = children.get(parent[join.from_col], [])
+
+        return parents
+
+    def iter_select(self, table:str, columns='*', join=None, where=None, datatype=None, chunk_size:int=500, route:str=None,
+            order_by=None, limit:int=None, offset:int=None):
+        """
+        Same as `select`, but returns a generator over the results that fetches
+        `chunk_size` rows at a time, so memory stays flat regardless of result size.
+
+        The statement is executed immediately; rows are fetched (and hydrated) as the
+        generator is consumed. Wrap it in `flask.stream_with_context` to stream a response,
+        since the connection goes back to the pool when the app context ends.
+        """
+
+        SELECT, params = self._select(table, columns, join, where, datatype, limit, order_by, offset, route=route)
+
+        cursor = self._execute(self._reader(table, route), SELECT, params)
+
+        return self._iter_cursor(cursor, self._datatype(table, datatype), chunk_size)
+
+    def select_page(self, table:str, order_by=None, after:str=None, size:int=50, columns='*', join=None, where=None,
+            datatype=None, route:str=None) -> tuple:
+        """
+        One page of `size` rows in `order_by` order, starting after the row `after` points to.
+
+        Pages seek past the previous page's last row instead of counting rows off with OFFSET,
+        so with an index on `order_by` every page costs the same as the first.
+        The primary key is appended to `order_by` as a tie-breaker unless already in it;
+        the ordering columns must be NOT NULL (a NULL never compares as "after" anything,
+        so the rows behind it would be skipped) and present in `columns`.
+
+        :param after: The cursor returned with the previous page, or None for the first page.
+        :return: (rows, cursor of the next page, or None after the last page)
+        :raises ValueError: if an ordering column is nullable, or `after` was made for a different ordering.
+        """
+
+        order = self._order_by(order_by)
+        id_column = self._id_column(table)
+        if not any(self._bare_column(column) == id_column for column, _ in order):
+            order = (*order, (f"{self._quote(table)}.{id_column}", order[-1][1] if order else False))
+        nullable = self._nullable_columns(table, join, order)
+        if nullable:
+            raise ValueError(f"Can't page by nullable column(s) {', '.join(nullable)}; declare them NOT NULL.")
+
+        values = self._decode_cursor(after, order) if after else None
+        SELECT, params = self._select(table, columns, join, where, datatype, size + 1, order, after=values, route=route)
+        description, rows = self._fetch(SELECT, params, table, route)
+
+        cursor = None
+        if len(rows) > size:
+            rows = rows[:size]
+            last = dict(zip(description, rows[-1])) if description else {}
+            try:
+                values = [last[self._bare_column(column)] for column, _ in order]
+            except KeyError as e:
+                raise ValueError(f"Ordering column {e} must be among the selected columns.") from None
+            if None in values:  # a column the schema check couldn't resolve, e.g. an expression
+                raise ValueError(f"Can't page past a NULL in {order[values.index(None)][0]}.")
+            cursor = self._encode_cursor(values, order)
+
+        if datatype:
+            rows = self._hydrate_columns(description, rows, self._datatype(table, datatype))
+
+        return rows, cursor
+
+    def _nullable_columns(self, table:str, join, order:tuple) -> list:
+        """The columns in `order` that the schema of `table` (or of a joined table) lets be NULL."""
+
+        tables = {self._bare(table): table}
+        tables.update((alias, item.select) for item, alias in self._joins(table, join) if item.is_table)
+
+        nullable = []
+        for column, _ in order:
+            prefix, _, name = re.sub(r"[`\"\[\]]", "", column).rpartition(".")
+            try:
+                info = self.table_info(tables.get(prefix or self._bare(table), prefix))
+            except KeyError:  # an alias, a view or a subquery
+                continue
+            if name in info and not info.notnull[name] and name != info.rowid_alias:
+                nullable.append(column)
+
+        return nullable
+
+    @staticmethod
+    def _order_by(order_by) -> tuple:
+        """Normalizes `order_by` into ((column, descending), ...)."""
+
+        if not order_by:
+            return ()
+        if isinstance(order_by, str) or (isinstance(order_by, tuple) and len(order_by) == 2 and isinstance(order_by[1], bool)):
+            order_by = [order_by]
+
+        order = []
+        for item in order_by:
+            if isinstance(item, tuple):
+                order.append(item)
+                continue
+
+            column, desc = item.strip(), False
+            if column.startswith("-"):
+                column, desc = column[1:], True
+            elif column.upper().endswith((" DESC", " ASC")):
+                column, direction = column.rsplit(None, 1)
+                desc = direction.upper() == "DESC"
+            if not re.fullmatch(r"[\w.`\"\[\]]+", column):
+                raise ValueError(f"Can't order by '{column}'.")
+            order.append((column, desc))
+
+        return tuple(order)
+
+    @staticmethod
+    def _bare_column(column:str) -> str:
+        return re.sub(r"[`\"\[\]]", "", column).rpartition(".")[2]
+
+    @staticmethod
+    def _render_seek(order:tuple) -> str:
+        """The predicate selecting rows after a given row in `order`."""
+
+        columns = [column for column, _ in order]
+        if len({desc for _, desc in order}) == 1:
+            # a row value comparison, which an index on the ordering columns serves directly
+            comparator = "<" if order[0][1] else ">"
+            if len(columns) == 1:
+                return f"{columns[0]} {comparator} ?"
+            return f"({', '.join(columns)}) {comparator} ({', '.join('?' * len(columns))})"
+
+        # mixed directions: (a > ?) OR (a = ? AND b < ?) OR ...
+        terms = []
+        for idx, (column, desc) in enumerate(order):
+            term = [f"{previous} = ?" for previous in columns[:idx]] + [f"{column} {'<' if desc else '>'} ?"]
+            terms.append(f"({' AND '.join(term)})")
+        return f"({' OR '.join(terms)})"
+
+    @staticmethod
+    def _seek_params(order:tuple, values:list) -> list:
+        if len({desc for _, desc in order}) == 1:
+            return list(values)
+        return [value for idx in range(len(order)) for value in values[:idx + 1]]
+
+    @staticmethod
+    def _encode_cursor(values:list, order:tuple) -> str:
+        payload = json.dumps([[LoreKeeper._cursor_value(value) for value in values],
+            [f"{'-' if desc else ''}{column}" for column, desc in order]], separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    @staticmethod
+    def _cursor_value(value):
+        """
+        `value` as JSON: dates and datetimes as the text sqlite3 stores them as
+        (which binds and compares like the stored column), bytes tagged and base64-encoded.
+        """
+
+        if isinstance(value, bytes):
+            return {"b64": base64.b64encode(value).decode("ascii")}
+        if isinstance(value, datetime.date):
+            return str(value)
+        return value
+
+    @staticmethod
+    def _decode_cursor(cursor:str, order:tuple) -> list:
+        """:raises ValueError: if `cursor` is malformed or was made for a different ordering."""
+
+        try:
+            values, signature = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+            values = [base64.b64decode(value["b64"]) if isinstance(value, dict) else value for value in values]
+        except (ValueError, TypeError, KeyError):
+            raise ValueError("Malformed page cursor.") from None
+        if signature != [f"{'-' if desc else ''}{column}" for column, desc in order] or len(values) != len(order):
+            raise ValueError("Page cursor doesn't match this ordering.")
+        return values
+
+    # typecodes by SQLite type affinity
+    _typecodes = (("INT", "q"), ("REAL", "d"), ("FLOA", "d"), ("DOUB", "d"))
+
+    def _select_columns(self, db:sqlite3.Connection, table:str, SELECT:str, params:list, chunk_size:int=10000) -> dict:
+        """
+        Runs `SELECT` and fills one buffer per column straight from chunked fetches.
+
+        Numeric columns (by declared type, or by their first values when the type is unknown)
+        go into `array.array`, with NULL as NaN; an integer column holding a NULL becomes a float column
+        (exact up to 2**53). A column holding anything else that doesn't fit degrades to a list.
+        """
+
+        start = time.perf_counter()
+        cursor = db.cursor()
+        cursor.row_factory = None
+        cursor.execute(SELECT, params)
+        names = [col[0] for col in cursor.description]
+
+        try:
+            declared = self.table_info(table).types
+        except KeyError:
+            declared = {}
+
+        buffers = None
+        count = 0
+        while rows := cursor.fetchmany(chunk_size):
+            count += len(rows)
+            values = list(zip(*rows))
+            if buffers is None:
+                buffers = [self._column_buffer(declared.get(name), col) for name, col in zip(names, values)]
+
+            for idx, col in enumerate(values):
+                buffer = buffers[idx]
+                if isinstance(buffer, array):
+                    size = len(buffer)
+                    try:
+                        buffer.extend(col)
+                        continue
+                    except TypeError:  # NULLs, text in a numeric column, ...
+                        del buffer[size:]
+
+                    if buffer.typecode == "q":
+                        buffer = buffers[idx] = array("d", buffer)
+                    if buffer.typecode == "d":
+                        try:
+                            buffer.extend(nan if val is None else val for val in col)
+                            continue
+                        except TypeError:
+                            del buffer[size:]
+                    buffer = buffers[idx] = buffer.tolist()
+                buffer.extend(col)
+        cursor.close()
+        if self.profiler is not None:
+            self.profiler.record(SELECT, time.perf_counter() - start, count)
+
+        if buffers is None:
+            buffers = [self._column_buffer(declared.get(name), ()) for name in names]
+
+        return {name: self._to_numpy(buffer) if numpy else buffer for name, buffer in zip(names, buffers)}
+
+    @classmethod
+    def _column_buffer(cls, decltype:str, values:tuple):
+        if decltype:
+            decltype = decltype.upper()
+            typecode = next((code for affinity, code in cls._typecodes if affinity in decltype), None)
+        elif not values:
+            typecode = None
+        elif all(isinstance(val, int) for val in values):
+            typecode = "q"
+        elif all(isinstance(val, (int, float)) for val in values):
+            typecode = "d"
+        else:
+            typecode = None
+
+        return array(typecode) if typecode else []
+
+    @staticmethod
+    def _to_numpy(buffer):
+        if isinstance(buffer, array):
+            return numpy.frombuffer(buffer, dtype=numpy.int64 if buffer.typecode == "q" else numpy.float64)
+        return numpy.array(buffer, dtype=object)
+
+    @classmethod
+    def _iter_cursor(cls, cursor:sqlite3.Cursor, datatype=None, chunk_size:int=500):
+        """Yields the rows of `cursor` via `fetchmany`, converted to `datatype` one batch at a time."""
+
+        try:
+            while rows := cursor.fetchmany(chunk_size):
+                if datatype:
+                    rows = cls._hydrate(cursor, rows, datatype)
+                yield from rows
+        finally:
+            cursor.close()
+
      #TODO: columns parameter 
     
     #? will probaly need to add validation
-    def select_one(self, table:str, where, columns:list='*', join=None, datatype=None):
-        """SELECT `columns` from `table` [LEFT JOIN `join`, ...] [`WHERE `where`] LIMIT 1"""
+    def select_one(self, table:str, where, columns:list='*', join=None, datatype=None, route:str=None, cache=False,
+            order_by=None):
+        """SELECT `columns` from `table` [LEFT JOIN `join`, ...] [`WHERE `where`] [ORDER BY `order_by`] LIMIT 1"""
 
-        SELECT = self._select(table, columns, join, where, datatype) + " LIMIT 1"
+        SELECT, params = self._select(table, columns, join, where, datatype, limit=1, order_by=order_by, route=route)
 
-        result = self.db.execute(SELECT).fetchone()
+        description, results = self._fetch(SELECT, params, table, route, cache)
+        result = results[0] if results else None
         if datatype and result:
-            datatype = self.table_map.get(table, datatype)
-            result = datatype.from_row(result)
+            result = self._hydrate_columns(description, [result], self._datatype(table, datatype))[0]
         
         return result
 
@@ -296,24 +1321,78 @@ class LoreKeeper(metaclass=ABCMeta):
         """
         INSERT INTO `table` VALUES (`values`)
         """
+
+        if self._behind():
+            return self.write_behind.submit(self.insert, table, values, datatype)
         
         if datatype:
             datatype = self.table_map.get(datatype, datatype)
             new_obj = datatype.from_dict(values)
             values = new_obj.to_dict()
 
-        cols = self._get_columns(table)[1:]  # TODO: intersection of table columns and values keys
-        INSERT = "INSERT INTO `{TABLE}` ({COLUMNS}) VALUES ({VALUES})".format(
-            TABLE=table,
-            COLUMNS=", ".join(cols),
-            VALUES=", ".join("?" * len(cols))
-        )
+        cols = self.table_info(table).insert_columns  # TODO: intersection of table columns and values keys
+        INSERT = self._insert(table, cols)
         
         if isinstance(values, dict):
             values = list(map(values.get, cols))  # [f"{values.get(key)}" for key in cols]
 
-        self.db.execute(INSERT, values)
-        self.db.commit()
+        self._execute(self.db, INSERT, values)
+        self._commit()
+        self._written(table)
+
+    def insert_many(self, table:str, rows, datatype=None, chunk_size:int=1000) -> tuple:
+        """
+        INSERT INTO `table` VALUES (`row`) for each row in `rows`, in a single transaction.
+
+        The column list is resolved once and rows are streamed through `executemany`
+        `chunk_size` at a time, so `rows` may be a generator of any length.
+
+        :param rows: Iterable of dicts (e.g. `Model.to_dict()`), Model instances or value sequences.
+        :return: (number of rows written, last rowid, or None if none were)
+        """
+
+        if self._behind():
+            return self.write_behind.submit(self.insert_many, table, rows, datatype, chunk_size)
+
+        if datatype:
+            datatype = self.table_map.get(datatype, datatype)
+
+        cols = self.table_info(table).insert_columns
+        INSERT = self._insert(table, cols)
+
+        def values():
+            for row in rows:
+                if isinstance(row, Model):
+                    row = row.to_dict()
+                elif datatype and isinstance(row, dict):
+                    row = datatype.from_dict(row).to_dict()
+
+                if isinstance(row, dict):
+                    row = list(map(row.get, cols))
+
+                yield row
+
+        count = 0
+        with self.transaction():  # commits once on success, rolls back everything on error
+            for chunk in self._chunks(values(), chunk_size):
+                self._execute(self.db, INSERT, chunk, many=True)
+                count += len(chunk)
+            if not count:  # last_insert_rowid() would be from an earlier insert
+                return 0, None
+            lastrowid = self.db.execute("SELECT last_insert_rowid() AS lastrowid").fetchone()["lastrowid"]
+
+        self._written(table)
+
+        return count, lastrowid
+
+    def _insert(self, table:str, cols:list) -> str:
+        """Compiles an INSERT statement for `cols`, reusing the cached template."""
+
+        return self.statements.get(("INSERT", table, tuple(cols)), lambda: "INSERT INTO {TABLE} ({COLUMNS}) VALUES ({VALUES})".format(
+            TABLE=self._quote(table),
+            COLUMNS=", ".join(cols),
+            VALUES=", ".join("?" * len(cols))
+        ))
 
     def update(self, table:str, values:dict, where:dict) -> None:
         """
@@ -322,41 +1401,389 @@ class LoreKeeper(metaclass=ABCMeta):
             WHERE `where`
         """
 
-        query = "UPDATE `{TABLE}` SET {SET} WHERE {WHERE}".format(
-            TABLE=table,
+        if self._behind():
+            return self.write_behind.submit(self.update, table, values, where)
+
+        where_shape, where_params = self._where_shape(table, where)
+        key = ("UPDATE", table, tuple(values.keys()), where_shape)
+
+        query = self.statements.get(key, lambda: "UPDATE {TABLE} SET {SET} WHERE {WHERE}".format(
+            TABLE=self._quote(table),
             SET=", ".join([f"{column}=?" for column in values.keys()]),
-            WHERE = self._where(table, where)
-        )
-        self.db.execute(query, list(values.values()))
-        self.db.commit()
+            WHERE=self._render_where(table, where_shape, self._id_column(table))
+        ))
+        params = [*values.values(), *where_params]
+        if self.advisor is not None:
+            self.advisor.observe(self.db, table, self._id_column(table), where_shape, None, query, params)
+        self._execute(self.db, query, params)
+        self._commit()
+        self._written(table)
 
     def delete(self, table:str, where:dict) -> None:
         """
         DELETE FROM `table` WHERE `where`;
         """
 
-        query = "DELETE FROM `{TABLE}` WHERE {WHERE};".format(
-            TABLE=table,
-            WHERE=self._where(table, where)
+        if self._behind():
+            return self.write_behind.submit(self.delete, table, where)
+
+        where_shape, params = self._where_shape(table, where)
+        key = ("DELETE", table, where_shape)
+
+        query = self.statements.get(key, lambda: "DELETE FROM {TABLE} WHERE {WHERE};".format(
+            TABLE=self._quote(table),
+            WHERE=self._render_where(table, where_shape, self._id_column(table))
+        ))
+        if self.advisor is not None:
+            self.advisor.observe(self.db, table, self._id_column(table), where_shape, None, query, params)
+        self._execute(self.db, query, params)
+        self._commit()
+        self._written(table)
+
+    def update_many(self, table:str, rows, key=None, chunk_size:int=1000) -> int:
+        """
+        UPDATE `table` SET `row` WHERE `key` = `row[key]` for each row in `rows`,
+        through `executemany` `chunk_size` rows at a time, in a single transaction.
+
+        :param rows: Iterable of dicts or Model instances; consecutive rows with the same columns share a statement.
+        :param key: Column (or list of columns) identifying each row, defaulting to the primary key.
+            Raises ValueError for rows with nothing but `key` to set.
+        :return: Number of rows updated.
+        """
+
+        if self._behind():
+            return self.write_behind.submit(self.update_many, table, rows, key, chunk_size)
+
+        key = self._key_columns(table, key)
+
+        def compile_update(cols:tuple) -> str:
+            update = [column for column in cols if column not in key]
+            if not update:
+                raise ValueError(f"Rows to update need a column besides their key column(s) {list(key)}.")
+            return "UPDATE {TABLE} SET {SET} WHERE {WHERE}".format(
+                TABLE=self._quote(table),
+                SET=", ".join(f"{column}=?" for column in update),
+                WHERE=" AND ".join(f"{column} = ?" for column in key)
+            )
+
+        def order(cols:tuple) -> list:
+            missing = [column for column in key if column not in cols]
+            if missing:
+                raise ValueError(f"Rows to update need their key column(s) {missing}.")
+            return [*(column for column in cols if column not in key), *key]
+
+        return self._write_many(table, ("UPDATE_MANY", key), rows, compile_update, order, chunk_size)
+
+    def upsert_many(self, table:str, rows, key=None, chunk_size:int=1000) -> int:
+        """
+        INSERT INTO `table` VALUES (`row`) ON CONFLICT (`key`) DO UPDATE SET `row` for each row in `rows`,
+        through `executemany` `chunk_size` rows at a time, in a single transaction.
+
+        :param rows: Iterable of dicts or Model instances; consecutive rows with the same columns share a statement.
+        :param key: Conflict target column(s), defaulting to the primary key,
+            else the first UNIQUE index whose columns every row has.
+        :return: Number of rows inserted or updated.
+        """
+
+        if self._behind():
+            return self.write_behind.submit(self.upsert_many, table, rows, key, chunk_size)
+
+        def compile_upsert(cols:tuple) -> str:
+            conflict = self._conflict_target(table, cols, key)
+            if conflict is None:
+                raise ValueError(f"Rows to upsert into {table} need the columns of its primary key or a UNIQUE index.")
+            return self._upsert_sql(table, cols, conflict)
+
+        return self._write_many(table, ("UPSERT", key), rows, compile_upsert, list, chunk_size)
+
+    def delete_many(self, table:str, ids, column:str=None, chunk_size:int=None) -> int:
+        """
+        DELETE FROM `table` WHERE `column` IN (`ids`), in a single transaction.
+
+        :param ids: Iterable of key values, of any length.
+        :param column: Defaults to the primary key.
+        :param chunk_size: Values per statement, defaulting to SQLite's host parameter limit.
+        :return: Number of rows deleted.
+        """
+
+        if self._behind():
+            return self.write_behind.submit(self.delete_many, table, ids, column, chunk_size)
+
+        db = self.db
+        column = column or self._id_column(table)
+        if chunk_size is None:
+            chunk_size = db.getlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER) if hasattr(db, "getlimit") else 999
+
+        count = 0
+        with self.transaction():
+            for chunk in self._chunks(ids, chunk_size):
+                query = self.statements.get(("DELETE_MANY", table, column, len(chunk)),
+                    lambda: f"DELETE FROM {self._quote(table)} WHERE {column} IN ({', '.join('?' * len(chunk))})")
+                count += self._execute(db, query, chunk).rowcount
+
+        self._written(table)
+
+        return count
+
+    def _write_many(self, table:str, kind:tuple, rows, compile_statement, order, chunk_size:int) -> int:
+        """
+        Runs `compile_statement(columns)` through `executemany` over `rows`, one run of rows with
+        the same columns at a time, binding each row's values in `order(columns)`.
+        """
+
+        def as_dict(row) -> dict:
+            return row.to_dict() if isinstance(row, Model) else row
+
+        count = 0
+        with self.transaction():  # commits once on success, rolls back everything on error
+            for cols, run in groupby(map(as_dict, rows), key=lambda row: tuple(row.keys())):
+                query = self.statements.get((*kind, table, cols), lambda: compile_statement(cols))
+                binds = order(cols)
+                for chunk in self._chunks(([row[column] for column in binds] for row in run), chunk_size):
+                    count += self._execute(self.db, query, chunk, many=True).rowcount
+
+        self._written(table)
+
+        return count
+
+    def _conflict_target(self, table:str, cols:tuple, key=None) -> tuple:
+        """`key`, else the primary key or first UNIQUE index of `table` that `cols` cover (None if none does)."""
+
+        if key is not None:
+            return self._key_columns(table, key)
+        return next((unique for unique in self.table_info(table).unique if all(column in cols for column in unique)), None)
+
+    def _upsert_sql(self, table:str, cols:tuple, conflict:tuple) -> str:
+        update = [column for column in cols if column not in conflict]
+        return "INSERT INTO {TABLE} ({COLUMNS}) VALUES ({VALUES}) ON CONFLICT ({KEY}) DO {UPDATE}".format(
+            TABLE=self._quote(table),
+            COLUMNS=", ".join(cols),
+            VALUES=", ".join("?" * len(cols)),
+            KEY=", ".join(conflict),
+            UPDATE=f"UPDATE SET {', '.join(f'{column}=excluded.{column}' for column in update)}" if update else "NOTHING"
         )
-        self.db.execute(query)
-        self.db.commit()
+
+    def _key_columns(self, table:str, key=None) -> tuple:
+        """`key` as a tuple of columns, defaulting to `table`'s primary key."""
+
+        if key is None:
+            return tuple(self.table_info(table).primary_key) or (self._id_column(table),)
+        return (key,) if isinstance(key, str) else tuple(key)
 
     # ==========================================================================================
 
-    #! check tables property above
-    def get_table(table_name:str) -> Table: raise NotImplementedError
-    def get_table(self, name:str) -> Table:
+    def get_table(self, name:str, datatype=None, chunk_size:int=500) -> Table:
         """
-        Selects everything from `table`.
+        A lazy `Table` over `name`: nothing is fetched until it is iterated, indexed or sliced.
 
-        Returns Table object.
+        :param datatype: Rows come back as this (or the mapped model, if `Model`).
         """
 
-        table = Table(name, self.db)
-        table.rows = select(name)
+        return Table(name, self.db, self.catalog, self._datatype(name, datatype) if datatype else None, chunk_size)
+
+    def track_counts(self, *tables:str) -> None:
+        """
+        Keeps a row counter for each of `tables` (by default all) in `Tables.ROW_COUNTS`,
+        seeded with COUNT(*) once and then maintained by insert/delete triggers,
+        so `len(table)` is a single lookup instead of a full scan. Every insert and delete on
+        a counted table also updates its counter row, so count the tables whose size is read often.
 
-        return table
+        REPLACE conflict resolution deletes without firing delete triggers
+        (unless PRAGMA recursive_triggers is on), so it overcounts.
+        """
+
+        db = self.db
+        tables = [table for table in tables or self.catalog.tables(db) if "." not in table]
+        with self.transaction("IMMEDIATE"):
+            db.execute(f"CREATE TABLE IF NOT EXISTS {Tables.ROW_COUNTS} (tbl TEXT PRIMARY KEY, n INTEGER NOT NULL) WITHOUT ROWID")
+            for table in tables:
+                literal = table.replace("'", "''")
+                for event, change in (("insert", "+ 1"), ("delete", "- 1")):
+                    db.execute(f"CREATE TRIGGER IF NOT EXISTS `{Tables.ROW_COUNTS}_{table}_{event}` AFTER {event.upper()} "
+                        f"ON `{table}` BEGIN UPDATE {Tables.ROW_COUNTS} SET n = n {change} WHERE tbl = '{literal}'; END")
+                db.execute(f"INSERT OR REPLACE INTO {Tables.ROW_COUNTS} (tbl, n) SELECT ?, COUNT(*) FROM `{table}`", (table,))
+        self.catalog.validate(db)
+
+    def export_table(self, table:str, path:str, format:str=None, compress:bool=None, chunk_size:int=1000,
+            progress=None) -> int:
+        """
+        Streams every row of `table` to `path` as CSV (with a header) or JSON Lines,
+        `chunk_size` rows at a time (see `Table.chunks`), so memory stays flat at any table size.
+        NULLs are written as `\\N` in CSV (so they stay distinct from empty strings),
+        and values JSON can't represent (dates) as text.
+        Columns declared BLOB are written base64-encoded (and decoded again by `import_table`);
+        raises ValueError if any other column holds a blob.
+
+        :param format: "csv" or "jsonl", by default from the extension of `path` (".csv", ".jsonl", ".ndjson").
+        :param compress: gzip the output; by default if `path` ends in ".gz".
+        :param progress: Called as progress(rows written, seconds elapsed) after each chunk.
+        :return: Number of rows written.
+        """
+
+        format, compress = self._dump_format(path, format, compress)
+        info = self.table_info(table)
+        columns = info.columns
+        blobs = self._blob_columns(info)
+
+        others = " OR ".join(f"typeof({column}) = 'blob'" for column in columns if column not in blobs)
+        if others and self.db.execute(f"SELECT 1 FROM {self._quote(table)} WHERE {others} LIMIT 1").fetchone():
+            raise ValueError(f"{table} holds blobs in columns not declared BLOB, which can't be exported as text.")
+        encode_blobs = self._blob_codec(columns, blobs, lambda value: base64.b64encode(value).decode("ascii"))
+
+        start = time.perf_counter()
+        count = 0
+        with self._open_dump(path, "w", compress) as f:
+            if format == "csv":
+                writer = csv.writer(f)
+                writer.writerow(columns)
+                null = self._csv_null
+                write = lambda rows: writer.writerows([null if val is None else val for val in row] for row in rows)
+            else:
+                encode = json.JSONEncoder(default=str, ensure_ascii=False).encode
+                write = lambda rows: f.writelines(f"{encode(dict(zip(columns, row)))}\n" for row in rows)
+
+            for chunk in self.get_table(table, chunk_size=chunk_size).chunks():
+                write(map(encode_blobs, chunk) if encode_blobs else chunk)
+                count += len(chunk)
+                if progress:
+                    progress(count, time.perf_counter() - start)
+
+        return count
+
+    def import_table(self, table:str, path:str, format:str=None, chunk_size:int=1000, on_conflict:str=None,
+            progress=None) -> int:
+        """
+        Streams the rows in `path` (CSV with a header, or JSON Lines; gzipped or not) into `table`
+        through `executemany`, `chunk_size` rows at a time, in a single transaction.
+
+        Only columns `table` has are imported, primary keys included; for JSON Lines,
+        the columns are the keys of the first line. CSV fields reading `\\N` are imported as NULL,
+        as are empty fields of numeric columns (empty strings stay empty strings elsewhere),
+        and columns declared BLOB are base64-decoded (see `export_table`).
+
+        :param format: "csv" or "jsonl", by default from the extension of `path`.
+        :param on_conflict: None (fail), "REPLACE" or "IGNORE" rows that break a UNIQUE constraint.
+            "REPLACE" updates the existing row in place (as `upsert_many` does, on the primary key
+            or first UNIQUE index the file's columns cover), so `track_counts` counters stay right.
+        :param progress: Called as progress(rows read, seconds elapsed) after each chunk.
+        :return: Number of rows read.
+        """
+
+        format, _ = self._dump_format(path, format, None)
+        with open(path, "rb") as f:
+            compressed = f.read(2) == b"\x1f\x8b"
+        if on_conflict and on_conflict.upper() not in ("REPLACE", "IGNORE"):
+            raise ValueError(f"Unknown conflict resolution '{on_conflict}'.")
+
+        start = time.perf_counter()
+        count = 0
+        with self._open_dump(path, "r", compressed) as f:
+            if format == "csv":
+                reader = csv.reader(f)
+                header = next(reader, [])
+                rows = reader
+            else:
+                lines = (json.loads(line) for line in f if line.strip())
+                first = next(lines, None)
+                header = list(first) if first else []
+                rows = ([row.get(column) for column in header] for row in chain([first], lines)) if first else iter(())
+
+            info = self.table_info(table)
+            picked = [idx for idx, column in enumerate(header) if column in info]
+            cols = [header[idx] for idx in picked]
+            if not cols:
+                raise ValueError(f"{path} has none of {table}'s columns.")
+
+            def compile_insert() -> str:
+                conflict = on_conflict and on_conflict.upper() == "REPLACE" and self._conflict_target(table, tuple(cols))
+                if conflict:
+                    return self._upsert_sql(table, tuple(cols), conflict)
+                return "INSERT {OR}INTO {TABLE} ({COLUMNS}) VALUES ({VALUES})".format(
+                    OR=f"OR {on_conflict.upper()} " if on_conflict else "",
+                    TABLE=self._quote(table),
+                    COLUMNS=", ".join(cols),
+                    VALUES=", ".join("?" * len(cols))
+                )
+
+            INSERT = self.statements.get(("IMPORT", table, tuple(cols), on_conflict and on_conflict.upper()), compile_insert)
+
+            values = ([row[idx] for idx in picked] for row in rows)
+            if format == "csv":
+                values = map(self._csv_nulls(cols, info), values)
+            decode_blobs = self._blob_codec(cols, self._blob_columns(info), base64.b64decode)
+            if decode_blobs:
+                values = map(decode_blobs, values)
+
+            with self.transaction():
+                for chunk in self._chunks(values, chunk_size):
+                    self._execute(self.db, INSERT, chunk, many=True)
+                    count += len(chunk)
+                    if progress:
+                        progress(count, time.perf_counter() - start)
+
+        self._written(table)
+
+        return count
+
+    _csv_null = "\\N"
+
+    @classmethod
+    def _csv_nulls(cls, columns:list, info:TableInfo):
+        """A function reading the NULLs back into a CSV row laid out as `columns`: `\\N`, and empty fields of numeric columns."""
+
+        textual = ("CHAR", "CLOB", "TEXT", "BLOB")
+        numeric = {idx for idx, column in enumerate(columns)
+            if info.types.get(column) and not any(name in info.types[column].upper() for name in textual)}
+        null = cls._csv_null
+
+        def convert(row):
+            return [None if val == null or (val == "" and idx in numeric) else val for idx, val in enumerate(row)]
+
+        return convert
+
+    @staticmethod
+    def _blob_columns(info:TableInfo) -> set:
+        return {column for column in info.columns if "BLOB" in (info.types.get(column) or "").upper()}
+
+    @staticmethod
+    def _blob_codec(columns:list, blobs:set, codec):
+        """A function applying `codec` (base64 encoding or decoding) to the `blobs` values of a row laid out as `columns`."""
+
+        positions = [idx for idx, column in enumerate(columns) if column in blobs]
+        if not positions:
+            return None
+
+        def convert(row):
+            row = list(row)
+            for idx in positions:
+                if row[idx] is not None:
+                    row[idx] = codec(row[idx])
+            return row
+
+        return convert
+
+    @staticmethod
+    def _dump_format(path:str, format:str=None, compress:bool=None) -> tuple:
+        """(format, compress) for `path`, from its extension unless given."""
+
+        name = path[:-3] if path.endswith(".gz") else path
+        if compress is None:
+            compress = name != path
+        if format is None:
+            extension = os.path.splitext(name)[1].lower()
+            format = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}.get(extension)
+            if format is None:
+                raise ValueError(f"Can't tell the format of {path}; give format='csv' or 'jsonl'.")
+        if format not in ("csv", "jsonl"):
+            raise ValueError(f"Unknown format '{format}'.")
+
+        return format, compress
+
+    @staticmethod
+    def _open_dump(path:str, mode:str, compress:bool):
+        if compress:
+            return gzip.open(path, f"{mode}t", encoding="utf8", newline="")
+        return open(path, mode, encoding="utf8", newline="")
 
     # ==========================================================================================
         
@@ -386,10 +1813,28 @@ class LoreKeeper(metaclass=ABCMeta):
 
         return val
 
+    @staticmethod
+    def _quote(table:str) -> str:
+        """Quotes a table name, which may be schema-qualified: "archive.user" -> "`archive`.`user`"."""
+        return ".".join(f"`{part}`" for part in table.split("."))
+
+    @staticmethod
+    def _bare(table:str) -> str:
+        """Drops the schema from a table name: "archive.user" -> "user"."""
+        return table.rpartition(".")[2]
+
     @staticmethod
     def _is_iter(obj) -> bool:
         return hasattr(obj, '__iter__') and not isinstance(obj, str)
 
+    @staticmethod
+    def _chunks(iterable, size:int):
+        """Yields lists of up to `size` elements from `iterable`."""
+
+        iterator = iter(iterable)
+        while chunk := list(islice(iterator, size)):
+            yield chunk
+
     @staticmethod
     def _contains(containing, contained) -> bool:
         return any(True for elem in contained if elem in containing)
@@ -401,39 +1846,225 @@ class LoreKeeper(metaclass=ABCMeta):
     def init_app(cls, app:Flask) -> None:
         app.teardown_appcontext(cls._close_db)
         app.cli.add_command(cls._init_db_command)
+        app.cli.add_command(cls._query_stats_command)
+        app.cli.add_command(cls._backup_db_command)
+        app.cli.add_command(cls._restore_db_command)
+        app.cli.add_command(cls._export_table_command)
+        app.cli.add_command(cls._import_table_command)
+
+        app.cli.add_command(cls._suggest_indexes_command)
+
+        lk = getattr(app, 'lk', None)
+        if lk is not None and lk.profiler is None and app.config.get(Config.PROFILE):
+            lk.profiler = QueryProfiler.from_config(app.config, app.instance_path)
+        if lk is not None and lk.advisor is None and app.config.get(Config.ADVISE_INDEXES):
+            lk.advisor = IndexAdvisor.from_config(app.config, app.instance_path)
+        if lk is not None and lk.write_behind is None and app.config.get(Config.WRITE_BEHIND):
+            lk.write_behind = WriteBehind.from_config(lk, app)
+
+    def _init_db(self, indexes:dict=None, row_counts:list=None) -> None:
+        """
+        :param indexes: {table: [columns, ...]} of indexes to create besides `self.indexes`.
+        :param row_counts: Tables to keep row counters for besides `self.row_counts`.
+        """
 
-    def _init_db(self) -> None:
         with current_app.open_resource(os.path.join(os.path.dirname(__file__), 'schema.sql')) as f:
             self.db.executescript(f.read().decode('utf8'))
+        self.catalog.validate(self.db)
         self.update(Tables.USER, {PASSWORD: generate_password_hash('admin')}, where=1)  # seems unsafe
 
         with current_app.open_resource(os.path.join(current_app.paths['app'], 'schema.sql')) as f:
             self.db.executescript(f.read().decode('utf8'))
+        self.catalog.validate(self.db)
+
+        self.create_indexes(self.indexes)
+        if indexes:
+            self.create_indexes(indexes)
+        counted = [*self.row_counts, *(row_counts or [])]
+        if counted:
+            self.track_counts(*counted)
+
+    def create_indexes(self, indexes:dict) -> list:
+        """
+        CREATE INDEX IF NOT EXISTS for each {table: [columns, ...]}, skipping tables that don't exist.
+
+        :return: the statements run
+        """
+
+        tables = self.catalog.tables(self.db)
+        indexes = {table: index_list for table, index_list in indexes.items() if table in tables}
+        statements = [IndexAdvisor.create_sql(table, [columns] if isinstance(columns, str) else columns)
+            for table, index_list in indexes.items() for columns in index_list]
+
+        # no ANALYZE: statistics gathered on a freshly initialized (near empty) table
+        # would steer the planner away from these indexes once the table fills up
+        for statement in statements:
+            self.db.execute(statement)
+        self.db.commit()
+        self.catalog.validate(self.db)
+
+        return statements
 
     @staticmethod
     def _close_db(e=None) -> None:
-        db = g.pop('db', None)
+        for key in ('db', 'db_replica'):
+            db = g.pop(key, None)
+            pool = g.pop(f'{key}_pool', None)
 
-        if db:
-            db.close()
+            if db and pool:
+                pool.checkin(db)
+            elif db:
+                db.close()
 
     @staticmethod
     @click.command('init-db')
     @click.argument('database')
+    @click.option('--index', 'indexes', multiple=True, metavar="TABLE.COLUMN[,COLUMN...]",
+        help="Also create this index (repeatable), e.g. --index user.user_val")
+    @click.option('--count', 'counts', multiple=True, metavar="TABLE",
+        help="Keep a row counter for this table (repeatable), so len() on it skips COUNT(*)")
     @with_appcontext
-    def _init_db_command(database:str) -> None:
+    def _init_db_command(database:str, indexes:tuple, counts:tuple) -> None:
         """Clear the existing data and create new tables."""
 
-        LoreKeeper(database)._init_db()
+        hints = {}
+        for index in indexes:
+            table, _, columns = index.rpartition(".")
+            if not table or not columns:
+                raise click.BadParameter(f"'{index}' is not TABLE.COLUMN[,COLUMN...]", param_hint="--index")
+            hints.setdefault(table, []).append(tuple(columns.split(",")))
+
+        LoreKeeper(database)._init_db(hints, list(counts))
         click.echo(f"Initialized the database.")
 
-    # TODO
-    # @click.command('backup-db')
-    # def backup_db() -> None:
-    #     pass
+    @staticmethod
+    def _echo_rate(rows:int, seconds:float) -> None:
+        click.echo(f"\r{rows} rows ({rows / seconds if seconds else 0:.0f} rows/s)", nl=False)
+
+    @staticmethod
+    @click.command('export-table')
+    @click.argument('database')
+    @click.argument('table')
+    @click.argument('path')
+    @click.option('--format', type=click.Choice(['csv', 'jsonl']), help="Default: from the extension of PATH.")
+    @click.option('--gzip/--no-gzip', 'compress', default=None, help="Default: if PATH ends in .gz.")
+    @click.option('--chunk-size', default=1000, help="Rows read at a time.")
+    @with_appcontext
+    def _export_table_command(database:str, table:str, path:str, format:str, compress:bool, chunk_size:int) -> None:
+        """Stream TABLE to PATH as CSV or JSON Lines."""
+
+        start = time.perf_counter()
+        count = LoreKeeper(database).export_table(table, path, format, compress, chunk_size, LoreKeeper._echo_rate)
+        LoreKeeper._echo_rate(count, time.perf_counter() - start)
+        click.echo(f"\nExported {count} rows from {table} to {path}.")
+
+    @staticmethod
+    @click.command('import-table')
+    @click.argument('database')
+    @click.argument('table')
+    @click.argument('path')
+    @click.option('--format', type=click.Choice(['csv', 'jsonl']), help="Default: from the extension of PATH.")
+    @click.option('--on-conflict', type=click.Choice(['replace', 'ignore'], case_sensitive=False),
+        help="Replace or skip rows that break a UNIQUE constraint, instead of failing.")
+    @click.option('--chunk-size', default=1000, help="Rows written at a time.")
+    @with_appcontext
+    def _import_table_command(database:str, table:str, path:str, format:str, on_conflict:str, chunk_size:int) -> None:
+        """Stream the CSV or JSON Lines rows in PATH into TABLE."""
+
+        start = time.perf_counter()
+        count = LoreKeeper(database).import_table(table, path, format, chunk_size, on_conflict, LoreKeeper._echo_rate)
+        LoreKeeper._echo_rate(count, time.perf_counter() - start)
+        click.echo(f"\nImported {count} rows from {path} into {table}.")
+
+    @staticmethod
+    @click.command('suggest-indexes')
+    @click.argument('database')
+    @click.option('--create', is_flag=True, help="Create the suggested indexes.")
+    @click.option('--min-uses', default=1, help="Ignore columns filtered on fewer times than this.")
+    @click.option('--reset', is_flag=True, help="Delete the collected stats afterwards.")
+    @with_appcontext
+    def _suggest_indexes_command(database:str, create:bool, min_uses:int, reset:bool) -> None:
+        """Suggest (or create) indexes from columns recorded with LOREKEEPER_ADVISE_INDEXES."""
+
+        path = current_app.config.get(Config.INDEX_STATS, os.path.join(current_app.instance_path, "index-stats"))
+        lk = LoreKeeper(database)
+        suggestions = IndexAdvisor.suggest(lk.db, lk.catalog, IndexAdvisor.load(path), min_uses)
+        if not suggestions:
+            click.echo(f"No indexes to suggest from {path}.")
+
+        for suggestion in suggestions:
+            click.echo(f"{suggestion['sql']};  -- {suggestion['uses']} uses, {suggestion['scans']} full scans")
+            if create:
+                lk.db.execute(suggestion['sql'])
+                lk.db.execute(f"ANALYZE {lk._quote(suggestion['table'])}")
+
+        if create and suggestions:
+            lk.db.commit()
+            click.echo(f"Created {len(suggestions)} index(es).")
+
+        if reset and os.path.isdir(path):
+            for filename in os.listdir(path):
+                os.remove(os.path.join(path, filename))
+            click.echo("Reset the index stats.")
+
+    @staticmethod
+    @click.command('query-stats')
+    @click.option('--sort', type=click.Choice(['total', 'count', 'max', 'rows']), default='total')
+    @click.option('--top', default=20, help="Number of statement shapes to show.")
+    @click.option('--reset', is_flag=True, help="Delete the collected stats afterwards.")
+    @with_appcontext
+    def _query_stats_command(sort:str, top:int, reset:bool) -> None:
+        """Show per-statement timings collected with LOREKEEPER_PROFILE."""
+
+        path = current_app.config.get(Config.QUERY_STATS, os.path.join(current_app.instance_path, "query-stats"))
+        stats = QueryProfiler.load(path)
+        if not stats:
+            click.echo(f"No query stats in {path}.")
+            return
+
+        for line in QueryProfiler.report(stats, sort, top):
+            click.echo(line)
+
+        if reset:
+            for filename in os.listdir(path):
+                os.remove(os.path.join(path, filename))
+            click.echo("Reset the query stats.")
+
+    @staticmethod
+    def _echo_progress(remaining:int, total:int) -> None:
+        done = total - remaining
+        click.echo(f"\r{done}/{total} pages ({done / total if total else 1:.0%})", nl=not remaining)
+
+    @staticmethod
+    @click.command('backup-db')
+    @click.argument('database')
+    @click.argument('path')
+    @click.option('--pages', default=1024, help="Pages copied per step.")
+    @click.option('--sleep', default=0.01, help="Seconds between steps, so writers aren't held up.")
+    @click.option('--compress', is_flag=True, help="gzip the backup.")
+    @click.option('--vacuum', is_flag=True, help="Write a compacted copy with VACUUM INTO, in a single step.")
+    @click.option('--no-verify', is_flag=True, help="Skip the integrity check of the copy.")
+    @with_appcontext
+    def _backup_db_command(database:str, path:str, pages:int, sleep:float, compress:bool, vacuum:bool, no_verify:bool) -> None:
+        """Copy the database to PATH while it stays online."""
+
+        result = LoreKeeper(database).backup(path, pages, sleep, compress, vacuum, not no_verify, LoreKeeper._echo_progress)
+        click.echo(f"Backed up {result['pages']} pages to {result['path']} ({result['bytes']} bytes) in {result['seconds']:.1f}s.")
+
+    @staticmethod
+    @click.command('restore-db')
+    @click.argument('database')
+    @click.argument('path')
+    @click.confirmation_option(prompt="This replaces everything in the database. Continue?")
+    @with_appcontext
+    def _restore_db_command(database:str, path:str) -> None:
+        """Replace the database's contents with the backup at PATH."""
+
+        result = LoreKeeper(database).restore(path, progress=LoreKeeper._echo_progress)
+        click.echo(f"Restored {result['pages']} pages from {result['path']} in {result['seconds']:.1f}s.")
 
 if __name__ == "__main__":
     lk = LoreKeeper()
-    print(lk._join("language", Join(select=lk._select("user"), col="user_id", alias="ancestor")))
+    print(lk._join("language", Join(select=lk._select("user")[0], col="user_id", alias="ancestor")))
 
     print("done")
\ No newline at end of file
@@ -1,5 +1,8 @@
 from abc import ABC
+import csv
+import io
 import json
+import keyword
 import sqlite3
 
 from lorekeeper.lorekeeper.consts import *
@@ -8,7 +11,7 @@ class Row(sqlite3.Row):
     def __init__(self, cursor, values):
         self.cursor = cursor
         self.values = values
-        self.columns = (col[0] for col in cursor.description)
+        self.columns = tuple(col[0] for col in cursor.description)
         
         self._id = None
         self._val = None
@@ -76,14 +79,117 @@ class Row(sqlite3.Row):
     def __repr__(self): return f"{self.id} {self.val}"
 
 
-class Model(ABC, object):
+class Record(tuple):
+    """
+    A compact result row: the values tuple itself, plus one column-to-index map
+    shared by every row with the same column layout (see `Record.factory`).
+
+    Supports `row['col']`, `row[0]`, `row.col`, `.id`, `.val`, `.get()`, `.to_dict()`
+    and `**row`. Column names that shadow tuple methods (`count`, `index`) are only
+    reachable as `row['count']`.
+    """
+
+    __slots__ = ()
+    _columns = ()
+    _index = {}
+    _id_index = None
+    _val_index = None
+
+    _classes = {}
+    _last = (None, None)
+
+    @classmethod
+    def factory(cls, cursor:sqlite3.Cursor, values:tuple) -> 'Record':
+        """`sqlite3` row factory."""
+
+        description, record = cls._last
+        if cursor.description is not description:
+            description = cursor.description
+            record = cls.layout(tuple(col[0] for col in description))
+            Record._last = (description, record)
+
+        return tuple.__new__(record, values)
+
+    @classmethod
+    def layout(cls, columns:tuple) -> type:
+        """Returns the (cached) Record subclass for `columns`."""
+
+        try:
+            return cls._classes[columns]
+        except KeyError:
+            pass
+
+        record = type(cls.__name__, (cls,), {
+            "__slots__": (),
+            "_columns": columns,
+            "_index": {col: idx for idx, col in reversed(list(enumerate(columns)))},
+            "_id_index": next((idx for idx, col in enumerate(columns) if ID in col), None),
+            "_val_index": next((idx for idx, col in enumerate(columns) if VAL in col), None),
+        })
+        cls._classes[columns] = record
+
+        return record
+
+    @property
+    def columns(self) -> tuple: return self._columns
+
+    @property
+    def id(self): return None if self._id_index is None else tuple.__getitem__(self, self._id_index)
+
+    @property
+    def val(self): return None if self._val_index is None else tuple.__getitem__(self, self._val_index)
+
+    def get(self, attr:str, default=None):
+        """
+        Returns the value of `attr` if present
+            else, returns `default`.
+        """
+        idx = self._index.get(attr)
+        return default if idx is None else tuple.__getitem__(self, idx)
+
+    def keys(self) -> tuple: return self._columns
+    def items(self) -> zip: return zip(self._columns, self)
+    def to_dict(self) -> dict: return dict(zip(self._columns, self))
+
+    def __getitem__(self, key):
+        try:
+            return tuple.__getitem__(self, self._index[key])
+        except (KeyError, TypeError):  # positional index or slice
+            if isinstance(key, str):
+                raise KeyError(key) from None
+            return tuple.__getitem__(self, key)
+
+    def __getattr__(self, attr:str):
+        try:
+            return tuple.__getitem__(self, self._index[attr])
+        except KeyError:
+            raise AttributeError(attr) from None
+
+    def __reduce__(self): return (_unpickle_record, (self._columns, tuple(self)))
+    def __repr__(self): return f"{self.__class__.__name__}({', '.join(f'{col}={val!r}' for col, val in self.items())})"
+
+
+def _unpickle_record(columns:tuple, values:tuple) -> Record: return tuple.__new__(Record.layout(columns), values)
+
+
+class _Related(object):
+    # a slot of its own, so the field loops over `Model.__slots__` never see it
+    __slots__ = ["_related"]
+
+
+class Model(ABC, _Related):
     __slots__ = [ID, VAL]
     columns = []
     aliases = {}
+    id_column = None  # column `id` is read from when `pk` is not given
+    val_column = None  # column `val` is read from when `val` is not given
+    direct_hydration = None  # whether `__init__` only assigns fields; None: if not overridden
+
+    _hydrators = {}
 
     def __init__(self, pk=None, val=None, **kwargs) -> None:
-        self.id = pk
-        self.val = val
+        self.id = kwargs.get(self.id_column) if pk is None else pk
+        self.val = kwargs.get(self.val_column) if val is None else val
 
         for slot in self.__slots__:
             setattr(self, slot, kwargs.get(slot))
@@ -92,9 +198,70 @@ class Model(ABC, object):
             setattr(self, alias, self[attr])
 
     @classmethod
-    def from_row(cls, row:Row) -> 'Model': return cls(**row)
+    def from_row(cls, row:Row) -> 'Model':
+        if isinstance(row, Record):
+            return cls.hydrator(row._columns)(row)
+        return cls(**row)
 
-    def to_csv(self): return ",".join(getattr(self, slot) for slot in self.__slots__)
+    @classmethod
+    def hydrator(cls, columns:tuple):
+        """
+        Returns a function that builds a `cls` from a row laid out as `columns`,
+        equivalent to `cls(**row)` but without the intermediate dict.
+        Compiled once per (class, column layout).
+        """
+
+        key = (cls, columns)
+        try:
+            return Model._hydrators[key]
+        except KeyError:
+            hydrate = Model._hydrators[key] = cls._compile_hydrator(tuple(columns))
+            return hydrate
+
+    @classmethod
+    def _compile_hydrator(cls, columns:tuple):
+        if not all(col.isidentifier() and not keyword.iskeyword(col) for col in columns):
+            return lambda row: cls(**dict(zip(columns, row)))
+
+        index = {}  # column -> the variable holding its first occurrence
+        for pos, col in enumerate(columns):
+            index.setdefault(col, f"_{pos}")
+        names = [f"_{idx}" for idx in range(len(columns))]
+        lines = [f"{', '.join(names)}, = row"]
+
+        direct = cls.direct_hydration
+        if direct is None:
+            direct = cls.__init__ is Model.__init__
+
+        if direct:
+            def pick(given, column):
+                given, column = index.get(given), index.get(column)
+                if given and column:
+                    return f"{column} if {given} is None else {given}"
+                return given or column or "None"
+
+            lines.append("obj = new(cls)")
+            lines.append(f"obj.{ID} = {pick('pk', cls.id_column)}")
+            lines.append(f"obj.{VAL} = {pick(VAL, cls.val_column)}")
+            lines.extend(f"obj.{slot} = {index.get(slot, 'None')}" for slot in cls.__slots__)
+            lines.extend(f"obj.{alias} = obj.{attr}" for alias, attr in cls.aliases.items())
+            lines.append("return obj")
+        else:
+            lines.append(f"return cls({', '.join(f'{col}={name}' for col, name in index.items())})")
+
+        namespace = {"cls": cls, "new": cls.__new__}
+        exec("def hydrate(row):\n    " + "\n    ".join(lines), namespace)
+
+        return namespace["hydrate"]
+
+    @classmethod
+    def from_dict(cls, values:dict) -> 'Model': return cls(**values)
+
+    def to_csv(self):
+        # csv quotes separators and stringifies non-string values; None becomes an empty field
+        line = io.StringIO()
+        csv.writer(line, lineterminator="").writerow([getattr(self, slot) for slot in self.__slots__])
+        return line.getvalue()
     def to_dict(self): return {slot: getattr(self, slot) for slot in self.__slots__}
     def to_json(self): return json.dumps(self.to_dict()) # return str(dict(self)).replace("'", '"').replace("None", "null")
 
@@ -102,52 +269,224 @@ class Model(ABC, object):
 
     def __getitem__(self, attr:str): return getattr(self, attr)
 
+    @property
+    def related(self) -> dict:
+        """Related models stitched on by `LoreKeeper.select(load=..., prefetch=...)`, by join alias."""
+
+        try:
+            return self._related
+        except AttributeError:
+            self._related = {}
+            return self._related
+
+    def __getattr__(self, attr:str):
+        # only reached for names that are neither set slots nor class attributes: `note.author`, `user.notes`
+        try:
+            return object.__getattribute__(self, "_related")[attr]
+        except (AttributeError, KeyError):
+            raise AttributeError(f"'{self.__class__.__name__}' object has no attribute '{attr}'") from None
+
 
 class Table(Model):
-    __slots__ = ['db', 'name']
-    def __init__(self, name:str, db:sqlite3.Connection) -> None:
+    """
+    A lazy, read-only sequence over the rows of a table.
+
+    Nothing is fetched up front: iteration walks the table `chunk_size` rows at a time,
+    `table[i]` and `table[i:j]` become bounded queries, and `len()` reads the row counter
+    kept by `LoreKeeper.track_counts` (falling back to COUNT(*) for untracked tables).
+    Rows come back in rowid (or primary key) order, as `datatype` objects if given.
+    """
+
+    __slots__ = ['db', 'name', 'catalog', 'datatype', 'chunk_size', '_columns']
+    def __init__(self, name:str, db:sqlite3.Connection, catalog:'SchemaCatalog'=None, datatype:type=None,
+            chunk_size:int=500) -> None:
         self.name = name
         self.db = db
+        self.catalog = catalog
+        self.datatype = datatype
+        self.chunk_size = chunk_size
 
         self._columns = []
-        self._rows = []
-        self._size = None
 
     @property
     def columns(self) -> list:
-        """Retrieves the table columns from the database and assigns them to `self.columns` as a list."""
+        """Retrieves the table columns from the schema catalog (or `PRAGMA table_info`)."""
+
+        if self.catalog:
+            return self.catalog.columns(self.db, self.name)
 
         if not self._columns:
-            cursor = self.db.execute(f"SELECT * FROM {self.name}")
-            self._columns = [col[0] for col in cursor.description]
+            cursor = self.db.cursor()
+            cursor.row_factory = None
+            self._columns = [col[1] for col in cursor.execute(f"PRAGMA table_info(`{self.name}`)")]
 
         return self._columns
 
+    @property
+    def _table(self) -> str:
+        return ".".join(f"`{part}`" for part in self.name.split("."))
+
+    @property
+    def _key(self) -> str:
+        """The column rows are ordered and sought by: the rowid alias, else `rowid`, else the primary key."""
+
+        info = self.catalog.table(self.db, self.name) if self.catalog else None
+        if info and info.rowid_alias:
+            return info.rowid_alias
+        if info and info.primary_key and self._without_rowid:
+            return ", ".join(info.primary_key)
+        return "rowid"
+
+    @property
+    def _without_rowid(self) -> bool:
+        schema, _, table = self.name.rpartition(".")
+        sql = self.db.execute(f"SELECT sql FROM {f'`{schema}`.' if schema else ''}sqlite_master WHERE type='table' AND name = ?",
+            (table,)).fetchone()
+        return bool(sql) and "WITHOUT ROWID" in sql[0].upper()
+
     @property
     def rows(self) -> list:
-        if not self._rows:
-            raise NotImplementedError
+        """Every row, fetched now."""
+        return list(self)
 
     @property
     def size(self) -> int:
-        """Retrieves the number of rows from database and assigns that to `self.size`."""
+        """The number of rows, from the row counter if the table has one, else COUNT(*)."""
 
-        if not self._size:
-            self._size = self.db.execute(
-                    f"SELECT COUNT(*) AS count FROM {self.name}"
-                ).fetchone()['count']
-        
-        return self._size
+        if "." not in self.name:
+            try:
+                # only trust the counter while its trigger exists, i.e. the table wasn't dropped and recreated
+                row = self.db.execute(f"SELECT n FROM {Tables.ROW_COUNTS} WHERE tbl = ? AND EXISTS "
+                    "(SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = ?)",
+                    (self.name, f"{Tables.ROW_COUNTS}_{self.name}_insert")).fetchone()
+                if row is not None:
+                    return row[0]
+            except sqlite3.OperationalError:  # no counters in this database
+                pass
+
+        return self.db.execute(f"SELECT COUNT(*) FROM {self._table}").fetchone()[0]
+
+    def _hydrate(self, columns:tuple, rows:list) -> list:
+        if self.datatype is None or not rows:
+            return rows
+        hydrate = self.datatype.hydrator(columns)
+        return [hydrate(row) for row in rows]
+
+    @staticmethod
+    def _description(cursor:sqlite3.Cursor) -> tuple:
+        return tuple(col[0] for col in cursor.description)
+
+    def chunks(self, size:int=None):
+        """
+        Yields lists of up to `size` rows.
+        Each chunk seeks past the previous one by rowid, so no read stays open between chunks
+        and late chunks cost the same as early ones.
+        """
+
+        size = size or self.chunk_size
+        key = self._key
+        if "," in key:  # composite primary key: a single cursor, fetched in chunks
+            cursor = self.db.execute(f"SELECT * FROM {self._table} ORDER BY {key}")
+            columns = self._description(cursor)
+            while rows := cursor.fetchmany(size):
+                yield self._hydrate(columns, rows)
+            return
+
+        # without a rowid alias, the rowid is selected first and stripped from the rows
+        hidden = key == "rowid"
+        last = None
+        while True:
+            cursor = self.db.execute(
+                f"SELECT {'rowid, ' if hidden else ''}* FROM {self._table} "
+                f"{'' if last is None else f'WHERE {key} > ?'} ORDER BY {key} LIMIT ?",
+                (size,) if last is None else (last, size))
+            rows = cursor.fetchall()
+            if not rows:
+                return
+
+            columns = self._description(cursor)
+            if hidden:
+                last = rows[-1][0]
+                columns = columns[1:]
+                record = Record.layout(columns)
+                rows = [record(row[1:]) for row in rows]
+            else:
+                last = rows[-1][columns.index(key)]
+
+            yield self._hydrate(columns, rows)
+            if len(rows) < size:
+                return
+
+    def __iter__(self):
+        for chunk in self.chunks():
+            yield from chunk
+
+    def _fetch(self, limit:int, offset:int) -> list:
+        cursor = self.db.execute(f"SELECT * FROM {self._table} ORDER BY {self._key} LIMIT ? OFFSET ?", (limit, offset))
+        return self._hydrate(self._description(cursor), cursor.fetchall())
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            if any(bound is not None and bound < 0 for bound in (idx.start, idx.stop, idx.step)):
+                start, stop, step = idx.indices(len(self))
+            else:
+                start, stop, step = idx.start or 0, idx.stop, idx.step or 1
+
+            if step < 0:
+                # the same rows, fetched in order and then reversed
+                return self[stop + 1:start + 1][::-1][::-step]
+            if stop is not None and stop <= start:
+                return []
+
+            rows = self._fetch(-1 if stop is None else stop - start, start)
+            return rows[::step] if step != 1 else rows
+
+        if not isinstance(idx, int):
+            raise TypeError(f"{self.__class__.__name__} indices must be integers or slices, not {type(idx).__name__}")
+        if idx < 0:
+            idx += len(self)
+        rows = self._fetch(1, idx) if idx >= 0 else None
+        if not rows:
+            raise IndexError(f"{self.name} index out of range")
+        return rows[0]
 
     def __len__(self): return self.size
+    def __bool__(self): return self.db.execute(f"SELECT 1 FROM {self._table} LIMIT 1").fetchone() is not None
     def __repr__(self): return f"{self.name}: {', '.join(self.columns)}"
 
 
 class User(Model):
     __slots__ = [USER_ID, USER_VAL, PASSWORD]
+    id_column = USER_ID
+    val_column = USER_VAL
+    direct_hydration = True
 
     def __init__(self, user_id:int=None, user_val:str=None, password:str=None):
         super().__init__(pk=user_id, val=user_val)
         self.user_id = user_id
         self.user_val = user_val
         self.password = password
+
+
+def model_for(info:'TableInfo', base:type=Model) -> type:
+    """
+    Generates a `__slots__` Model subclass from a table's schema.
+
+    Columns that are not identifiers or would shadow Model attributes are left out.
+    """
+
+    reserved = set(dir(base)) | {ID, VAL}
+    fields = [col for col in info.columns if col.isidentifier() and not keyword.iskeyword(col) and col not in reserved]
+    val_column = f"{info.name}_{VAL}"
+
+    return type(
+        "".join(part.capitalize() for part in info.name.split("_")) or "Model",
+        (base,),
+        {
+            "__slots__": fields,
+            "__module__": __name__,
+            "columns": fields,
+            "id_column": info.primary_key[0] if len(info.primary_key) == 1 else None,
+            "val_column": val_column if val_column in info.columns else None,
+        }
+    )
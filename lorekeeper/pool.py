@@ -0,0 +1,163 @@
+import sqlite3
+import threading
+
+
+PRAGMA_PROFILES = {
+    # connection defaults, apart from a busy timeout
+    "default": {
+        "busy_timeout": 5000,
+    },
+    # concurrent readers alongside a single writer; durable at checkpoint
+    "wal": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -16000,  # KiB, i.e. ~16 MB of page cache per connection
+        "mmap_size": 268435456,
+        "busy_timeout": 5000,
+        "temp_store": "MEMORY",
+    },
+    # read-only replicas; the journal mode is whatever the file was written with
+    "readonly": {
+        "cache_size": -16000,
+        "mmap_size": 268435456,
+        "busy_timeout": 5000,
+        "temp_store": "MEMORY",
+        "query_only": 1,
+    },
+    # bulk loads and scratch databases; not crash-safe
+    "bulk": {
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "cache_size": -64000,
+        "mmap_size": 1073741824,
+        "busy_timeout": 30000,
+        "temp_store": "MEMORY",
+    },
+}
+
+
+class ConnectionPool(object):
+    """
+    A bounded pool of long-lived connections to one SQLite database.
+
+    Connections are opened lazily up to `size`, configured once with a PRAGMA profile
+    and reused across requests and threads, so each request keeps a warm page cache
+    and prepared statements instead of reconnecting.
+    Idle connections are handed out most-recently-used first.
+    """
+
+    def __init__(self, database:str, size:int=5, profile:str="wal", pragmas:dict=None, timeout:float=5.0,
+            row_factory=None, on_connect=None, **connect_kwargs) -> None:
+        self.database = database
+        self.size = size
+        self.profile = profile
+        self.pragmas = {**PRAGMA_PROFILES[profile], **(pragmas or {})}
+        self.timeout = timeout
+        self.row_factory = row_factory
+        self.on_connect = on_connect
+        self.connect_kwargs = connect_kwargs
+
+        self._idle = []
+        self._open = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+
+    def __repr__(self): return f"{self.__class__.__name__}: {self.database} ({self._open}/{self.size} open, {len(self._idle)} idle)"
+
+    def connect(self) -> sqlite3.Connection:
+        """Opens a new connection with this pool's settings, outside of the pool."""
+
+        db = sqlite3.connect(self.database, check_same_thread=False, **self.connect_kwargs)
+        db.row_factory = self.row_factory
+        for pragma, val in self.pragmas.items():
+            db.execute(f"PRAGMA {pragma} = {val}")
+        if self.on_connect:
+            self.on_connect(db)
+
+        return db
+
+    def checkout(self) -> sqlite3.Connection:
+        """
+        Takes an idle connection, opening a new one while under `size`,
+            else waits up to `timeout` seconds for one to be checked in.
+
+        :raises sqlite3.OperationalError: if the pool is closed or the wait times out.
+        """
+
+        with self._cond:
+            if self._closed:
+                raise sqlite3.OperationalError(f"Connection pool for '{self.database}' is closed.")
+
+            self.checkouts += 1
+            if not self._idle and self._open >= self.size:
+                self.waits += 1
+                if not self._cond.wait_for(lambda: self._idle or self._open < self.size, self.timeout):
+                    self.timeouts += 1
+                    raise sqlite3.OperationalError(f"Timed out waiting for a connection to '{self.database}'.")
+
+            if self._idle:
+                return self._idle.pop()
+            self._open += 1
+
+        try:
+            return self.connect()
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+
+    def checkin(self, db:sqlite3.Connection) -> None:
+        """Returns `db` to the pool, rolling back anything left uncommitted."""
+
+        try:
+            if db.in_transaction:
+                db.rollback()
+            db.row_factory = self.row_factory
+        except sqlite3.ProgrammingError:  # closed by the caller
+            return self.discard(db)
+
+        with self._cond:
+            if self._closed:
+                self._open -= 1
+                db.close()
+            else:
+                self._idle.append(db)
+            self._cond.notify()
+
+    def discard(self, db:sqlite3.Connection) -> None:
+        """Closes `db` instead of returning it to the pool."""
+
+        db.close()
+        with self._cond:
+            self._open -= 1
+            self._cond.notify()
+
+    def close(self) -> None:
+        """Closes idle connections now and checked-out ones as they come back."""
+
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                self._idle.pop().close()
+                self._open -= 1
+            self._cond.notify_all()
+
+    @property
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "database": self.database,
+                "profile": self.profile,
+                "size": self.size,
+                "open": self._open,
+                "idle": len(self._idle),
+                "in_use": self._open - len(self._idle),
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "timeouts": self.timeouts,
+            }
@@ -0,0 +1,175 @@
+from bisect import bisect_left
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from lorekeeper.lorekeeper.consts import Config
+from lorekeeper.lorekeeper.stats import ProcessStats
+
+
+logger = logging.getLogger(__name__)
+
+# histogram bucket upper bounds, in milliseconds
+BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float("inf"))
+
+
+class QueryProfiler(ProcessStats):
+    """
+    Times every statement LoreKeeper runs and aggregates them per SQL shape
+    (the statement with literals and IN lists collapsed), with a latency histogram per shape.
+
+    Statements slower than `slow_threshold` seconds are logged (as warnings, to this module's logger)
+    together with their EXPLAIN QUERY PLAN.
+
+    :param path: Where the `query-stats` command finds this process's stats (see `ProcessStats`).
+    """
+
+    _shape_patterns = (
+        (re.compile(r"'(?:[^']|'')*'"), "?"),
+        (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),
+        (re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)"), "(...)"),
+        (re.compile(r"\s+"), " "),
+    )
+
+    def __init__(self, slow_threshold:float=0.1, path:str=None, flush_interval:float=10.0) -> None:
+        self.slow_threshold = slow_threshold
+
+        self._stats = {}
+        self._shapes = {}
+        self._lock = threading.Lock()
+        self._init_flush(path, flush_interval)
+
+    def __repr__(self): return f"{self.__class__.__name__}: {len(self._stats)} shapes (slow >= {self.slow_threshold}s)"
+
+    @classmethod
+    def from_config(cls, config:dict, instance_path:str) -> 'QueryProfiler':
+        return cls(
+            slow_threshold=config.get(Config.SLOW_QUERY, 0.1),
+            path=config.get(Config.QUERY_STATS, os.path.join(instance_path, "query-stats"))
+        )
+
+    # ==========================================================================================
+    # recording
+
+    def execute(self, db:sqlite3.Connection, query:str, params=(), fetch:bool=False, many:bool=False):
+        """Runs `query` like `LoreKeeper._execute` and records it."""
+
+        start = time.perf_counter()
+        cursor = db.executemany(query, params) if many else db.execute(query, params)
+        rows = cursor.fetchall() if fetch else None
+        duration = time.perf_counter() - start
+
+        count = len(rows) if fetch else cursor.rowcount
+        self.record(query, duration, count)
+        if duration >= self.slow_threshold:
+            self._log_slow(db, query, params[0] if many and params else params, duration, count)
+
+        return (cursor, rows) if fetch else cursor
+
+    def shape(self, query:str) -> str:
+        try:
+            return self._shapes[query]
+        except KeyError:
+            shape = query
+            for pattern, repl in self._shape_patterns:
+                shape = pattern.sub(repl, shape)
+            shape = shape.strip().rstrip(";")
+
+            if len(self._shapes) >= 4096:
+                self._shapes.clear()
+            self._shapes[query] = shape
+            return shape
+
+    def record(self, query:str, duration:float, rows:int=-1) -> None:
+        shape = self.shape(query)
+        with self._lock:
+            stats = self._stats.get(shape)
+            if stats is None:
+                stats = self._stats[shape] = {
+                    "count": 0, "total": 0.0, "min": duration, "max": 0.0, "rows": 0, "buckets": [0] * len(BUCKETS)
+                }
+
+            stats["count"] += 1
+            stats["total"] += duration
+            stats["min"] = min(stats["min"], duration)
+            stats["max"] = max(stats["max"], duration)
+            if rows > 0:
+                stats["rows"] += rows
+            stats["buckets"][bisect_left(BUCKETS, duration * 1000)] += 1
+
+        self._maybe_flush()
+
+    def _log_slow(self, db:sqlite3.Connection, query:str, params, duration:float, rows:int) -> None:
+        try:
+            cursor = db.cursor()
+            cursor.row_factory = None
+            # (id, parent, notused, detail)
+            plan = "\n".join(f"  {detail}" for *_, detail in cursor.execute(f"EXPLAIN QUERY PLAN {query}", params))
+        except sqlite3.Error as e:
+            plan = f"  (no plan: {e})"
+
+        logger.warning("Slow query (%.1f ms, %d rows): %s%s", duration * 1000, rows, query, f"\n{plan}" if plan else "")
+
+    # ==========================================================================================
+    # reporting
+
+    @property
+    def stats(self) -> dict:
+        with self._lock:
+            return {shape: {**stats, "buckets": list(stats["buckets"])} for shape, stats in self._stats.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats = {}
+
+    @staticmethod
+    def _merge(flushed) -> dict:
+        merged = {}
+        for process in flushed:
+            for shape, stats in process.items():
+                into = merged.get(shape)
+                if into is None:
+                    merged[shape] = stats
+                    continue
+                into["count"] += stats["count"]
+                into["total"] += stats["total"]
+                into["min"] = min(into["min"], stats["min"])
+                into["max"] = max(into["max"], stats["max"])
+                into["rows"] += stats["rows"]
+                into["buckets"] = [a + b for a, b in zip(into["buckets"], stats["buckets"])]
+
+        return merged
+
+    @staticmethod
+    def percentile(buckets:list, pct:float) -> float:
+        """Upper bound, in ms, of the histogram bucket holding the `pct` percentile."""
+
+        target = sum(buckets) * pct / 100
+        seen = 0
+        for bound, n in zip(BUCKETS, buckets):
+            seen += n
+            if n and seen >= target:
+                return bound
+        return 0.0
+
+    @classmethod
+    def report(cls, stats:dict, sort:str="total", top:int=20) -> list:
+        """Text lines summarizing `stats`, slowest (by `sort`) first, each followed by its histogram."""
+
+        lines = []
+        for shape, s in sorted(stats.items(), key=lambda item: item[1][sort], reverse=True)[:top]:
+            lines.append(
+                f"{s['count']:>8} calls  {s['total'] * 1000:>10.1f} ms total  {s['total'] / s['count'] * 1000:>8.2f} ms avg  "
+                f"p50 <= {cls.percentile(s['buckets'], 50):g} ms  p99 <= {cls.percentile(s['buckets'], 99):g} ms  "
+                f"max {s['max'] * 1000:.2f} ms  {s['rows']} rows"
+            )
+            lines.append(f"    {shape}")
+            peak = max(s['buckets'])
+            for bound, n in zip(BUCKETS, s['buckets']):
+                if n:
+                    lines.append(f"    <= {bound:>7g} ms {n:>8} {'#' * max(1, round(40 * n / peak))}")
+
+        return lines
@@ -0,0 +1,58 @@
+from collections import OrderedDict
+
+
+class StatementCache(object):
+    """
+    Bounded LRU of compiled SQL templates keyed by the structural shape of a query.
+
+    Values never take part in the key; they are bound through `?` placeholders,
+    so every call with the same shape reuses the same statement text
+    (and hits sqlite3's own prepared statement cache).
+    """
+
+    def __init__(self, maxsize:int=256):
+        self.maxsize = maxsize
+        self._statements = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self): return len(self._statements)
+    def __contains__(self, key): return key in self._statements
+    def __repr__(self): return f"{self.__class__.__name__}: {len(self)}/{self.maxsize} (hits={self.hits}, misses={self.misses})"
+
+    def get(self, key, compile_func) -> str:
+        """
+        Returns the statement cached under `key`,
+            else compiles it with `compile_func()` and caches it.
+        """
+
+        try:
+            statement = self._statements[key]
+        except KeyError:
+            self.misses += 1
+            statement = self._statements[key] = compile_func()
+            if len(self._statements) > self.maxsize:
+                self._statements.popitem(last=False)
+        except TypeError:
+            # unhashable shape; compile without caching
+            self.misses += 1
+            return compile_func()
+        else:
+            self.hits += 1
+            self._statements.move_to_end(key)
+
+        return statement
+
+    def clear(self) -> None:
+        """Drops every compiled statement; the hit/miss counters are kept."""
+
+        self._statements.clear()
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "size": len(self._statements),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
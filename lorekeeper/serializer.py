@@ -0,0 +1,96 @@
+from itertools import islice
+import json
+from operator import attrgetter
+from flask import Response, stream_with_context
+
+from lorekeeper.lorekeeper.models import Model, Record
+
+
+class JSONSerializer(object):
+    """
+    Serializes a whole result set (a list, or the generator `LoreKeeper.iter_select` returns)
+    of Models, Records or dicts as one JSON array, `batch_size` rows per `json` encoder call.
+
+    Each Model class gets a slot accessor built once, instead of a `to_dict()` and a `json.dumps` per row;
+    the output is the same as "[" + ", ".join(obj.to_json() for obj in rows) + "]".
+
+    :param buffer_size: Size, in characters, of the pieces the array is yielded in
+        (all but the last), so a streamed response holds at most about one batch plus this much.
+    :param default: Called for values `json` can't encode (e.g. dates); None raises TypeError instead.
+    """
+
+    def __init__(self, batch_size:int=1000, buffer_size:int=1 << 16, default=str) -> None:
+        self.batch_size = batch_size
+        self.buffer_size = buffer_size
+        self._encode = json.JSONEncoder(default=default).encode
+        self._accessors = {}
+
+    def __repr__(self): return f"{self.__class__.__name__}: {self.batch_size} rows per batch"
+
+    def accessor(self, cls:type):
+        """Returns (and caches) a function turning a `cls` instance into a dict."""
+
+        try:
+            return self._accessors[cls]
+        except KeyError:
+            pass
+
+        if issubclass(cls, Model):
+            keys = tuple(cls.__slots__)
+            if len(keys) == 1:
+                get = attrgetter(keys[0])
+                accessor = lambda obj: {keys[0]: get(obj)}
+            else:
+                get = attrgetter(*keys)
+                accessor = lambda obj: dict(zip(keys, get(obj)))
+        elif issubclass(cls, Record):
+            keys = cls._columns
+            accessor = lambda row: dict(zip(keys, row))
+        elif issubclass(cls, dict) or cls is type(None):  # encoded as they are; None as null
+            accessor = None
+        else:  # sqlite3.Row and the like
+            accessor = lambda row: dict(zip(row.keys(), row))
+
+        self._accessors[cls] = accessor
+        return accessor
+
+    def iter_encode(self, rows):
+        """Yields the JSON array of `rows` in pieces of `buffer_size` characters."""
+
+        rows = iter(rows)
+        buffer, size, sep = ["["], 1, ""
+        while batch := list(islice(rows, self.batch_size)):
+            cls, accessor = None, None
+            dicts = []
+            for row in batch:
+                if row.__class__ is not cls:
+                    cls = row.__class__
+                    accessor = self.accessor(cls)
+                dicts.append(accessor(row) if accessor else row)
+
+            text = self._encode(dicts)[1:-1]
+            buffer.append(sep + text)
+            size += len(text)
+            sep = ", "
+
+            if size >= self.buffer_size:
+                text = "".join(buffer)
+                full = len(text) - len(text) % self.buffer_size
+                for start in range(0, full, self.buffer_size):
+                    yield text[start:start + self.buffer_size]
+                buffer, size = [text[full:]], len(text) - full
+
+        buffer.append("]")
+        yield "".join(buffer)
+
+    def dumps(self, rows) -> str:
+        return "".join(self.iter_encode(rows))
+
+    def response(self, rows, status:int=200, headers:dict=None) -> Response:
+        """
+        A streaming `application/json` response of `rows`.
+        Generators (e.g. from `iter_select`) keep the app context, and so their connection, until fully sent.
+        """
+
+        return Response(stream_with_context(self.iter_encode(rows)), status=status, headers=headers,
+            mimetype="application/json")
@@ -0,0 +1,62 @@
+import atexit
+import json
+import os
+import threading
+import time
+
+
+class ProcessStats(object):
+    """
+    Mixin for stats each worker process collects on its own and a command merges afterwards:
+    the process's `stats` are written to `path`/<pid>.json every `flush_interval` seconds
+    (checked by `_maybe_flush` as stats are recorded) and at exit, and `load` merges every file.
+
+    Subclasses call `_init_flush` from `__init__`, provide `stats` (JSON-serializable)
+    and `_merge`, which combines the stats of every file into one.
+    """
+
+    def _init_flush(self, path:str=None, flush_interval:float=10.0) -> None:
+        self.path = path
+        self.flush_interval = flush_interval
+        self._flush_lock = threading.Lock()
+        self._flushed = time.monotonic()
+
+        if path:
+            atexit.register(self.flush)
+
+    def _maybe_flush(self) -> None:
+        if self.path and time.monotonic() - self._flushed >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        """Writes this process's stats to `path`/<pid>.json."""
+
+        self._flushed = time.monotonic()
+        if not self.path:
+            return
+
+        with self._flush_lock:
+            os.makedirs(self.path, exist_ok=True)
+            filename = os.path.join(self.path, f"{os.getpid()}.json")
+            with open(f"{filename}.tmp", "w") as f:
+                json.dump(self.stats, f)
+            os.replace(f"{filename}.tmp", filename)
+
+    @classmethod
+    def load(cls, path:str) -> dict:
+        """Merges the stats every process flushed to `path`."""
+        return cls._merge(cls._flushed_stats(path))
+
+    @staticmethod
+    def _flushed_stats(path:str):
+        if not os.path.isdir(path):
+            return
+
+        for filename in os.listdir(path):
+            if filename.endswith(".json"):
+                with open(os.path.join(path, filename)) as f:
+                    yield json.load(f)
+
+    @staticmethod
+    def _merge(flushed) -> dict:
+        raise NotImplementedError
@@ -0,0 +1,175 @@
+from bisect import bisect_left
+import atexit
+from concurrent.futures import Future
+from flask import Flask
+import queue
+import threading
+import time
+
+from lorekeeper.lorekeeper.consts import Config
+from lorekeeper.lorekeeper.profiler import BUCKETS, QueryProfiler
+
+
+class WriteBehind(object):
+    """
+    Write-behind mode for a `LoreKeeper`: writes from any thread are queued, and a single writer
+    thread, owning the write connection, runs them in groups of up to `max_batch`,
+    waiting at most `max_delay` seconds for a group to fill, and commits each group once.
+    Threads stop contending for the SQLite write lock, and a group costs one fsync instead of one per write.
+
+    Each write runs in its own SAVEPOINT, so a failing write only undoes itself.
+    `submit` returns a Future that resolves once the write's group has committed
+    (to the write's return value, or its exception).
+
+    :param max_pending: Writes queued at once; `submit` blocks while the queue is full.
+    """
+
+    def __init__(self, lorekeeper:'LoreKeeper', app:Flask, max_batch:int=256, max_delay:float=0.002,
+            max_pending:int=10000) -> None:
+        self.lk = lorekeeper
+        self.app = app
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+
+        self._queue = queue.Queue(max_pending)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._closed = False
+
+        self.batches = 0
+        self.writes = 0
+        self.failures = 0
+        self.max_depth = 0
+        self.max_batch_seen = 0
+        self.commit_time = 0.0
+        self.commit_max = 0.0
+        self._commit_buckets = [0] * len(BUCKETS)
+
+    def __repr__(self): return f"{self.__class__.__name__}: {self._queue.qsize()} queued (batches of <= {self.max_batch})"
+
+    @classmethod
+    def from_config(cls, lorekeeper:'LoreKeeper', app:Flask) -> 'WriteBehind':
+        return cls(
+            lorekeeper, app,
+            max_batch=app.config.get(Config.WRITE_BATCH, 256),
+            max_delay=app.config.get(Config.WRITE_DELAY, 0.002),
+            max_pending=app.config.get(Config.WRITE_QUEUE, 10000)
+        )
+
+    @property
+    def is_writer(self) -> bool:
+        """Whether the calling thread is the writer thread."""
+        return threading.current_thread() is self._thread
+
+    def submit(self, func, *args, **kwargs) -> Future:
+        """Queues `func(*args, **kwargs)` to run on the writer thread."""
+
+        if self._closed:
+            raise RuntimeError("Write-behind queue is closed.")
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="lorekeeper-writer", daemon=True)
+                    self._thread.start()
+                    atexit.register(self.close)
+
+        future = Future()
+        self._queue.put((future, func, args, kwargs))
+        return future
+
+    def close(self) -> None:
+        """Commits everything already queued, then stops the writer thread."""
+
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+
+    # ==========================================================================================
+    # writer thread
+
+    def _run(self) -> None:
+        with self.app.app_context():
+            stop = False
+            while not stop:
+                item = self._queue.get()
+                if item is None:
+                    break
+
+                batch = [item]
+                depth = self._queue.qsize() + 1
+                deadline = time.monotonic() + self.max_delay
+                while len(batch) < self.max_batch:
+                    try:
+                        item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stop = True
+                        break
+                    batch.append(item)
+
+                self._commit(batch, depth)
+
+    def _commit(self, batch:list, depth:int) -> None:
+        lk = self.lk
+        start = time.perf_counter()
+        outcomes = []
+        try:
+            lk.catalog.validate(lk.db)
+            with lk.transaction("IMMEDIATE"):
+                for future, func, args, kwargs in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    try:
+                        with lk.transaction():  # a SAVEPOINT
+                            outcomes.append((future, func(*args, **kwargs), None))
+                    except Exception as e:
+                        outcomes.append((future, None, e))
+        except Exception as e:  # validate, BEGIN or COMMIT failed: nothing in the group was written
+            for future, *_ in batch:
+                if not future.done():  # pending if BEGIN failed, running if COMMIT did
+                    future.set_exception(e)
+            self._record(len(batch), depth, time.perf_counter() - start, len(batch))
+            return
+
+        elapsed = time.perf_counter() - start
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+        self._record(len(batch), depth, elapsed, sum(1 for *_, error in outcomes if error is not None))
+
+    def _record(self, size:int, depth:int, elapsed:float, failures:int) -> None:
+        with self._lock:
+            self.batches += 1
+            self.writes += size
+            self.failures += failures
+            self.max_depth = max(self.max_depth, depth)
+            self.max_batch_seen = max(self.max_batch_seen, size)
+            self.commit_time += elapsed
+            self.commit_max = max(self.commit_max, elapsed)
+            self._commit_buckets[bisect_left(BUCKETS, elapsed * 1000)] += 1
+
+    # ==========================================================================================
+    # metrics
+
+    @property
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self.max_depth,
+                "batches": self.batches,
+                "writes": self.writes,
+                "failures": self.failures,
+                "mean_batch": self.writes / self.batches if self.batches else 0.0,
+                "max_batch": self.max_batch_seen,
+                "commit_mean_ms": self.commit_time / self.batches * 1000 if self.batches else 0.0,
+                "commit_p99_ms": QueryProfiler.percentile(self._commit_buckets, 99),
+                "commit_max_ms": self.commit_max * 1000,
+            }
@@ -0,0 +1,54 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# the repository is itself the `lorekeeper` package; make it importable under that name
+if os.path.basename(ROOT) == "lorekeeper":
+    sys.path.insert(0, os.path.dirname(ROOT))
+else:
+    _parent = tempfile.mkdtemp()
+    os.symlink(ROOT, os.path.join(_parent, "lorekeeper"))
+    sys.path.insert(0, _parent)
+
+from lorekeeper.lorekeeper.consts import *
+from lorekeeper.testing import create_app
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app()
+    app.config.update({
+        "DATABASE": str(tmp_path / "db.sqlite"),
+        Config.PASSWORD_METHOD: "pbkdf2:sha256:1000",
+        Config.HASH_WORKERS: 0,
+    })
+    with app.app_context():
+        app.lk._init_db()
+
+    yield app
+
+    if app.lk.write_behind is not None:
+        app.lk.write_behind.close()
+    with app.app_context():
+        app.lk.pool.close()
+
+
+@pytest.fixture
+def lk(app):
+    with app.app_context():
+        yield app.lk
+
+
+@pytest.fixture
+def notes(lk):
+    lk.run_query("CREATE TABLE note (note_id INTEGER PRIMARY KEY, user_id INTEGER, editor_id INTEGER, note_val TEXT UNIQUE)")
+    return lk
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
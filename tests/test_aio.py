@@ -0,0 +1,127 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from lorekeeper.lorekeeper.aio import AsyncLoreKeeper
+from lorekeeper.lorekeeper.consts import *
+
+SLOW = "SELECT MAX(i) FROM (WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) SELECT i FROM n)"  # never ends
+
+
+@pytest.fixture
+def alk(app, notes):
+    alk = AsyncLoreKeeper(notes, app, readers=2)
+    yield alk
+    alk.close()
+
+
+def test_concurrent_reads(alk, notes):
+    notes.insert_many("note", [{"note_val": f"note{n}"} for n in range(10)])
+
+    async def main():
+        return await asyncio.gather(*(alk.aselect("note", where={"note_id": n}) for n in range(1, 11)))
+
+    results = asyncio.run(main())
+    assert [rows[0]["note_val"] for rows in results] == [f"note{n}" for n in range(10)]
+
+
+def test_reads_go_to_the_least_busy_reader(alk):
+    async def main():
+        slow = asyncio.ensure_future(alk.arun_query(SLOW))
+        await asyncio.sleep(0.05)
+        busy = [worker for worker in alk._readers if worker.pending]
+        idle = alk._reader()
+        slow.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await slow
+        return busy, idle
+
+    busy, idle = asyncio.run(main())
+    assert len(busy) == 1 and idle is not busy[0]
+
+
+def test_writes_are_serialized_on_one_thread(alk, notes):
+    def insert(n):
+        notes.insert("note", {"note_val": f"note{n}"})
+        return threading.current_thread().name
+
+    async def main():
+        return await asyncio.gather(*(alk.atransaction(lambda lk, n=n: insert(n)) for n in range(20)))
+
+    threads = asyncio.run(main())
+    assert len(set(threads)) == 1 and threads[0].startswith("lorekeeper-writer")
+    assert len(notes.get_table("note")) == 20
+
+
+def test_cancelled_read_is_interrupted(app):
+    alk = AsyncLoreKeeper(app.lk, app, readers=1)
+
+    async def main():
+        slow = asyncio.ensure_future(alk.arun_query(SLOW))
+        await asyncio.sleep(0.05)
+        slow.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await slow
+
+        # the reader is free again only once the interrupted statement has stopped
+        start = time.monotonic()
+        rows = await asyncio.wait_for(alk.aselect(Tables.USER, where={USER_ID: 1}), timeout=5)
+        return rows, time.monotonic() - start
+
+    try:
+        rows, waited = asyncio.run(main())
+    finally:
+        alk.close()
+    assert rows[0][USER_VAL] == "admin" and waited < 5
+
+
+def test_close_returns_replica_connections(app, lk, tmp_path):
+    app.config["REPLICA"] = str(tmp_path / "replica.sqlite")
+    lk.replicas = {"copy": "REPLICA"}
+    lk.refresh_replica()
+    alk = AsyncLoreKeeper(lk, app, readers=2)
+
+    async def main():
+        return await asyncio.gather(*(alk.aselect(Tables.USER) for _ in range(4)))
+
+    try:
+        asyncio.run(main())
+        assert lk.replica_pool("copy").stats["in_use"] == 2
+    finally:
+        alk.close()
+    assert lk.replica_pool("copy").stats["in_use"] == 0
+
+
+@pytest.fixture
+def replicated(app, lk, tmp_path):
+    app.config["REPLICA"] = str(tmp_path / "replica.sqlite")
+    lk.replicas = {"copy": "REPLICA"}
+    lk.refresh_replica()
+    alk = AsyncLoreKeeper(lk, app, readers=1)
+    yield alk
+    alk.close()
+
+
+def test_cancelled_replica_read_is_interrupted(replicated):
+    async def main():
+        slow = asyncio.ensure_future(replicated.arun_query(SLOW))
+        await asyncio.sleep(0.05)
+        slow.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await slow
+        return await asyncio.wait_for(replicated.aselect_one(Tables.USER, 1), timeout=5)
+
+    assert asyncio.run(main())[USER_VAL] == "admin"
+
+
+def test_select_one_forwards_route(replicated, lk):
+    lk.insert(Tables.USER, {USER_VAL: "picard", PASSWORD: "x"})  # not in the replica yet
+
+    async def main():
+        return (await replicated.aselect_one(Tables.USER, {USER_VAL: "picard"}),
+            await replicated.aselect_one(Tables.USER, {USER_VAL: "picard"}, route=PRIMARY, cache=True))
+
+    stale, fresh = asyncio.run(main())
+    assert stale is None and fresh[USER_VAL] == "picard"
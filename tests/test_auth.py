@@ -0,0 +1,89 @@
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from lorekeeper.lorekeeper.consts import *
+from lorekeeper.lorekeeper.writer import WriteBehind
+
+
+def register(client, username:str, password:str="engage"):
+    return client.post("/auth/register/", data={"username": username, "password": password})
+
+
+def test_register_logs_in(app, client):
+    response = register(client, "picard")
+
+    assert response.status_code == 302
+    with client.session_transaction() as session:
+        assert session[USER_ID]
+
+
+def test_register_with_write_behind(app, client):
+    app.lk.write_behind = WriteBehind(app.lk, app)
+
+    response = register(client, "riker")
+
+    assert response.status_code == 302
+    with app.app_context():
+        assert app.lk.select_one(Tables.USER, {USER_VAL: "riker"}) is not None
+    assert app.lk.write_behind.stats["writes"] == 1
+
+
+def test_user_cache_cleared_after_commit(app, client):
+    register(client, "data")
+    auth = app.blueprints["auth"]
+
+    with app.app_context():
+        user_id = app.lk.select_one(Tables.USER, {USER_VAL: "data"})[USER_ID]
+        with app.lk.transaction():
+            app.lk.update_many(Tables.USER, [{USER_ID: user_id, USER_VAL: "lore"}])
+            # another connection reloads the user before the commit, seeing the old row
+            auth.user_cache.set(user_id, "stale")
+
+        assert auth.user_cache.get(user_id) is None
+
+
+def test_user_load_racing_an_invalidation_not_cached(app, client, monkeypatch):
+    register(client, "lal")
+    auth = app.blueprints["auth"]
+
+    with app.app_context():
+        user_id = app.lk.select_one(Tables.USER, {USER_VAL: "lal"})[USER_ID]
+        auth.user_cache.clear()
+        select = app.lk.select
+
+        def select_then_write(*args, **kwargs):
+            rows = select(*args, **kwargs)
+            auth._table_written(Tables.USER)  # another request commits a user write before the load is cached
+            return rows
+
+        monkeypatch.setattr(app.lk, "select", select_then_write)
+        assert auth._get_user_by_id(user_id)[USER_VAL] == "lal"
+        assert auth.user_cache.get(user_id) is None
+
+        monkeypatch.setattr(app.lk, "select", select)
+        auth._get_user_by_id(user_id)
+        assert auth.user_cache.get(user_id) is not None
+
+
+def login(client, username:str, password:str="engage"):
+    return client.post("/auth/login/", data={"username": username, "password": password})
+
+
+def test_overloaded_hasher_answers_503(app, client):
+    app.config.update({Config.HASH_WORKERS: 1, Config.HASH_MAX_PENDING: 0})
+
+    assert register(client, "worf").status_code == 503
+    assert login(client, "admin", "admin").status_code == 503
+    with app.app_context():
+        assert app.lk.select_one(Tables.USER, {USER_VAL: "worf"}) is None
+
+
+def test_login_rehashes_outdated_password(app, client):
+    with app.app_context():
+        app.lk.insert(Tables.USER, {USER_VAL: "troi", PASSWORD: generate_password_hash("engage", "pbkdf2:sha256:500")})
+
+    assert login(client, "troi").status_code == 302
+
+    with app.app_context():
+        stored = app.lk.select_one(Tables.USER, {USER_VAL: "troi"})[PASSWORD]
+    assert stored.startswith("pbkdf2:sha256:1000$")
+    assert check_password_hash(stored, "engage")
@@ -0,0 +1,59 @@
+import gzip
+import sqlite3
+
+import pytest
+
+
+def vals(lk) -> list:
+    return [row[0] for row in lk.run_query("SELECT note_val FROM note ORDER BY note_id")]
+
+
+@pytest.fixture
+def saved(notes):
+    notes.insert_many("note", [{"note_val": f"note{n}"} for n in range(200)])
+    return notes
+
+
+@pytest.mark.parametrize("compress, vacuum", [(False, False), (True, False), (False, True), (True, True)])
+def test_backup_restore_roundtrip(saved, tmp_path, compress, vacuum):
+    path = str(tmp_path / "backup.sqlite")
+    steps = []
+    result = saved.backup(path, pages=2, sleep=0, compress=compress, vacuum=vacuum,
+        progress=lambda remaining, total: steps.append(remaining))
+
+    assert result["pages"] > 0 and steps[-1] == 0
+    with open(path, "rb") as f:
+        assert (f.read(2) == b"\x1f\x8b") == compress
+
+    saved.run_query("DELETE FROM note WHERE note_id > 10")
+    saved.insert("note", {"note_val": "after the backup"})
+
+    assert saved.restore(path)["pages"] == result["pages"]
+    assert vals(saved) == [f"note{n}" for n in range(200)]
+    assert not (tmp_path / "db.sqlite.restore").exists()
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_restore_rejects_corrupt_file(saved, tmp_path, compress):
+    path = str(tmp_path / "backup.sqlite")
+    saved.backup(path, sleep=0)
+    with open(path, "rb") as f:
+        data = bytearray(f.read())
+    data[4096:8192] = b"\xff" * 4096  # garble the second page
+    with (gzip.open if compress else open)(path, "wb") as f:
+        f.write(bytes(data))
+
+    with pytest.raises(sqlite3.DatabaseError):
+        saved.restore(path)
+
+    assert len(vals(saved)) == 200
+
+
+def test_restore_rejects_non_database(saved, tmp_path):
+    path = tmp_path / "backup.sqlite"
+    path.write_bytes(b"not a database" * 100)
+
+    with pytest.raises(sqlite3.DatabaseError):
+        saved.restore(str(path))
+
+    assert len(vals(saved)) == 200
@@ -0,0 +1,19 @@
+import pytest
+
+from lorekeeper.lorekeeper.consts import *
+
+
+def test_update_many_rejects_key_only_rows(lk):
+    with pytest.raises(ValueError, match="besides their key"):
+        lk.update_many(Tables.USER, [{USER_ID: 1, USER_VAL: "q"}, {USER_ID: 1}])
+
+    # the whole batch rolled back
+    assert lk.select_one(Tables.USER, {USER_ID: 1})[USER_VAL] != "q"
+
+
+def test_insert_many_nothing(lk):
+    lk.insert(Tables.USER, {USER_VAL: "q", "password": "x"})
+
+    assert lk.insert_many(Tables.USER, []) == (0, None)
+    assert lk.insert_many(Tables.USER, iter(())) == (0, None)
+    assert lk.insert_many(Tables.USER, [{USER_VAL: "r", "password": "x"}]) == (1, 3)
@@ -0,0 +1,64 @@
+import time
+
+import pytest
+
+from lorekeeper.lorekeeper.cache import MemoryBackend, ResultCache, SQLiteBackend
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def cache(request, tmp_path):
+    if request.param == "memory":
+        return ResultCache(MemoryBackend())
+    return ResultCache(SQLiteBackend(str(tmp_path / "cache.sqlite")))
+
+
+SELECT = "SELECT * FROM user WHERE user_id = ?"
+
+
+def test_set_skipped_after_concurrent_invalidation(cache):
+    generation = cache.generation(SELECT)
+    cache.invalidate("user")  # a write lands between the read and the set
+    cache.set(SELECT, (1,), "stale", generation=generation)
+
+    assert cache.get(SELECT, (1,)) is ResultCache._missing
+
+    cache.set(SELECT, (1,), "fresh", generation=cache.generation(SELECT))
+    assert cache.get(SELECT, (1,)) == "fresh"
+
+
+def test_set_skipped_after_clear(cache):
+    generation = cache.generation(SELECT)
+    cache.clear()
+    cache.set(SELECT, (1,), "stale", generation=generation)
+
+    assert cache.get(SELECT, (1,)) is ResultCache._missing
+
+
+def test_sqlite_hits_touch_used_once_per_interval(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "cache.sqlite"), touch=60.0)
+    backend.set("key", "value", ("user",))
+    used = backend.db.execute("SELECT used FROM result").fetchone()[0]
+
+    time.sleep(0.01)
+    assert backend.get("key") == "value"
+    assert backend.db.execute("SELECT used FROM result").fetchone()[0] == used
+
+
+
+def test_write_evicts_cached_select(lk):
+    select = lambda: lk.select("user", where={"user_id": 1}, cache=True)[0]["user_val"]
+    assert select() != "q"
+
+    lk.update_many("user", [{"user_id": 1, "user_val": "q"}])
+
+    assert select() == "q"
+
+
+def test_commit_evicts_select_cached_mid_transaction(lk):
+    SELECT = "SELECT user_val FROM user WHERE user_id = ?"
+    with lk.transaction():
+        lk.update_many("user", [{"user_id": 1, "user_val": "q"}])
+        # what another connection would cache before the commit
+        lk.result_cache.set(SELECT, (1,), "stale")
+
+    assert lk.result_cache.get(SELECT, (1,)) is ResultCache._missing
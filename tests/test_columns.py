@@ -0,0 +1,63 @@
+from array import array
+import math
+
+import pytest
+
+from lorekeeper.lorekeeper import lorekeeper as module
+
+
+@pytest.fixture
+def readings(lk):
+    lk.run_query("CREATE TABLE reading (reading_id INTEGER PRIMARY KEY, sensor INTEGER, value REAL, label TEXT)")
+    lk.insert_many("reading", [{"sensor": n % 7, "value": n / 4, "label": f"r{n}"} for n in range(20000)])
+    return lk
+
+
+@pytest.fixture
+def no_numpy(monkeypatch):
+    monkeypatch.setattr(module, "numpy", None)
+
+
+def test_typecodes_from_declared_types(readings, no_numpy):
+    columns = readings.select("reading", layout="columns")
+
+    assert [(type(columns[name]), getattr(columns[name], "typecode", None)) for name in columns] == [
+        (array, "q"), (array, "q"), (array, "d"), (list, None)]
+    assert columns["sensor"][:8].tolist() == [0, 1, 2, 3, 4, 5, 6, 0]
+    assert columns["value"][3] == 0.75 and columns["label"][-1] == "r19999"
+
+
+def test_typecodes_inferred_for_expressions(readings, no_numpy):
+    columns = readings.select("reading", columns=["reading_id * 2 AS twice", "value + 1 AS shifted"],
+        where={("reading_id", 4): "<"}, layout="columns")
+
+    assert columns["twice"] == array("q", [2, 4, 6])
+    assert columns["shifted"] == array("d", [1.0, 1.25, 1.5])
+
+
+def test_null_in_integer_column_keeps_a_typed_array(readings, no_numpy):
+    readings.update_many("reading", [{"reading_id": 15000, "sensor": None, "value": None}])
+
+    columns = readings.select("reading", layout="columns")
+
+    sensor, value = columns["sensor"], columns["value"]
+    assert sensor.typecode == "d" and len(sensor) == 20000
+    assert math.isnan(sensor[14999]) and math.isnan(value[14999])
+    assert sensor[14998] == 14998 % 7 and sensor[15000] == 15000 % 7
+
+
+def test_empty_result_has_typed_buffers(readings, no_numpy):
+    columns = readings.select("reading", where={"label": "missing"}, layout="columns")
+
+    assert columns == {"reading_id": array("q"), "sensor": array("q"), "value": array("d"), "label": []}
+
+
+def test_numpy_arrays(readings):
+    numpy = pytest.importorskip("numpy")
+    readings.update_many("reading", [{"reading_id": 1, "sensor": None}])
+
+    columns = readings.select("reading", layout="columns")
+
+    assert columns["reading_id"].dtype == numpy.int64 and columns["reading_id"].sum() == 20000 * 20001 // 2
+    assert columns["sensor"].dtype == numpy.float64 and numpy.isnan(columns["sensor"][0])
+    assert columns["label"].dtype == object and columns["label"][1] == "r1"
@@ -0,0 +1,127 @@
+import pickle
+
+import pytest
+
+from lorekeeper.lorekeeper.consts import *
+from lorekeeper.lorekeeper.models import Model, Record, User
+
+
+def test_record_access():
+    row = Record.layout(("user_id", "user_val", "count"))((7, "riker", 3))
+
+    assert (row.id, row.val) == (7, "riker")
+    assert row["user_val"] == row.user_val == row[1] == "riker" and row[:2] == (7, "riker")
+    assert row["count"] == 3 and row.count(3) == 1  # shadowed tuple method
+    assert row.get("user_val") == "riker" and row.get("missing", "-") == "-"
+    assert row.to_dict() == dict(**row) == {"user_id": 7, "user_val": "riker", "count": 3}
+    assert row == (7, "riker", 3)
+    with pytest.raises(KeyError):
+        row["missing"]
+    with pytest.raises(AttributeError):
+        row.missing
+
+
+def test_record_without_id_or_val():
+    row = Record.layout(("n",))((1,))
+    assert row.id is None and row.val is None
+
+
+def test_record_classes_cached_per_layout(lk):
+    assert Record.layout(("a", "b")) is Record.layout(("a", "b"))
+    assert Record.layout(("a", "b")) is not Record.layout(("b", "a"))
+
+    first, second = (lk.run_query("SELECT user_id, user_val FROM user")[0] for _ in range(2))
+    assert type(first) is type(second) is Record.layout(("user_id", "user_val"))
+
+
+def test_record_pickles():
+    row = Record.layout(("user_id", "user_val"))((1, "admin"))
+    copy = pickle.loads(pickle.dumps(row))
+
+    assert copy == row and type(copy) is type(row) and copy.user_val == "admin"
+
+
+def test_hydrator_reads_columns_by_position():
+    columns = ("user_id", "user_val", "user_id", "password")
+    user = User.hydrator(columns)(Record.layout(columns)((1, "admin", 2, "secret")))
+
+    assert (user.user_id, user.user_val, user.password) == (1, "admin", "secret")
+
+
+def test_hydrator_after_repeated_join_column(notes):
+    notes.insert("note", {"user_id": 1, "note_val": "hello"})
+
+    note = notes.select("note", columns=["note.note_id", "note.user_id", "user.user_id", "note.note_val"],
+        join="user", datatype=Model)[0]
+
+    assert note.note_val == "hello"
+
+
+def test_explicit_datatype_wins_over_generated_model(notes):
+    notes.insert("note", {"user_id": 1, "note_val": "hello"})
+    generated = type(notes.select("note", datatype=Model)[0])
+    assert generated is not Model and notes.table_map["note"] is generated
+
+    class Note(Model):
+        __slots__ = ["note_id", "note_val"]
+
+    note = notes.select("note", datatype=Note)[0]
+    assert type(note) is Note and note.note_val == "hello"
+    assert type(notes.select_one("note", 1, datatype=Note)) is Note
+    assert type(notes.select(Tables.USER, datatype=Model)[0]) is User
+
+
+@pytest.fixture
+def table(notes):
+    notes.insert_many("note", [{"note_val": f"note{n}"} for n in range(10)])
+    return notes.get_table("note", chunk_size=3)
+
+
+def vals(rows) -> list:
+    return [row["note_val"] for row in rows]
+
+
+def test_table_len_and_iteration(table):
+    assert len(table) == 10
+    assert vals(table) == [f"note{n}" for n in range(10)]
+    assert [len(chunk) for chunk in table.chunks()] == [3, 3, 3, 1]
+
+
+@pytest.mark.parametrize("idx", [
+    slice(2, 5), slice(None, 3), slice(7, None), slice(-3, None), slice(None, None, 3),
+    slice(None, None, -1), slice(8, 2, -2), slice(5, 5), slice(20, 30),
+])
+def test_table_slices_like_a_list(table, idx):
+    assert vals(table[idx]) == [f"note{n}" for n in range(10)][idx]
+
+
+def test_table_indexing(table):
+    assert table[0]["note_val"] == "note0"
+    assert table[-1]["note_val"] == "note9"
+    with pytest.raises(IndexError):
+        table[10]
+    with pytest.raises(TypeError):
+        table["note0"]
+
+
+def test_table_len_from_tracked_counts(lk, table):
+    lk.track_counts("note")
+    lk.insert("note", {"note_val": "note10"})
+    lk.delete_many("note", [1, 2])
+
+    assert len(table) == 9 == lk.run_query("SELECT COUNT(*) FROM note")[0][0]
+
+
+def triggers(lk) -> list:
+    return [row[0] for row in lk.run_query("SELECT tbl_name FROM sqlite_master WHERE type = 'trigger'")]
+
+
+def test_row_counts_are_opt_in(lk, table):
+    assert triggers(lk) == []
+    assert len(table) == 10  # COUNT(*)
+
+    lk.row_counts = [Tables.USER]
+    lk._init_db(row_counts=["note"])
+
+    assert sorted(triggers(lk)) == ["note", "note", "user", "user"]
+    assert len(table) == 10
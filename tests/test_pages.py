@@ -0,0 +1,84 @@
+import datetime
+
+import pytest
+
+
+@pytest.fixture
+def entries(lk):
+    lk.run_query("CREATE TABLE entry (entry_id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, score INTEGER NOT NULL, "
+        "entry_val TEXT NOT NULL, note TEXT)")
+    # few distinct scores and vals, so pages break inside runs of equal sort values
+    lk.insert_many("entry", [{"user_id": 1, "score": n % 4, "entry_val": f"e{n % 3}"} for n in range(20)])
+    return lk
+
+
+def ids(rows) -> list:
+    return [row["entry_id"] for row in rows]
+
+
+def all_pages(lk, order_by, size:int=3, **kwargs) -> list:
+    rows, page, cursor = [], None, None
+    while page is None or cursor:
+        page, cursor = lk.select_page("entry", order_by, after=cursor, size=size, **kwargs)
+        assert len(page) <= size
+        rows.extend(page)
+    return rows
+
+
+@pytest.mark.parametrize("order_by, tie", [
+    (["score"], "entry_id"),
+    (["-score"], "-entry_id"),
+    (["score", "-entry_val"], "-entry_id"),
+    (["-score", "entry_val"], "entry_id"),
+    (["entry_val DESC", "score ASC"], "entry_id"),
+])
+def test_pages_match_a_single_ordered_select(entries, order_by, tie):
+    expected = entries.select("entry", order_by=[*order_by, tie])
+
+    assert ids(all_pages(entries, order_by)) == ids(expected)
+    assert len(expected) == 20
+
+
+def test_page_with_join_and_where(entries):
+    kwargs = {"columns": ["entry.*", "user.user_val"], "join": "user", "where": {("score", 2): "<"}}
+    rows = all_pages(entries, "-score", **kwargs)
+
+    assert ids(rows) == ids(entries.select("entry", order_by=["-score", "-entry_id"], **kwargs))
+    assert len(rows) == 10 and {row["user_val"] for row in rows} == {"admin"}
+
+
+def test_last_page_has_no_cursor(entries):
+    rows, cursor = entries.select_page("entry", "score", size=20)
+
+    assert len(rows) == 20 and cursor is None
+
+
+def test_cursor_rejected_for_another_ordering(entries):
+    _, cursor = entries.select_page("entry", "score", size=3)
+
+    with pytest.raises(ValueError, match="ordering"):
+        entries.select_page("entry", "-score", after=cursor)
+    with pytest.raises(ValueError, match="Malformed"):
+        entries.select_page("entry", "score", after="not a cursor")
+
+
+def test_nullable_ordering_column_rejected(entries):
+    with pytest.raises(ValueError, match="nullable"):
+        entries.select_page("entry", "note")
+    with pytest.raises(ValueError, match="nullable"):
+        entries.select_page("entry", ["score", "entry.note"])
+
+
+@pytest.mark.parametrize("order_by, tie", [(["created"], "event_id"), (["-created"], "-event_id"), (["-tag", "created"], "event_id")])
+def test_pages_by_timestamp_and_blob(lk, order_by, tie):
+    lk.run_query("CREATE TABLE event (event_id INTEGER PRIMARY KEY, created TIMESTAMP NOT NULL, tag BLOB NOT NULL)")
+    lk.insert_many("event", [{"created": f"2026-01-0{n % 4 + 1} 12:00:00", "tag": bytes([n % 3, 255])} for n in range(20)])
+
+    rows = []
+    page, cursor = None, None
+    while page is None or cursor:
+        page, cursor = lk.select_page("event", order_by, after=cursor, size=3)
+        rows.extend(page)
+
+    assert isinstance(rows[0]["created"], datetime.datetime)
+    assert [row["event_id"] for row in rows] == [row["event_id"] for row in lk.select("event", order_by=[*order_by, tie])]
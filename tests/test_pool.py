@@ -0,0 +1,80 @@
+import sqlite3
+import threading
+
+import pytest
+
+from lorekeeper.lorekeeper.pool import ConnectionPool
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.sqlite"), size=2, timeout=0.05)
+    db = pool.connect()
+    db.execute("CREATE TABLE note (note_val TEXT)")
+    db.commit()
+    db.close()
+    yield pool
+    pool.close()
+
+
+def test_connections_are_reused_and_configured(pool):
+    db = pool.checkout()
+    assert db.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert db.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+    pool.checkin(db)
+
+    assert pool.checkout() is db
+    assert pool.stats["open"] == 1
+
+
+def test_size_limit_and_timeout(pool):
+    first, second = pool.checkout(), pool.checkout()
+
+    with pytest.raises(sqlite3.OperationalError, match="Timed out"):
+        pool.checkout()
+
+    stats = pool.stats
+    assert (stats["open"], stats["in_use"], stats["idle"]) == (2, 2, 0)
+    assert (stats["checkouts"], stats["waits"], stats["timeouts"]) == (3, 1, 1)
+
+    pool.checkin(first)
+    assert pool.stats["idle"] == 1
+    pool.checkin(second)
+
+
+def test_waiter_gets_a_checked_in_connection(pool):
+    pool.timeout = 5
+    held = [pool.checkout(), pool.checkout()]
+    timer = threading.Timer(0.05, pool.checkin, (held[0],))
+    timer.start()
+
+    assert pool.checkout() is held[0]
+    assert pool.stats["waits"] == 1 and pool.stats["timeouts"] == 0
+    timer.join()
+
+
+def test_checkin_rolls_back_dirty_connection(pool):
+    db = pool.checkout()
+    db.execute("INSERT INTO note VALUES ('uncommitted')")
+    assert db.in_transaction
+    pool.checkin(db)
+
+    db = pool.checkout()
+    assert not db.in_transaction
+    assert db.execute("SELECT COUNT(*) FROM note").fetchone()[0] == 0
+
+
+def test_closed_connections_and_pool(pool):
+    db = pool.checkout()
+    db.close()
+    pool.checkin(db)  # discarded, freeing its slot
+    assert pool.stats["open"] == 0
+
+    held = pool.checkout()
+    pool.close()
+    with pytest.raises(sqlite3.OperationalError, match="closed"):
+        pool.checkout()
+    pool.checkin(held)  # closed on the way back
+    assert pool.stats["open"] == 0
+    with pytest.raises(sqlite3.ProgrammingError):
+        held.execute("SELECT 1")
@@ -0,0 +1,77 @@
+import pytest
+
+from lorekeeper.lorekeeper.consts import *
+from lorekeeper.lorekeeper.lorekeeper import Join
+from lorekeeper.lorekeeper.models import Model, User
+
+
+@pytest.fixture
+def authors(notes):
+    notes.insert_many(Tables.USER, [{USER_VAL: f"user{n}", PASSWORD: "x"} for n in range(2, 8)])  # ids 2-7
+    notes.insert_many("note", [
+        {"user_id": 2, "editor_id": 3, "note_val": "a"},
+        {"user_id": 2, "editor_id": None, "note_val": "b"},
+        {"user_id": 4, "editor_id": 2, "note_val": "c"},
+        {"user_id": None, "editor_id": None, "note_val": "d"},
+    ])
+    return notes
+
+
+def test_load_to_one(authors):
+    notes = authors.select("note", load="user", order_by="note.note_id")
+
+    assert [note.note_val for note in notes] == ["a", "b", "c", "d"]
+    assert [note.user.user_val if note.user else None for note in notes] == ["user2", "user2", "user4", None]
+    assert isinstance(notes[0].related["user"], User)
+
+
+def test_load_same_table_twice(authors):
+    editor = Join(Tables.USER, on_col=USER_ID, from_col="editor_id")
+    notes = authors.select("note", load=["user", editor], where={"note_val": "a"})
+
+    (note,) = notes
+    assert note.user.user_val == "user2"
+    assert note.user_2.user_val == "user3"
+    assert set(note.related) == {"user", "user_2"}
+
+
+def test_load_alongside_explicit_join(authors):
+    notes = authors.select("note", join=Join(Tables.USER, alias="author", on_col=USER_ID),
+        where={"author.user_val": "user4"}, load=Join(Tables.USER, on_col=USER_ID, from_col="editor_id"))
+
+    (note,) = notes
+    assert note.note_val == "c" and note.user.user_val == "user2"
+
+
+def test_prefetch_to_many_in_chunks(authors):
+    users = authors.select(Tables.USER, datatype=User, order_by=USER_ID)
+    assert len(users) > 2
+
+    authors.prefetch(users, Join("note", alias="notes", on_col=USER_ID), chunk_size=2)
+
+    by_user = {user.user_val: sorted(note.note_val for note in user.notes) for user in users}
+    assert by_user == {"admin": [], "user2": ["a", "b"], "user3": [], "user4": ["c"],
+        "user5": [], "user6": [], "user7": []}
+    assert users[1].related["notes"] is users[1].notes
+
+
+def test_select_prefetch(authors):
+    users = authors.select(Tables.USER, where={USER_ID: 2}, prefetch=Join("note", alias="notes", on_col=USER_ID))
+
+    assert sorted(note.note_val for note in users[0].notes) == ["a", "b"]
+
+
+def test_load_and_prefetch_onto_bare_models(authors):
+    authors.run_query("CREATE VIEW member AS SELECT user_id AS id, user_val AS val FROM user")
+    authors.run_query("CREATE VIEW jotting AS SELECT note_id AS id, note_val AS val, user_id FROM note")
+
+    jottings = authors.select("jotting", load=Join(Tables.USER, on_col=USER_ID), order_by="id")
+    assert type(jottings[0]) is Model
+    assert [(jotting.val, jotting.user and jotting.user.user_val) for jotting in jottings] == [
+        ("a", "user2"), ("b", "user2"), ("c", "user4"), ("d", None)]
+    assert jottings[0].to_dict() == {"id": 1, "val": "a"}
+
+    members = authors.select("member", where={"id": 2},
+        prefetch=Join("note", alias="notes", on_col=USER_ID, from_col="id"))
+    assert sorted(note.note_val for note in members[0].notes) == ["a", "b"]
+    assert members[0].to_dict() == {"id": 2, "val": "user2"}
@@ -0,0 +1,21 @@
+import sqlite3
+
+from lorekeeper.lorekeeper import lorekeeper as module
+from lorekeeper.lorekeeper.consts import *
+
+
+def test_refresh_replica_paces_steps(app, lk, tmp_path, monkeypatch):
+    app.config["REPLICA"] = str(tmp_path / "replica.sqlite")
+    lk.replicas = {"copy": "REPLICA"}
+    lk.insert_many(Tables.USER, [{USER_VAL: f"user{n}", "password": "x" * 500} for n in range(100)])
+
+    sleeps = []
+    monkeypatch.setattr(module.time, "sleep", sleeps.append)
+    lk.refresh_replica(pages=1, sleep=0.01)
+
+    assert sleeps and set(sleeps) == {0.01}
+    replica = sqlite3.connect(app.config["REPLICA"])
+    try:
+        assert replica.execute(f"SELECT COUNT(*) FROM {Tables.USER}").fetchone()[0] == len(lk.get_table(Tables.USER))
+    finally:
+        replica.close()
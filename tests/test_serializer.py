@@ -0,0 +1,60 @@
+import datetime
+import json
+
+import pytest
+
+from lorekeeper.lorekeeper.consts import *
+from lorekeeper.lorekeeper.models import Record, User
+from lorekeeper.lorekeeper.serializer import JSONSerializer
+
+
+def users(n:int) -> list:
+    return [User(user_id=idx, user_val=f"usér \"{idx}\"", password=None) for idx in range(n)]
+
+
+def joined(texts) -> str:
+    return "[" + ", ".join(texts) + "]"
+
+
+@pytest.mark.parametrize("batch_size", [1, 3, 1000])
+def test_same_output_as_per_object_encoding(batch_size):
+    record = Record.layout(("note_id", "note_val"))
+    rows = [*users(4), record((1, "a")), record((2, None)), {"x": [1, 2], "y": {"z": 1.5}}, None, users(1)[0]]
+
+    expected = joined([row.to_json() if isinstance(row, User) else json.dumps(row.to_dict() if isinstance(row, Record) else row)
+        for row in rows])
+    assert JSONSerializer(batch_size=batch_size).dumps(rows) == expected
+    assert json.loads(expected)[7] is None
+
+
+def test_empty_and_default():
+    serializer = JSONSerializer()
+    assert serializer.dumps([]) == "[]" == json.dumps([])
+    assert serializer.dumps(iter([{"at": datetime.date(2026, 1, 2)}])) == '[{"at": "2026-01-02"}]'
+    with pytest.raises(TypeError):
+        JSONSerializer(default=None).dumps([{"at": datetime.date(2026, 1, 2)}])
+
+
+@pytest.mark.parametrize("buffer_size", [7, 64, 100000])
+def test_pieces_are_buffer_sized(buffer_size):
+    rows = users(50)
+    pieces = list(JSONSerializer(batch_size=4, buffer_size=buffer_size).iter_encode(iter(rows)))
+
+    assert "".join(pieces) == joined(user.to_json() for user in rows)
+    assert all(len(piece) == buffer_size for piece in pieces[:-1])
+    assert len(pieces[-1]) <= buffer_size or len(pieces) == 1
+
+
+def test_streamed_response(app, client, lk):
+    lk.insert_many(Tables.USER, [{USER_VAL: f"user{n}", PASSWORD: "x"} for n in range(30)])
+    serializer = JSONSerializer(batch_size=7, buffer_size=128)
+
+    @app.route("/users.json")
+    def users_json():
+        return serializer.response(app.lk.iter_select(Tables.USER, datatype=User, chunk_size=5))
+
+    response = client.get("/users.json")
+
+    assert response.status_code == 200 and response.mimetype == "application/json"
+    assert response.get_data(as_text=True) == joined(user.to_json() for user in lk.select(Tables.USER, datatype=User))
+    assert len(response.get_json()) == 31
@@ -0,0 +1,63 @@
+import os
+import sqlite3
+
+from flask import g
+
+from lorekeeper.lorekeeper.advisor import IndexAdvisor
+from lorekeeper.lorekeeper.consts import *
+from lorekeeper.lorekeeper.profiler import QueryProfiler
+
+
+def test_profiler_flush_and_load_merges_processes(lk, tmp_path):
+    path = str(tmp_path / "query-stats")
+    lk.profiler = QueryProfiler(path=path, flush_interval=3600)
+    assert QueryProfiler.load(path) == {}
+
+    lk.select(Tables.USER, where={USER_ID: 1})
+    lk.profiler.flush()
+    # as if flushed by another worker
+    os.replace(os.path.join(path, f"{os.getpid()}.json"), os.path.join(path, "other.json"))
+    lk.profiler = QueryProfiler(path=path, flush_interval=3600)
+    lk.select(Tables.USER, where={USER_ID: 2})
+    lk.select(Tables.USER, where={USER_ID: 3})
+    lk.profiler.flush()
+
+    (shape, stats), = [(shape, stats) for shape, stats in QueryProfiler.load(path).items() if "FROM `user`" in shape]
+    assert stats["count"] == 3 and sum(stats["buckets"]) == 3
+    assert stats["rows"] == 1
+
+
+def test_advisor_flush_and_load_merges_processes(notes, tmp_path):
+    path = str(tmp_path / "index-stats")
+    notes.advisor = IndexAdvisor(path=path, flush_interval=3600)
+    assert IndexAdvisor.load(path) == {"uses": {}, "scans": {}}
+
+    notes.select("note", where={"user_id": 1})
+    notes.advisor.flush()
+    os.replace(os.path.join(path, f"{os.getpid()}.json"), os.path.join(path, "other.json"))
+    notes.advisor = IndexAdvisor(path=path, flush_interval=3600)
+    notes.select("note", where={"user_id": 2})
+    notes.advisor.flush()
+
+    stats = IndexAdvisor.load(path)
+    assert stats["uses"][("note", ("user_id",))] == 2 and stats["scans"]["note"] == 2
+    (suggestion,) = IndexAdvisor.suggest(notes.db, notes.catalog, stats)
+    assert suggestion["sql"] == "CREATE INDEX IF NOT EXISTS `note_user_id_idx` ON `note` (user_id)"
+
+
+def test_advisor_explains_on_the_serving_replica(app, notes, tmp_path):
+    app.config["REPLICA"] = str(tmp_path / "replica.sqlite")
+    notes.replicas = {"copy": "REPLICA"}
+    notes.refresh_replica()
+    replica = sqlite3.connect(app.config["REPLICA"])
+    replica.execute("CREATE INDEX note_user_id_idx ON note (user_id)")  # only the replica has it
+    replica.close()
+    g.pop("db_wrote", None)  # creating `note` made this context read its own writes from the primary
+
+    notes.advisor = IndexAdvisor()
+    notes.select("note", where={"user_id": 1})
+    assert notes.advisor.stats["scans"] == {}
+
+    notes.advisor = IndexAdvisor()
+    notes.select("note", where={"user_id": 1}, route=PRIMARY)
+    assert notes.advisor.stats["scans"] == {"note": 1}
@@ -0,0 +1,49 @@
+import sqlite3
+
+import pytest
+
+from lorekeeper.lorekeeper.lorekeeper import LoreKeeper
+from lorekeeper.lorekeeper.models import Model
+
+
+@pytest.fixture
+def many(notes):
+    notes.insert_many("note", [{"note_val": f"note{n}"} for n in range(10)])
+    return notes
+
+
+def test_streams_in_chunks(many, monkeypatch):
+    batches = []
+    hydrate = LoreKeeper._hydrate.__func__
+    monkeypatch.setattr(LoreKeeper, "_hydrate",
+        classmethod(lambda cls, cursor, rows, datatype: batches.append(len(rows)) or hydrate(cls, cursor, rows, datatype)))
+
+    rows = many.iter_select("note", datatype=Model, chunk_size=3)
+    assert batches == []  # nothing fetched until consumed
+
+    assert [row.note_val for row in rows] == [f"note{n}" for n in range(10)]
+    assert batches == [3, 3, 3, 1]
+
+
+def checkpoint_blocked(app) -> bool:
+    # a checkpoint can't truncate the WAL while any connection still reads from it
+    other = sqlite3.connect(app.config["DATABASE"], timeout=0)
+    try:
+        return other.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()[0] == 1
+    finally:
+        other.close()
+
+
+def test_early_break_releases_the_cursor(app, many):
+    rows = many.iter_select("note", chunk_size=3)
+    cursor = rows.gi_frame.f_locals["cursor"]
+    for row in rows:
+        break
+    many.insert("note", {"note_val": "later"})  # lands in the WAL behind the open read
+    assert checkpoint_blocked(app)
+
+    del row, rows  # as when the loop's scope ends
+
+    with pytest.raises(sqlite3.ProgrammingError):
+        cursor.fetchone()
+    assert not checkpoint_blocked(app)
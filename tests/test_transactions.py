@@ -0,0 +1,55 @@
+import sqlite3
+
+import pytest
+
+
+def vals(lk) -> list:
+    return [row[0] for row in lk.run_query("SELECT note_val FROM note ORDER BY note_id")]
+
+
+def test_commit(notes):
+    with notes.transaction():
+        notes.insert("note", {"note_val": "a"})
+        notes.insert("note", {"note_val": "b"})
+        assert notes.db.in_transaction
+
+    assert not notes.db.in_transaction
+    assert vals(notes) == ["a", "b"]
+
+
+def test_rollback(notes):
+    with pytest.raises(RuntimeError):
+        with notes.transaction():
+            notes.insert("note", {"note_val": "a"})
+            raise RuntimeError
+
+    assert not notes.db.in_transaction
+    assert vals(notes) == []
+
+
+def test_nested_savepoint_undoes_only_inner_block(notes):
+    with notes.transaction():
+        notes.insert("note", {"note_val": "a"})
+        with pytest.raises(sqlite3.IntegrityError):
+            with notes.transaction():
+                notes.insert("note", {"note_val": "b"})
+                notes.insert("note", {"note_val": "a"})  # UNIQUE violation
+        notes.insert("note", {"note_val": "c"})
+
+    assert vals(notes) == ["a", "c"]
+
+
+def test_outer_rollback_undoes_released_savepoint(notes):
+    with pytest.raises(RuntimeError):
+        with notes.transaction():
+            with notes.transaction():
+                notes.insert("note", {"note_val": "a"})
+            raise RuntimeError
+
+    assert vals(notes) == []
+
+
+def test_unknown_mode(notes):
+    with pytest.raises(ValueError):
+        with notes.transaction("LATER"):
+            pass
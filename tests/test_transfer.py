@@ -0,0 +1,65 @@
+import pytest
+
+
+@pytest.fixture
+def files(lk):
+    lk.run_query("CREATE TABLE file (file_id INTEGER PRIMARY KEY, file_val TEXT, data BLOB)")
+    lk.insert_many("file", [
+        {"file_val": "bytes", "data": bytes(range(256))},
+        {"file_val": "null", "data": None},
+    ])
+    return lk
+
+
+@pytest.mark.parametrize("name", ["file.csv", "file.jsonl.gz"])
+def test_export_import_roundtrips_blobs(files, tmp_path, name):
+    path = str(tmp_path / name)
+    assert files.export_table("file", path) == 2
+
+    files.run_query("DELETE FROM file")
+    assert files.import_table("file", path) == 2
+
+    rows = files.run_query("SELECT file_val, data FROM file ORDER BY file_id")
+    assert [tuple(row) for row in rows] == [("bytes", bytes(range(256))), ("null", None)]
+
+
+def test_export_rejects_blobs_outside_blob_columns(files, tmp_path):
+    files.insert("file", {"file_val": b"\x00\xff"})
+
+    with pytest.raises(ValueError):
+        files.export_table("file", str(tmp_path / "file.csv"))
+
+
+def test_import_replace_keeps_row_count(files, tmp_path):
+    path = str(tmp_path / "file.jsonl")
+    files.export_table("file", path)
+    files.track_counts("file")
+    files.update_many("file", [{"file_id": 1, "file_val": "changed"}])
+
+    assert files.import_table("file", path, on_conflict="replace") == 2
+
+    assert len(files.get_table("file")) == 2
+    assert files.run_query("SELECT file_val FROM file WHERE file_id = 1")[0][0] == "bytes"
+
+
+def test_csv_keeps_empty_strings_apart_from_nulls(lk, tmp_path):
+    lk.run_query("CREATE TABLE item (item_id INTEGER PRIMARY KEY, name TEXT NOT NULL, note TEXT, qty INTEGER)")
+    rows = [("", None, None), ("a", "", 0), ("b", "x", 3)]
+    lk.insert_many("item", [dict(zip(("name", "note", "qty"), row)) for row in rows])
+    path = str(tmp_path / "item.csv")
+    lk.export_table("item", path)
+
+    lk.run_query("DELETE FROM item")
+    assert lk.import_table("item", path) == 3
+
+    assert [tuple(row) for row in lk.run_query("SELECT name, note, qty FROM item ORDER BY item_id")] == rows
+
+
+def test_csv_empty_numeric_fields_import_as_null(lk, tmp_path):
+    lk.run_query("CREATE TABLE item (item_id INTEGER PRIMARY KEY, name TEXT, qty INTEGER)")
+    path = tmp_path / "item.csv"
+    path.write_text("name,qty\n,\n\\N,2\n")
+
+    lk.import_table("item", str(path))
+
+    assert [tuple(row) for row in lk.run_query("SELECT name, qty FROM item ORDER BY item_id")] == [("", None), (None, 2)]
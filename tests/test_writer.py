@@ -0,0 +1,73 @@
+from concurrent.futures import Future
+import sqlite3
+
+import pytest
+
+from lorekeeper.lorekeeper.consts import Config
+from lorekeeper.lorekeeper.writer import WriteBehind
+
+
+@pytest.fixture
+def behind(app, notes):
+    notes.write_behind = WriteBehind(notes, app, max_delay=0.05)
+    return notes
+
+
+def test_writes_return_futures(behind):
+    futures = [behind.insert("note", {"note_val": f"note{n}"}) for n in range(10)]
+
+    assert all(isinstance(future, Future) for future in futures)
+    for future in futures:
+        future.result(timeout=5)
+    assert len(behind.get_table("note")) == 10
+
+    stats = behind.write_behind.stats
+    assert stats["writes"] == 10 and stats["batches"] < 10
+
+
+def test_failed_write_only_fails_its_future(behind):
+    ok = behind.insert("note", {"note_val": "a"})
+    duplicate = behind.insert("note", {"note_val": "a"})
+    after = behind.insert("note", {"note_val": "b"})
+
+    ok.result(timeout=5)
+    after.result(timeout=5)
+    with pytest.raises(sqlite3.IntegrityError):
+        duplicate.result(timeout=5)
+
+    assert [row[0] for row in behind.run_query("SELECT note_val FROM note ORDER BY note_id")] == ["a", "b"]
+    assert behind.write_behind.stats["failures"] == 1
+
+
+def test_writes_in_a_transaction_run_synchronously(behind):
+    with behind.transaction():
+        assert not isinstance(behind.insert("note", {"note_val": "a"}), Future)
+
+    assert len(behind.get_table("note")) == 1
+    assert behind.write_behind.stats["writes"] == 0
+
+
+def test_closed_queue_rejects_writes(behind):
+    behind.write_behind.close()
+
+    with pytest.raises(RuntimeError):
+        behind.insert("note", {"note_val": "a"})
+
+
+def test_failed_begin_fails_every_future(app, behind):
+    # a short busy timeout for the writer's connections
+    app.config[Config.PRAGMAS] = {"busy_timeout": 50}
+    behind._pools.pop(app.config["DATABASE"]).close()
+
+    blocker = sqlite3.connect(app.config["DATABASE"])
+    blocker.execute("BEGIN IMMEDIATE")
+    try:
+        futures = [behind.insert("note", {"note_val": f"note{n}"}) for n in range(3)]
+        for future in futures:
+            with pytest.raises(sqlite3.OperationalError):
+                future.result(timeout=5)
+    finally:
+        blocker.rollback()
+        blocker.close()
+
+    assert behind.write_behind.stats["failures"] == 3